@@ -0,0 +1,562 @@
+"""Local stand-in for the GitHub REST and GraphQL endpoints used by the CLI.
+
+    server = FakeGitHub("owner/repo", latency=0.05)
+    server.add_branch("main")
+    server.add_pr("kz/b001", "main")
+    ...  # run the CLI with GITHUB_API_URL=server.url
+    server.stats()
+
+With `git_dir` (a bare repo, the `origin` of the local clone), branches are read from
+it and merging a PR really merges its head into its base there. After its head or base
+changed, a PR is "blocked" (CI is running) for its next `ci_checks` reads, then "clean":
+reads are the clock of the simulated CI, so how often a client has to poll a PR doesn't
+depend on timing. Meanwhile its `mergeable` and `rebaseable` are null, as on GitHub while
+it computes the mergeability of a PR.
+
+With `webhook_url`, PR changes (`pull_request`) and finished CI runs (`check_suite`) are
+POSTed there as GitHub webhooks, signed with `webhook_secret`. A webhook is delivered
+before the request causing it is answered (a CI run finishes right after its last
+"blocked" read), so a client woken by webhooks sees the same states as a polling one.
+
+Every response carries `X-RateLimit-*` headers of a primary limit of `rate_limit` requests
+per `rate_limit_window` seconds, and more than `mutations_per_minute` mutations within a
+minute are answered by a secondary rate limit (403 with `Retry-After`), like on GitHub.
+GET responses have ETags and conditional requests get a 304 (which costs no rate limit).
+"""
+import hashlib
+import hmac
+import json
+import re
+import subprocess
+import threading
+import time
+import urllib.parse
+import urllib.request
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+GRAPHQL_PAGE_SIZE = 100
+
+
+class FakeGitHub:
+    def __init__(
+        self,
+        repo: str,
+        latency: float = 0.0,
+        rate_limit: int = 5000,
+        rate_limit_window: float = 3600,
+        mutations_per_minute: int | None = None,
+        retry_after: int = 1,
+        username: str = "benchmark",
+        git_dir: Path | None = None,
+        ci_checks: int = 0,
+        webhook_url: str | None = None,
+        webhook_secret: str | None = None,
+    ) -> None:
+        self.repo = repo
+        self.owner = repo.split("/")[0]
+        self.username = username
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.rate_limit_window = rate_limit_window
+        self.mutations_per_minute = mutations_per_minute
+        self.retry_after = retry_after
+        self.git_dir = git_dir
+        self.ci_checks = ci_checks
+        self.webhook_url = webhook_url
+        self.webhook_secret = webhook_secret
+
+        self.branches: dict[str, str] = {}  # name -> sha (without `git_dir`)
+        self.prs: dict[int, dict[str, Any]] = {}
+        self._epoch = int(time.time())  # PRs look recent (see `pr_is_ready_to_merge`)
+        self._clock = 0  # for distinct `updated_at` of PRs
+
+        self.requests: Counter[str] = Counter()  # "VERB /route" -> count
+        self.not_modified = 0
+        self.webhooks: Counter[str] = Counter()  # event -> deliveries
+        self.rate_limited = 0
+        self._used = 0
+        self._reset_at = time.time() + rate_limit_window
+        self._mutations: deque[float] = deque()
+        self._lock = threading.RLock()
+
+        self.routes = [
+            ("GET", "", self._get_repo),
+            ("GET", "/branches/(?P<branch>.+)", self._get_branch),
+            ("GET", "/pulls", self._list_prs),
+            ("POST", "/pulls", self._create_pr),
+            ("GET", r"/pulls/(?P<number>\d+)", self._get_pr),
+            ("PATCH", r"/pulls/(?P<number>\d+)", self._edit_pr),
+            ("PUT", r"/pulls/(?P<number>\d+)/merge", self._merge_pr),
+            ("GET", r"/pulls/(?P<number>\d+)/reviews", self._get_reviews),
+            (
+                "GET",
+                r"/pulls/(?P<number>\d+)/requested_reviewers",
+                self._get_review_requests,
+            ),
+            (
+                "POST",
+                r"/pulls/(?P<number>\d+)/requested_reviewers",
+                self._request_reviews,
+            ),
+        ]
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like api.github.com
+
+            def log_message(self, format, *args) -> None:
+                pass
+
+            def handle_verb(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length)) if length else None
+                status, headers, data = server.handle(
+                    self.command, self.path, dict(self.headers), body
+                )
+                output = b"" if data is None else json.dumps(data).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(output)))
+                self.end_headers()
+                self.wfile.write(output)
+
+            do_GET = do_POST = do_PATCH = do_PUT = do_DELETE = handle_verb
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    # state
+
+    def _tick(self) -> str:
+        self._clock += 1
+        return time.strftime(
+            "%Y-%m-%dT%H:%M:%SZ", time.gmtime(self._epoch + self._clock)
+        )
+
+    def _git(self, args: list[str]) -> subprocess.CompletedProcess:
+        assert self.git_dir is not None
+        return subprocess.run(
+            ["git", "-C", str(self.git_dir), "-c", "user.name=GitHub"]
+            + ["-c", "user.email=noreply@github.com"]
+            + args,
+            capture_output=True,
+            text=True,
+        )
+
+    def _deliver(self, event: str, payload: dict[str, Any]) -> None:
+        """POST a webhook event; failed deliveries are only counted (as on GitHub)."""
+        if self.webhook_url is None:
+            return
+        body = json.dumps(payload).encode()
+        headers = {"Content-Type": "application/json", "X-GitHub-Event": event}
+        if self.webhook_secret is not None:
+            digest = hmac.new(self.webhook_secret.encode(), body, hashlib.sha256)
+            headers["X-Hub-Signature-256"] = f"sha256={digest.hexdigest()}"
+        request = urllib.request.Request(self.webhook_url, body, headers)
+        try:
+            urllib.request.urlopen(request, timeout=5).close()
+            self.webhooks[event] += 1
+        except OSError:
+            self.webhooks[f"{event} failed"] += 1
+
+    def _pr_event(self, action: str, pr: dict[str, Any]) -> None:
+        self._deliver("pull_request", {"action": action, "number": pr["number"]})
+
+    def add_branch(self, name: str) -> None:
+        self.branches[name] = hashlib.sha1(name.encode()).hexdigest()
+
+    def sha(self, branch: str) -> str | None:
+        if self.git_dir is None:
+            return self.branches.get(branch)
+        result = self._git(["rev-parse", "--verify", "-q", f"refs/heads/{branch}"])
+        return result.stdout.strip() if result.returncode == 0 else None
+
+    def branch_names(self) -> list[str]:
+        if self.git_dir is None:
+            return sorted(self.branches)
+        result = self._git(
+            ["for-each-ref", "--format=%(refname:strip=2)", "refs/heads"]
+        )
+        return result.stdout.split()
+
+    def add_pr(
+        self,
+        head: str,
+        base: str,
+        title: str | None = None,
+        draft: bool = False,
+        approved: bool = False,
+    ) -> dict[str, Any]:
+        with self._lock:
+            number = len(self.prs) + 1
+            now = self._tick()
+            pr = {
+                "number": number,
+                "title": title or head,
+                "state": "open",
+                "draft": draft,
+                "merged": False,
+                "head": head,
+                "base": base,
+                "created_at": now,
+                "updated_at": now,
+                "requested_reviewers": [],
+                "reviews": [],
+                "ci": None,  # [(head sha, base) CI runs for, reads until it's done]
+            }
+            if approved:
+                pr["reviews"].append(
+                    {"id": number, "state": "APPROVED", "user": {"login": "reviewer"}}
+                )
+            self.prs[number] = pr
+            return pr
+
+    def _mergeable_state(self, pr: dict[str, Any]) -> str:
+        if pr["draft"]:
+            return "draft"
+        if pr["merged"]:
+            return "unknown"
+        ci_key = (self.sha(pr["head"]), pr["base"])
+        if pr["ci"] is None or pr["ci"][0] != ci_key:
+            pr["ci"] = [ci_key, self.ci_checks]
+        if pr["ci"][1] == 0:
+            return "clean"
+        pr["ci"][1] -= 1
+        if pr["ci"][1] == 0:
+            payload = {"action": "completed", "head_sha": ci_key[0]}
+            self._deliver("check_suite", payload)
+        return "blocked"
+
+    def _touch(self, pr: dict[str, Any]) -> None:
+        pr["updated_at"] = self._tick()
+
+    # REST representation
+
+    def _branch_json(self, branch: str) -> dict[str, Any]:
+        owner = self.owner
+        return {
+            "label": f"{owner}:{branch}",
+            "ref": branch,
+            "sha": self.sha(branch) or "0" * 40,
+        }
+
+    def _pr_json(self, pr: dict[str, Any]) -> dict[str, Any]:
+        mergeable_state = self._mergeable_state(pr)
+        # null while GitHub computes it, i.e. while CI runs after a push or a retarget
+        mergeable = None if mergeable_state == "blocked" else True
+        return {
+            "url": f"{self.url}/repos/{self.repo}/pulls/{pr['number']}",
+            "number": pr["number"],
+            "title": pr["title"],
+            "state": pr["state"],
+            "draft": pr["draft"],
+            "merged": pr["merged"],
+            "mergeable": mergeable,
+            "rebaseable": mergeable,
+            "mergeable_state": mergeable_state,
+            "created_at": pr["created_at"],
+            "updated_at": pr["updated_at"],
+            "user": {"login": self.username},
+            "head": self._branch_json(pr["head"]),
+            "base": self._branch_json(pr["base"]),
+            "requested_reviewers": [
+                {"login": login} for login in pr["requested_reviewers"]
+            ],
+        }
+
+    def _pr_node(self, pr: dict[str, Any]) -> dict[str, Any]:
+        """GraphQL shape of `USER_OPENED_PRS_QUERY`."""
+        return {
+            "number": pr["number"],
+            "title": pr["title"],
+            "state": "MERGED" if pr["merged"] else pr["state"].upper(),
+            "isDraft": pr["draft"],
+            "createdAt": pr["created_at"],
+            "updatedAt": pr["updated_at"],
+            "author": {"login": self.username},
+            "headRefName": pr["head"],
+            "headRefOid": self.sha(pr["head"]) or "0" * 40,
+            "headRepositoryOwner": {"login": self.owner},
+            "baseRefName": pr["base"],
+            "baseRefOid": self.sha(pr["base"]) or "0" * 40,
+            "mergeable": "MERGEABLE",
+            "mergeStateStatus": "DRAFT" if pr["draft"] else "CLEAN",
+            "reviewDecision": None,
+            "reviews": {"totalCount": len(pr["reviews"])},
+            "reviewRequests": {
+                "nodes": [
+                    {"requestedReviewer": {"login": login}}
+                    for login in pr["requested_reviewers"]
+                ]
+            },
+        }
+
+    # endpoints
+
+    def _get_repo(self, body: Any) -> tuple[int, Any]:
+        return 200, {
+            "url": f"{self.url}/repos/{self.repo}",
+            "full_name": self.repo,
+            "name": self.repo.split("/")[1],
+            "owner": {"login": self.owner},
+        }
+
+    def _get_branch(self, body: Any, branch: str) -> tuple[int, Any]:
+        branch = urllib.parse.unquote(branch)
+        sha = self.sha(branch)
+        if sha is None:
+            return 404, {"message": "Branch not found"}
+        return 200, {"name": branch, "commit": {"sha": sha}}
+
+    def _list_prs(self, body: Any) -> tuple[int, Any]:
+        return 200, [
+            self._pr_json(pr) for pr in self.prs.values() if pr["state"] == "open"
+        ]
+
+    def _create_pr(self, body: Any) -> tuple[int, Any]:
+        if self.sha(body["head"]) is None or self.sha(body["base"]) is None:
+            return 422, {"message": "Validation Failed"}
+        for pr in self.prs.values():
+            if pr["state"] == "open" and pr["head"] == body["head"]:
+                return 422, {"message": "A pull request already exists"}
+        pr = self.add_pr(
+            body["head"], body["base"], body["title"], body.get("draft", False)
+        )
+        self._pr_event("opened", pr)
+        return 201, self._pr_json(pr)
+
+    def _pr(self, number: str) -> dict[str, Any] | None:
+        return self.prs.get(int(number))
+
+    def _get_pr(self, body: Any, number: str) -> tuple[int, Any]:
+        pr = self._pr(number)
+        if pr is None:
+            return 404, {"message": "Not Found"}
+        return 200, self._pr_json(pr)
+
+    def _edit_pr(self, body: Any, number: str) -> tuple[int, Any]:
+        pr = self._pr(number)
+        if pr is None:
+            return 404, {"message": "Not Found"}
+        for key in ["title", "state", "base", "draft"]:
+            if key in body:
+                pr[key] = body[key]
+        self._touch(pr)
+        self._pr_event("edited", pr)
+        return 200, self._pr_json(pr)
+
+    def _merge_pr(self, body: Any, number: str) -> tuple[int, Any]:
+        pr = self._pr(number)
+        if pr is None or pr["state"] != "open" or self._mergeable_state(pr) != "clean":
+            return 405, {"message": "Pull Request is not mergeable"}
+        sha = self.sha(pr["head"])
+        if self.git_dir is not None:
+            sha = self._git_merge(pr)
+            if sha is None:
+                return 405, {"message": "Pull Request is not mergeable"}
+        pr["state"] = "closed"
+        pr["merged"] = True
+        self._touch(pr)
+        self._pr_event("closed", pr)
+        return 200, {"merged": True, "sha": sha or "0" * 40}
+
+    def _git_merge(self, pr: dict[str, Any]) -> str | None:
+        """Merge the PR's head into its base in `git_dir` (None on conflicts)."""
+        base_sha, head_sha = self.sha(pr["base"]), self.sha(pr["head"])
+        merge_tree = self._git(["merge-tree", "--write-tree", base_sha, head_sha])
+        if merge_tree.returncode != 0:
+            return None
+        message = f"Merge pull request #{pr['number']} from {pr['head']}"
+        tree = merge_tree.stdout.split()[0]
+        commit = self._git(
+            ["commit-tree", tree, "-p", base_sha, "-p", head_sha, "-m", message]
+        ).stdout.strip()
+        self._git(["update-ref", f"refs/heads/{pr['base']}", commit, base_sha])
+        return commit
+
+    def _get_reviews(self, body: Any, number: str) -> tuple[int, Any]:
+        pr = self._pr(number)
+        if pr is None:
+            return 404, {"message": "Not Found"}
+        return 200, pr["reviews"]
+
+    def _get_review_requests(self, body: Any, number: str) -> tuple[int, Any]:
+        pr = self._pr(number)
+        if pr is None:
+            return 404, {"message": "Not Found"}
+        return 200, {
+            "users": [{"login": login} for login in pr["requested_reviewers"]],
+            "teams": [],
+        }
+
+    def _request_reviews(self, body: Any, number: str) -> tuple[int, Any]:
+        pr = self._pr(number)
+        if pr is None:
+            return 404, {"message": "Not Found"}
+        for login in body.get("reviewers", []):
+            if login not in pr["requested_reviewers"]:
+                pr["requested_reviewers"].append(login)
+        self._touch(pr)
+        self._pr_event("review_requested", pr)
+        return 201, self._pr_json(pr)
+
+    def _graphql(self, body: Any) -> tuple[int, Any]:
+        """Only the PR search of `USER_OPENED_PRS_QUERY`, `BRANCHES_QUERY` and the
+        query of `open_prs_by_head` are supported."""
+        variables = body.get("variables", {})
+        if "refs(" in body.get("query", ""):
+            return self._graphql_branches(variables)
+        if "pullRequests(headRefName:" in body.get("query", ""):
+            return self._graphql_prs_by_head(body["query"], variables)
+        terms = variables.get("searchQuery", "").split()
+        prs = list(self.prs.values())
+        if "is:open" in terms:
+            prs = [pr for pr in prs if pr["state"] == "open"]
+        if "sort:updated-desc" in terms:
+            prs.sort(key=lambda pr: pr["updated_at"], reverse=True)
+        start = int(variables.get("cursor") or 0)
+        end = start + GRAPHQL_PAGE_SIZE
+        return 200, {
+            "data": {
+                "search": {
+                    "pageInfo": {"hasNextPage": end < len(prs), "endCursor": str(end)},
+                    "nodes": [self._pr_node(pr) for pr in prs[start:end]],
+                }
+            }
+        }
+
+    def _graphql_prs_by_head(
+        self, query: str, variables: dict[str, Any]
+    ) -> tuple[int, Any]:
+        repository = {}
+        for alias, variable in re.findall(
+            r"(\w+): pullRequests\(headRefName: \$(\w+)", query
+        ):
+            repository[alias] = {
+                "nodes": [
+                    self._pr_node(pr)
+                    for pr in self.prs.values()
+                    if pr["state"] == "open" and pr["head"] == variables[variable]
+                ]
+            }
+        return 200, {"data": {"repository": repository}}
+
+    def _graphql_branches(self, variables: dict[str, Any]) -> tuple[int, Any]:
+        names = self.branch_names()
+        matching = [name for name in names if variables["refQuery"] in name]
+        start = int(variables.get("cursor") or 0)
+        end = start + GRAPHQL_PAGE_SIZE
+        return 200, {
+            "data": {
+                "repository": {
+                    "main": {"name": "main"} if "main" in names else None,
+                    "refs": {
+                        "pageInfo": {
+                            "hasNextPage": end < len(matching),
+                            "endCursor": str(end),
+                        },
+                        "nodes": [{"name": name} for name in matching[start:end]],
+                    },
+                }
+            }
+        }
+
+    # dispatch
+
+    def _route(self, verb: str, path: str) -> tuple[str, Any, dict[str, str]]:
+        if path == "/graphql" and verb == "POST":
+            return "POST /graphql", self._graphql, {}
+        prefix = f"/repos/{self.repo}"
+        if not path.startswith(prefix):
+            return f"{verb} {path}", None, {}
+        rest = path[len(prefix) :]
+        for route_verb, pattern, handler in self.routes:
+            match = re.fullmatch(pattern, rest)
+            if route_verb == verb and match:
+                route = re.sub(r"\(\?P<(\w+)>[^)]*\)", r"{\1}", pattern)
+                return f"{verb} {route or '/'}", handler, match.groupdict()
+        return f"{verb} {rest}", None, {}
+
+    def _rate_limit_headers(self) -> dict[str, str]:
+        return {
+            "X-RateLimit-Limit": str(self.rate_limit),
+            "X-RateLimit-Remaining": str(max(0, self.rate_limit - self._used)),
+            "X-RateLimit-Used": str(self._used),
+            "X-RateLimit-Reset": str(int(self._reset_at)),
+        }
+
+    def _check_rate_limits(self, mutation: bool) -> tuple[int, Any] | None:
+        now = time.time()
+        if now >= self._reset_at:
+            self._used = 0
+            self._reset_at = now + self.rate_limit_window
+        if self._used >= self.rate_limit:
+            return 403, {"message": "API rate limit exceeded"}
+        if mutation and self.mutations_per_minute is not None:
+            while self._mutations and self._mutations[0] < now - 60:
+                self._mutations.popleft()
+            if len(self._mutations) >= self.mutations_per_minute:
+                return 403, {"message": "You have exceeded a secondary rate limit"}
+            self._mutations.append(now)
+        self._used += 1
+        return None
+
+    def handle(
+        self, verb: str, url: str, headers: dict[str, str], body: Any
+    ) -> tuple[int, dict[str, str], Any]:
+        if self.latency:
+            time.sleep(self.latency)
+        path = urllib.parse.urlsplit(url).path.rstrip("/")
+        route, handler, params = self._route(verb, path)
+        mutation = verb != "GET" and not (
+            route == "POST /graphql"
+            and not body.get("query", "").lstrip().startswith("mutation")
+        )
+        with self._lock:
+            self.requests[route] += 1
+            limited = self._check_rate_limits(mutation)
+            response_headers = self._rate_limit_headers()
+            if limited is not None:
+                self.rate_limited += 1
+                if self._used < self.rate_limit:  # secondary limit
+                    response_headers["Retry-After"] = str(self.retry_after)
+                return limited[0], response_headers, limited[1]
+
+            if handler is None:
+                return 404, response_headers, {"message": "Not Found"}
+            status, data = handler(body, **params)
+
+        if verb == "GET" and status == 200:
+            etag = f'"{hashlib.sha1(json.dumps(data).encode()).hexdigest()}"'
+            response_headers["ETag"] = etag
+            if headers.get("If-None-Match") == etag:
+                with self._lock:
+                    self.not_modified += 1
+                    self._used -= 1  # conditional requests are free on GitHub
+                    response_headers = self._rate_limit_headers() | {"ETag": etag}
+                return 304, response_headers, None
+        return status, response_headers, data
+
+    def stats(self) -> dict[str, Any]:
+        mutations = sum(
+            count
+            for route, count in self.requests.items()
+            if not route.startswith("GET") and route != "POST /graphql"
+        )
+        return {
+            "api_requests": sum(self.requests.values()),
+            "api_mutations": mutations,
+            "api_not_modified": self.not_modified,
+            "api_rate_limited": self.rate_limited,
+            "api_routes": dict(sorted(self.requests.items())),
+        }
@@ -0,0 +1,48 @@
+"""Helpers for benchmarks that run project code in a fresh child interpreter."""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+DUMMY_ENV = {
+    "GITHUB_ACCESS_TOKEN": "benchmark",
+    "GITHUB_REPO": "benchmark/benchmark",
+    "GITHUB_USERNAME": "benchmark",
+    "REVIEWERS": "benchmark",
+    "BRANCH_PREFIX": "kz/",
+}
+
+
+def count_processes() -> list[int]:
+    """Wrap `subprocess.Popen` to count every started process (git ones in practice)."""
+    counter = [0]
+    popen = subprocess.Popen
+
+    class CountingPopen(popen):
+        def __init__(self, *args, **kwargs):
+            counter[0] += 1
+            super().__init__(*args, **kwargs)
+
+    subprocess.Popen = CountingPopen
+    return counter
+
+
+def run_child(module: str, args: list[str], env: dict[str, str], cwd: Path) -> dict:
+    """Run `python -m module *args` and return the JSON it prints on its last line.
+
+    `cwd` should be a temporary directory, so the TRACE log files (and local caches) stay
+    out of the project.
+    """
+    env = os.environ | DUMMY_ENV | env
+    env["PYTHONPATH"] = str(Path(__file__).parent.parent)
+    result = subprocess.run(
+        [sys.executable, "-m", module] + args,
+        env=env,
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{module} {args} failed:\n{result.stderr}")
+    return json.loads(result.stdout.splitlines()[-1])
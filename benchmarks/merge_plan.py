@@ -0,0 +1,102 @@
+"""Count git invocations of `merge_base_into_head` strategies on synthetic stacks.
+
+    python -m benchmarks.merge_plan [--sizes 10 50 200] [--legacy-max 50] [--json]
+
+Every (strategy, size) pair runs in a fresh synthetic repo and a fresh interpreter, where
+`subprocess.Popen` is wrapped to count every git process (including the batch ones).
+"""
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from tabulate import tabulate
+
+from benchmarks.harness import count_processes, run_child
+from benchmarks.synthetic_repo import create_stack_repo, stack_branch_names
+
+
+def run_strategy(strategy: str, depth: int) -> dict:
+    """Runs inside the child interpreter (LOCAL_REPO_PATH points to the synthetic repo)."""
+    counter = count_processes()
+
+    from src.models.types import BaseBranch, HeadBranch
+    from src.utils.git import _git_branch_merged, git_merge_branch_into
+    from src.utils.stack_plan import execute_merge_plan, plan_merge_base_into_head
+
+    branches = ["main"] + stack_branch_names(depth)
+    links = [
+        (BaseBranch(base), HeadBranch(head))
+        for base, head in zip(branches, branches[1:])
+    ]
+
+    start = time.perf_counter()
+    merges = 0
+    if strategy == "legacy":
+        # the loop `merge_base_into_head` used before the planner
+        for i in range(len(links) - 1, -1, -1):
+            if _git_branch_merged(*links[i]):
+                continue
+            for j in range(i, len(links)):
+                merges += git_merge_branch_into(*links[j])
+    else:
+        plan = plan_merge_base_into_head(links)
+        execute_merge_plan(plan)
+        merges = len(plan)
+    wall_time = time.perf_counter() - start
+
+    assert all(_git_branch_merged(*link) for link in links)
+    return {
+        "strategy": strategy,
+        "branches": depth,
+        "merges": merges,
+        "git_processes": counter[0],
+        "wall_time_s": round(wall_time, 3),
+    }
+
+
+def benchmark(strategy: str, depth: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = Path(tmp) / "repo"
+        create_stack_repo(repo, depth)
+        return run_child(
+            "benchmarks.merge_plan",
+            ["--child", strategy, str(depth)],
+            {"LOCAL_REPO_PATH": str(repo)},
+            cwd=Path(tmp),
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument(
+        "--legacy-max",
+        type=int,
+        default=50,
+        help="skip the quadratic legacy strategy on bigger stacks",
+    )
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_strategy(args.child[0], int(args.child[1]))))
+        return
+
+    results = []
+    for depth in args.sizes:
+        for strategy in ["legacy", "planner"]:
+            if strategy == "legacy" and depth > args.legacy_max:
+                continue
+            results.append(benchmark(strategy, depth))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(tabulate(results, headers="keys"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+"""Run every CLI entry point against a synthetic repo and a local GitHub stand-in.
+
+    python -m benchmarks.scenarios [--depth 20] [--branching 1] [--latency-ms 0]
+        [--rate-limit 5000] [--mutations-per-minute N] [--scenarios ...]
+        [--json] [--save FILE] [--check FILE]
+
+Each scenario runs in a fresh synthetic repo (with a bare `origin`), a fresh `FakeGitHub`
+and a fresh interpreter, and records its wall time (imports included), the number of git
+processes and the number of API requests (or the error it failed with). Prompts are
+answered with their first choice (or "yes").
+
+`--check FILE` compares the invocation counts with a previously `--save`d run of the same
+scenarios and exits with 1 if any of them grew (wall times are only reported); the
+default scenarios are checked by `--check benchmarks/baseline.json`.
+"""
+import argparse
+import json
+import re
+import socket
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from ruamel.yaml import YAML
+from tabulate import tabulate
+
+from benchmarks.fake_github import FakeGitHub
+from benchmarks.harness import DUMMY_ENV, count_processes, run_child
+from benchmarks.synthetic_repo import (
+    add_remote_activity,
+    create_stack_repo,
+    path_to_main,
+    stack_parents,
+    stack_spec,
+)
+
+SCENARIOS = [
+    "select_chain",
+    "merge_base_into_head",
+    "merge_base_into_head_dry_run",
+    "merge_base_into_head_all_chains",
+    "restack",
+    "restack_push",
+    "push",
+    "push_all_chains",
+    "status",
+    "status_daemon",
+    "fetch",
+    "create_prs",
+    "create_prs_reconcile",
+    "create_prs_tree",
+    "rename_prs",
+    "ask_for_prs_review",
+    "resync_prs",
+    "land",
+]
+CHECKED_COUNTS = ["git_processes", "api_requests"]
+
+
+class _Answer:
+    def __init__(self, value) -> None:
+        self.value = value
+
+    def ask(self):
+        return self.value
+
+
+def _answer_prompts() -> None:
+    import questionary
+
+    def select(message, choices, **kwargs):
+        return _Answer(choices[0])
+
+    questionary.select = select
+    questionary.confirm = lambda *args, **kwargs: _Answer(True)
+    questionary.text = lambda *args, default="", **kwargs: _Answer(default)
+
+
+def _start_daemon() -> None:
+    """Serve from a thread of the child interpreter (it stops with it)."""
+    from src.config import env_vars
+    from src.utils.daemon import StackDaemon
+
+    socket_path = Path(env_vars.DAEMON_SOCKET_PATH)
+    threading.Thread(target=StackDaemon(socket_path, 3600).serve, daemon=True).start()
+    while not socket_path.exists():
+        time.sleep(0.01)
+
+
+def run_scenario(scenario: str) -> dict:
+    """Runs inside the child interpreter."""
+    counter = count_processes()
+    _answer_prompts()
+
+    start = time.perf_counter()
+    if scenario == "select_chain":
+        from src.utils.gh import select_pr_chain_from_user_opened_prs
+
+        select_pr_chain_from_user_opened_prs()
+    elif scenario == "merge_base_into_head":
+        from src.cli.pr_chain_merge_base_into_head import pr_chain_merge_base_into_head
+
+        pr_chain_merge_base_into_head()
+    elif scenario == "merge_base_into_head_dry_run":
+        from src.cli.pr_chain_merge_base_into_head import pr_chain_merge_base_into_head
+
+        pr_chain_merge_base_into_head(dry_run=True)
+    elif scenario == "merge_base_into_head_all_chains":
+        from src.cli.pr_chain_merge_base_into_head import pr_chain_merge_base_into_head
+
+        pr_chain_merge_base_into_head(all_chains=True)
+    elif scenario == "restack":
+        from src.cli.pr_chain_restack import pr_chain_restack
+
+        pr_chain_restack()
+    elif scenario == "restack_push":
+        from src.cli.pr_chain_push import pr_chain_push
+        from src.cli.pr_chain_restack import pr_chain_restack
+
+        pr_chain_restack()
+        pr_chain_push(force_with_lease=True)
+    elif scenario == "push":
+        from src.cli.pr_chain_push import pr_chain_push
+
+        pr_chain_push()
+    elif scenario == "push_all_chains":
+        from src.cli.pr_chain_push import pr_chain_push
+
+        pr_chain_push(all_chains=True)
+    elif scenario == "status":
+        from src.cli.pr_chain_status import pr_chain_status
+
+        pr_chain_status()
+    elif scenario == "status_daemon":
+        from src.cli.pr_chain_status import pr_chain_status
+
+        _start_daemon()
+        pr_chain_status()  # the first request warms up the daemon's git state
+        counter[0] = 0
+        start = time.perf_counter()
+        pr_chain_status()
+    elif scenario == "fetch":
+        from src.cli.pr_chain_fetch import pr_chain_fetch
+
+        pr_chain_fetch()
+    elif scenario == "create_prs":
+        from src.cli.create_prs import create_prs_from_file
+
+        create_prs_from_file()
+    elif scenario == "create_prs_reconcile":
+        from src.cli.create_prs import create_prs_from_file
+
+        create_prs_from_file(reconcile=True)
+    elif scenario == "create_prs_tree":
+        from src.cli.create_prs import create_prs_from_file
+
+        create_prs_from_file()
+    elif scenario == "rename_prs":
+        from src.cli.rename_prs import rename_prs_chain
+
+        rename_prs_chain("[$1] $2", len(DUMMY_ENV["BRANCH_PREFIX"]) + 1)
+    elif scenario == "ask_for_prs_review":
+        from src.cli.ask_for_prs_review import ask_for_review_pr_chain
+
+        ask_for_review_pr_chain()
+    elif scenario == "resync_prs":
+        from src.cli.resync_prs import resync_prs
+
+        resync_prs()
+    elif scenario == "land":
+        from src.cli.land_pr_chain import land_pr_chain
+
+        land_pr_chain()
+    else:
+        raise ValueError(f"Unknown scenario: {scenario}")
+
+    return {
+        "wall_time_s": round(time.perf_counter() - start, 3),
+        "git_processes": counter[0],
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def _error(e: RuntimeError) -> str:
+    lines = str(e).splitlines()
+    errors = [line for line in lines if re.match(r"[\w.]+(Error|Exception): ", line)]
+    return errors[-1] if errors else lines[-1]
+
+
+def benchmark(scenario: str, args: argparse.Namespace) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = Path(tmp) / "repo"
+        branches = create_stack_repo(
+            repo, args.depth, branching=args.branching, origin=True
+        )
+        parents = stack_parents(branches, args.branching)
+        if scenario == "fetch":
+            add_remote_activity(Path(tmp) / "repo-origin.git", args.unrelated_branches)
+
+        env = {}
+        webhook_url = None
+        if scenario == "land":
+            # the landing is woken by webhooks of finished CI runs, polling rarely
+            env["WEBHOOK_PORT"] = str(_free_port())
+            env["WEBHOOK_SECRET"] = "benchmark"
+            env["LAND_POLL_SECONDS"] = "5"
+            webhook_url = f"http://127.0.0.1:{env['WEBHOOK_PORT']}"
+        server = FakeGitHub(
+            DUMMY_ENV["GITHUB_REPO"],
+            latency=args.latency_ms / 1000,
+            rate_limit=args.rate_limit,
+            mutations_per_minute=args.mutations_per_minute,
+            username=DUMMY_ENV["GITHUB_USERNAME"],
+            # landing merges into the bare origin, waiting for a simulated CI
+            git_dir=Path(tmp) / "repo-origin.git" if scenario == "land" else None,
+            ci_checks=args.ci_checks if scenario == "land" else 0,
+            webhook_url=webhook_url,
+            webhook_secret=env.get("WEBHOOK_SECRET"),
+        )
+        for branch in ["main"] + branches:
+            server.add_branch(branch)
+        if scenario in ["create_prs", "create_prs_reconcile"]:
+            # the longest stack, one branch per line
+            stack = path_to_main(branches[-1], parents)
+            (Path(tmp) / "branches").mkdir()
+            (Path(tmp) / "branches" / "stack.txt").write_text("\n".join(stack) + "\n")
+        if scenario == "create_prs_tree":
+            # a binary tree of all branches (whatever `--branching`), as a YAML spec
+            (Path(tmp) / "branches").mkdir()
+            YAML(typ="safe").dump(
+                stack_spec(stack_parents(branches, 2)),
+                Path(tmp) / "branches" / "tree.yaml",
+            )
+        if scenario == "create_prs_reconcile":
+            # a re-run after creating the first half of the stack failed
+            for base, head in list(zip(stack, stack[1:]))[: len(stack) // 2]:
+                server.add_pr(head, base)
+        elif scenario not in ["create_prs", "create_prs_tree"]:
+            for head, base in parents.items():
+                server.add_pr(head, base, approved=scenario == "land")
+
+        try:
+            result = run_child(
+                "benchmarks.scenarios",
+                ["--child", scenario],
+                {
+                    "LOCAL_REPO_PATH": str(repo),
+                    "GITHUB_API_URL": server.url,
+                    "GITHUB_MUTATIONS_PER_SECOND": str(args.mutations_per_second),
+                }
+                | env,
+                cwd=Path(tmp),
+            )
+        except RuntimeError as e:  # e.g. GitHub kept rate limiting
+            result = {"wall_time_s": None, "git_processes": None, "error": _error(e)}
+        finally:
+            server.close()
+        return {
+            "scenario": scenario,
+            "branches": args.depth,
+            "branching": args.branching,
+            **result,
+            **server.stats(),
+        }
+
+
+def _key(result: dict) -> tuple:
+    return result["scenario"], result["branches"], result["branching"]
+
+
+def check_regressions(results: list[dict], baseline: list[dict]) -> list[str]:
+    """Counts which grew compared to the baseline (or scenarios missing in it)."""
+    baseline_by_key = {_key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        expected = baseline_by_key.get(_key(result))
+        if expected is None:
+            regressions.append(f"{_key(result)}: not in the baseline")
+            continue
+        if "error" in result:
+            regressions.append(f"{_key(result)}: failed with {result['error']}")
+            continue
+        for count in CHECKED_COUNTS:
+            if result[count] > expected[count]:
+                regressions.append(
+                    f"{_key(result)}: {count} {expected[count]} -> {result[count]}"
+                )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--depth", type=int, default=20, help="number of branches")
+    parser.add_argument("--branching", type=int, default=1, help="1 == one stack")
+    parser.add_argument(
+        "--unrelated-branches",
+        type=int,
+        default=200,
+        help="branches of other people on origin (fetch scenario)",
+    )
+    parser.add_argument(
+        "--ci-checks",
+        type=int,
+        default=1,
+        help="reads of a PR for which CI runs after a push or retarget (land scenario)",
+    )
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--rate-limit", type=int, default=5000)
+    parser.add_argument("--mutations-per-minute", type=int, default=None)
+    parser.add_argument(
+        "--mutations-per-second",
+        type=float,
+        default=100,
+        help="client side pacing (GITHUB_MUTATIONS_PER_SECOND)",
+    )
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--save", type=Path, help="write results as a baseline")
+    parser.add_argument("--check", type=Path, help="fail if counts exceed a baseline")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_scenario(args.child)))
+        return
+
+    results = [benchmark(scenario, args) for scenario in args.scenarios]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        table = [
+            {key: value for key, value in result.items() if key != "api_routes"}
+            for result in results
+        ]
+        print(tabulate(table, headers="keys"))
+
+    if args.save:
+        args.save.write_text(json.dumps(results, indent=2) + "\n")
+    if args.check:
+        regressions = check_regressions(results, json.loads(args.check.read_text()))
+        if regressions:
+            print("Regressions:\n" + "\n".join(regressions), file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
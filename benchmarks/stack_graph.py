@@ -0,0 +1,116 @@
+"""Compare chain discovery on synthetic forests of PRs.
+
+    python -m benchmarks.stack_graph [--prs 10000] [--json]
+
+`legacy` is the recursive `get_pr_chains` that copied the chain at every step.
+"""
+import argparse
+import json
+import random
+import time
+from types import SimpleNamespace
+
+from tabulate import tabulate
+
+from src.utils.stack_graph import StackGraph
+
+
+def fake_pr(number: int, base: str, head: str) -> SimpleNamespace:
+    """Just the attributes chain discovery reads from a PullRequest."""
+    return SimpleNamespace(
+        number=number,
+        base=SimpleNamespace(label=f"owner:{base}"),
+        head=SimpleNamespace(label=f"owner:{head}"),
+    )
+
+
+def linear_stacks(prs: int, depth: int) -> list[SimpleNamespace]:
+    result = []
+    for i in range(prs):
+        position = i % depth
+        base = "main" if position == 0 else f"kz/b{i - 1:05d}"
+        result.append(fake_pr(i, base, f"kz/b{i:05d}"))
+    return result
+
+
+def branching_forest(prs: int, seed: int = 0) -> list[SimpleNamespace]:
+    """Forked stacks: every PR is based on `main` (5%) or on a random earlier PR."""
+    rng = random.Random(seed)
+    result = []
+    for i in range(prs):
+        if i == 0 or rng.random() < 0.05:
+            base = "main"
+        else:
+            base = f"kz/b{rng.randrange(max(0, i - 50), i):05d}"
+        result.append(fake_pr(i, base, f"kz/b{i:05d}"))
+    rng.shuffle(result)
+    return result
+
+
+def legacy_get_pr_chains(prs):
+    pr_dict = {pr.base.label: [] for pr in prs}
+    for pr in prs:
+        pr_dict[pr.base.label].append(pr)
+
+    def dfs(pr, chain, chains_dict):
+        chain.append(pr)
+        if pr.head.label in pr_dict:
+            for next_pr in pr_dict[pr.head.label]:
+                dfs(next_pr, list(chain), chains_dict)
+        else:
+            if len(chain) > 1 and (
+                pr.head.label not in chains_dict
+                or len(chain) > len(chains_dict[pr.head.label])
+            ):
+                chains_dict[pr.head.label] = chain
+
+    chains_dict = {}
+    for pr in prs:
+        dfs(pr, [], chains_dict)
+    return list(chains_dict.values())
+
+
+def measure(strategy: str, scenario: str, prs: list) -> dict:
+    result = {"scenario": scenario, "strategy": strategy, "prs": len(prs)}
+    start = time.perf_counter()
+    try:
+        if strategy == "legacy":
+            chains = legacy_get_pr_chains(prs)
+        else:
+            chains = StackGraph(prs).chains()
+    except RecursionError:
+        result |= {"chains": None, "time_s": None, "note": "RecursionError"}
+        return result
+    result |= {
+        "chains": len(chains),
+        "prs_in_chains": sum(len(chain) for chain in chains),
+        "time_s": round(time.perf_counter() - start, 4),
+    }
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--prs", type=int, default=10_000)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    scenarios = {
+        "stacks of 10": linear_stacks(args.prs, 10),
+        "stacks of 100": linear_stacks(args.prs, 100),
+        "one deep stack": linear_stacks(args.prs, args.prs),
+        "branching forest": branching_forest(args.prs),
+    }
+    results = []
+    for scenario, prs in scenarios.items():
+        for strategy in ["legacy", "stack_graph"]:
+            results.append(measure(strategy, scenario, prs))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(tabulate(results, headers="keys"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Measure the import cost of every CLI entry point with `python -X importtime`.
+
+    python -m benchmarks.startup [--json]
+
+Each module is imported in a fresh interpreter, with `GITHUB_API_URL` pointing to a local
+`FakeGitHub` (so any request made at import time is counted). Reports the cumulative
+import time, the GitHub requests and which heavy dependencies were actually loaded
+(lazily imported modules that were never used do not count).
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from tabulate import tabulate
+
+from benchmarks.fake_github import FakeGitHub
+from benchmarks.harness import DUMMY_ENV
+
+ENTRY_POINTS = [
+    "src.utils.git",  # what git-only code needs
+    "src.utils.pr_chain",
+    "src.cli.pr_chain_merge_base_into_head",
+    "src.cli.pr_chain_fetch",
+    "src.cli.pr_chain_push",
+    "src.cli.pr_chain_restack",
+    "src.cli.pr_chain_status",
+    "src.cli.create_prs",
+    "src.cli.rename_prs",
+    "src.cli.ask_for_prs_review",
+    "src.cli.resync_prs",
+    "src.cli.land_pr_chain",
+    "src.cli.daemon",
+]
+HEAVY_MODULES = [
+    "github",
+    "requests",
+    "questionary",
+    "tabulate",
+    "pydantic",
+    "ruamel.yaml",
+]
+# only LOCAL_REPO_PATH is given to git-only modules, to check they need no GitHub config
+GIT_ONLY = {"src.utils.git", "src.utils.pr_chain"}
+
+_CHILD = """
+import sys
+import {module}
+loaded = [
+    name for name in {heavy!r}
+    if name in sys.modules and type(sys.modules[name]).__name__ != "_LazyModule"
+]
+print("LOADED " + ",".join(loaded))
+"""
+
+
+def measure(module: str, server: FakeGitHub, cwd: Path) -> dict:
+    env = {"LOCAL_REPO_PATH": str(cwd), "PATH": os.environ.get("PATH", "")}
+    if module not in GIT_ONLY:
+        env |= DUMMY_ENV | {"GITHUB_API_URL": server.url}
+    env["PYTHONPATH"] = str(Path(__file__).parent.parent)
+    requests_before = sum(server.requests.values())
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            _CHILD.format(module=module, heavy=HEAVY_MODULES),
+        ],
+        env=env,
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    # "import time: self [us] | cumulative | imported package"
+    import_us = 0
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \| (\s*)(\S+)", line)
+        if match and match.group(3) == module and not match.group(2):
+            import_us = int(match.group(1))
+    loaded = result.stdout.split("LOADED ")[-1].strip()
+    return {
+        "module": module,
+        "import_ms": round(import_us / 1000, 1),
+        "api_requests": sum(server.requests.values()) - requests_before,
+        "heavy_modules_loaded": loaded.replace(",", ", ") or "-",
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    server = FakeGitHub(DUMMY_ENV["GITHUB_REPO"])
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            results = [measure(module, server, Path(tmp)) for module in ENTRY_POINTS]
+    finally:
+        server.close()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(tabulate(results, headers="keys"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import subprocess
+from pathlib import Path
+
+
+def stack_branch_names(depth: int, prefix: str = "kz/b") -> list[str]:
+    return [f"{prefix}{i:03d}" for i in range(1, depth + 1)]
+
+
+def stack_parents(branches: list[str], branching: int = 1) -> dict[str, str]:
+    """Base branch of every branch: one stack for `branching == 1`, otherwise a tree in
+    which `main` and every branch have up to `branching` branches based on them."""
+    names = ["main"] + branches
+    return {names[i]: names[(i - 1) // branching] for i in range(1, len(names))}
+
+
+def path_to_main(branch: str, parents: dict[str, str]) -> list[str]:
+    """Branches from `main` to `branch` (both included)."""
+    path = [branch]
+    while path[-1] != "main":
+        path.append(parents[path[-1]])
+    return path[::-1]
+
+
+def stack_spec(parents: dict[str, str]) -> dict:
+    """Stack spec (see `load_stack_spec`) of a tree: the first branch based on a branch
+    continues its stack, the others fork sub-stacks from it."""
+    children: dict[str, list[str]] = {}
+    for head, base in parents.items():
+        children.setdefault(base, []).append(head)
+
+    def stack(branch: str) -> list:
+        items: list = []
+        while True:
+            forks = [stack(fork) for fork in children.get(branch, [])[1:]]
+            items.append({branch: forks} if forks else branch)
+            if branch not in children:
+                return items
+            branch = children[branch][0]
+
+    return {
+        "stacks": [
+            {"base": "main", "branches": stack(first)} for first in children["main"]
+        ]
+    }
+
+
+def _fast_import_commit(
+    ref: str, mark: int, parent: int | str | None, message: str, path: str, content: str
+) -> str:
+    """One commit of a `git fast-import` stream (`parent` is a mark or an existing ref)."""
+    lines = [
+        f"commit {ref}",
+        f"mark :{mark}",
+        f"committer Bench <bench@example.com> {1700000000 + mark} +0000",
+        f"data {len(message)}",
+        message,
+    ]
+    if isinstance(parent, int):
+        lines.append(f"from :{parent}")
+    elif parent is not None:
+        lines.append(f"from {parent}^0")
+    lines += [f"M 644 inline {path}", f"data {len(content)}", content, ""]
+    return "\n".join(lines) + "\n"
+
+
+def _fast_import(path: Path, stream: str, marks: Path) -> None:
+    subprocess.run(
+        [
+            "git",
+            "-C",
+            str(path),
+            "fast-import",
+            "--quiet",
+            f"--import-marks-if-exists={marks}",
+            f"--export-marks={marks}",
+        ],
+        input=stream.encode(),
+        check=True,
+    )
+
+
+def create_stack_repo(
+    path: Path,
+    depth: int,
+    all_links_stale: bool = True,
+    branching: int = 1,
+    origin: bool = False,
+) -> list[str]:
+    """Create a git repo at `path` with a stack `main <- kz/b001 <- ... <- kz/bNNN`
+    (or a tree of stacks, see `stack_parents`).
+
+    Afterwards `main` gets a new commit and, if `all_links_stale`, so does every branch of
+    the stack (e.g. review fixes), so no link has its base merged. With `origin`, a bare
+    `<path>-origin.git` is added as `origin` (tracked by every branch) before these new
+    commits, so they are not pushed yet. Everything is written by `git fast-import`, so
+    even 200-branch stacks take a moment to create. Return the branch names of the stack.
+    """
+    branches = stack_branch_names(depth)
+    parents = stack_parents(branches, branching)
+    marks = path.parent / f"{path.name}.marks"
+    subprocess.run(["git", "init", "-q", "-b", "main", str(path)], check=True)
+
+    stream = _fast_import_commit("refs/heads/main", 1, None, "init", "main.txt", "0\n")
+    tips = {"main": 1}
+    mark = 1
+    for branch in branches:
+        mark += 1
+        stream += _fast_import_commit(
+            f"refs/heads/{branch}",
+            mark,
+            tips[parents[branch]],
+            f"Add {branch}",
+            f"{branch}.txt",
+            "0\n",
+        )
+        tips[branch] = mark
+    _fast_import(path, stream, marks)
+
+    if origin:
+        origin_path = path.parent / f"{path.name}-origin.git"
+        subprocess.run(["git", "init", "-q", "--bare", str(origin_path)], check=True)
+        subprocess.run(
+            ["git", "-C", str(path), "remote", "add", "origin", str(origin_path)],
+            check=True,
+        )
+        subprocess.run(
+            ["git", "-C", str(path), "push", "-q", "-u", "origin", "--all"], check=True
+        )
+
+    stream = ""
+    for branch in ["main"] + (branches if all_links_stale else []):
+        mark += 1
+        stream += _fast_import_commit(
+            f"refs/heads/{branch}",
+            mark,
+            tips[branch],
+            f"Update {branch}",
+            f"{branch}.txt",
+            "1\n",
+        )
+        tips[branch] = mark
+    _fast_import(path, stream, marks)
+    marks.unlink()
+
+    subprocess.run(["git", "-C", str(path), "reset", "-q", "--hard"], check=True)
+    for key, value in [("user.name", "Bench"), ("user.email", "bench@example.com")]:
+        subprocess.run(["git", "-C", str(path), "config", key, value], check=True)
+    return branches
+
+
+def add_remote_activity(
+    origin_path: Path, unrelated_branches: int, file_size: int = 10_000
+) -> None:
+    """Simulate other people pushing to a monorepo origin (see `create_stack_repo`):
+    `main` gets a new commit and `unrelated_branches` branches with a file of
+    `file_size` bytes each are created, none of which the stack needs."""
+    marks = origin_path.parent / f"{origin_path.name}.marks"
+    stream = _fast_import_commit(
+        "refs/heads/main", 1, "refs/heads/main", "Remote update", "remote.txt", "1\n"
+    )
+    for i in range(1, unrelated_branches + 1):
+        stream += _fast_import_commit(
+            f"refs/heads/other/u{i:04d}",
+            i + 1,
+            "refs/heads/main",
+            f"Unrelated {i}",
+            f"other/u{i:04d}.txt",
+            f"{i}\n" * (file_size // (len(str(i)) + 1)),
+        )
+    _fast_import(origin_path, stream, marks)
+    marks.unlink()
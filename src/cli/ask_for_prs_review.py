@@ -1,12 +1,19 @@
 from src.config.logger import logger
-from src.utils.gh import ask_for_review, select_pr_chain_from_user_opened_prs
+from src.utils.gh import (
+    ask_for_review_prs,
+    log_estimated_api_cost,
+    select_pr_chain_from_user_opened_prs,
+)
+from src.utils.metrics import command, run_cli
 
 
+@command
 def ask_for_review_pr_chain() -> None:
     chain = select_pr_chain_from_user_opened_prs()
 
-    for pr in chain:
-        ask_for_review(pr)
+    log_estimated_api_cost(reads=0, mutations=len(chain))
+
+    ask_for_review_prs(chain)
 
     logger.warning(
         "Don't forget to remove DRAFT status from PRs. (try selecting many PRs in GUI and then mark all at once as 'open')"
@@ -14,6 +21,4 @@ def ask_for_review_pr_chain() -> None:
 
 
 if __name__ == "__main__":
-    ask_for_review_pr_chain()
-
-    pass
+    run_cli(ask_for_review_pr_chain)
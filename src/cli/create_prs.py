@@ -1,14 +1,39 @@
-from src.utils.gh import create_gh_prs
-from src.utils.other import create_pr_blueprints_from_branches
-from src.utils.read_files import find_branches_file, load_branches_from_file
+import sys
 
+from src.utils.gh import create_gh_prs, reconcile_gh_prs
+from src.utils.metrics import command, run_cli
+from src.utils.other import (
+    create_pr_blueprints_from_branches,
+    create_pr_blueprints_from_spec,
+)
+from src.utils.read_files import (
+    SPEC_SUFFIXES,
+    find_branches_file,
+    load_branches_from_file,
+    load_stack_spec,
+)
 
-def create_prs_from_file() -> None:
+
+@command
+def create_prs_from_file(reconcile: bool = False, fix_titles: bool = False) -> None:
+    """Create PRs of a stack of branches (`*.txt`) or of a tree of stacks (YAML spec).
+    With `--reconcile`, only missing PRs are created and existing ones retargeted (and
+    renamed with `--fix-titles`), so it can be re-run safely."""
     file = find_branches_file()
-    branches = load_branches_from_file(file)
-    pr_blueprints = create_pr_blueprints_from_branches(branches)
-    create_gh_prs(pr_blueprints)
+    if file.suffix in SPEC_SUFFIXES:
+        pr_blueprints = create_pr_blueprints_from_spec(load_stack_spec(file))
+    else:
+        branches = load_branches_from_file(file)
+        pr_blueprints = create_pr_blueprints_from_branches(branches)
+    if reconcile:
+        reconcile_gh_prs(pr_blueprints, fix_titles=fix_titles)
+    else:
+        create_gh_prs(pr_blueprints)
 
 
 if __name__ == "__main__":
-    create_prs_from_file()
+    run_cli(
+        create_prs_from_file,
+        "--reconcile" in sys.argv[1:],
+        "--fix-titles" in sys.argv[1:],
+    )
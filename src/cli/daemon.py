@@ -0,0 +1,28 @@
+import sys
+from pathlib import Path
+
+from src.config import env_vars
+from src.config.logger import logger
+from src.utils import daemon_client
+from src.utils.daemon import StackDaemon
+
+
+def daemon(stop: bool = False) -> None:
+    """Serve chain commands (status, fetch, merge, restack, push) from warm state until
+    stopped with `--stop`; the CLI commands use it whenever it is running."""
+    assert env_vars.DAEMON_SOCKET_PATH, "DAEMON_SOCKET_PATH is empty"
+    if stop:
+        if not daemon_client.running():
+            logger.info("No daemon is running")
+            return
+        daemon_client.request({"op": "stop"})
+        logger.info("Daemon stopping")
+        return
+
+    StackDaemon(
+        Path(env_vars.DAEMON_SOCKET_PATH), env_vars.DAEMON_REFRESH_SECONDS
+    ).serve()
+
+
+if __name__ == "__main__":
+    daemon("--stop" in sys.argv[1:])
@@ -0,0 +1,40 @@
+from src.config import env_vars
+from src.config.logger import logger
+from src.utils.gh import log_estimated_api_cost, select_pr_chain_from_user_opened_prs
+from src.utils.gh_watch import WebhookReceiver
+from src.utils.land import land_chain
+from src.utils.lazy import lazy_import
+from src.utils.metrics import command, run_cli
+
+q = lazy_import("questionary")
+
+
+@command
+def land_pr_chain() -> None:
+    chain = select_pr_chain_from_user_opened_prs()
+
+    # per PR: merge, retarget of the next one
+    log_estimated_api_cost(reads=0, mutations=2 * len(chain))
+    if not q.confirm(
+        f"Merge {len(chain)} PRs ({', '.join(f'#{pr.number}' for pr in chain)}) "
+        "one after another once each is ready?",
+        default=False,
+        auto_enter=True,
+    ).ask():
+        logger.info("Aborting")
+        return
+
+    webhook_receiver = None
+    if env_vars.WEBHOOK_PORT:
+        webhook_receiver = WebhookReceiver(
+            int(env_vars.WEBHOOK_PORT), env_vars.WEBHOOK_SECRET or None
+        )
+    try:
+        land_chain(chain, webhook_receiver)
+    finally:
+        if webhook_receiver is not None:
+            webhook_receiver.close()
+
+
+if __name__ == "__main__":
+    run_cli(land_pr_chain)
@@ -1,13 +1,36 @@
-from src.config.logger import logger
-from src.utils.gh import select_pr_chain_from_user_opened_prs
-from src.utils.pr_chain import merge_base_into_head
+import sys
 
+from src.utils import daemon_client
+from src.utils.lazy import lazy_import
+from src.utils.metrics import command, run_cli
 
-def pr_chain_merge_base_into_head() -> None:
-    chain = select_pr_chain_from_user_opened_prs()
+gh = lazy_import("src.utils.gh")
+pr_chain = lazy_import("src.utils.pr_chain")
 
-    merge_base_into_head(chain)
+
+@command
+def pr_chain_merge_base_into_head(
+    dry_run: bool = False, all_chains: bool = False
+) -> None:
+    if all_chains:
+        assert not dry_run, "--all-chains has no dry run"
+        pr_chain.merge_base_into_head_all_chains(
+            gh.get_pr_chains(gh.get_user_opened_prs())
+        )
+        return
+
+    if daemon_client.running():
+        daemon_client.run_chain_command("merge_base_into_head", dry_run=dry_run)
+        return
+
+    chain = gh.select_pr_chain_from_user_opened_prs()
+
+    pr_chain.merge_base_into_head(chain, dry_run=dry_run)
 
 
 if __name__ == "__main__":
-    pr_chain_merge_base_into_head()
+    run_cli(
+        pr_chain_merge_base_into_head,
+        "--dry-run" in sys.argv[1:],
+        "--all-chains" in sys.argv[1:],
+    )
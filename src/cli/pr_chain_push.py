@@ -1,13 +1,32 @@
-from src.config.logger import logger
-from src.utils.gh import select_pr_chain_from_user_opened_prs
-from src.utils.pr_chain import push
+import sys
 
+from src.utils import daemon_client
+from src.utils.lazy import lazy_import
+from src.utils.metrics import command, run_cli
 
-def pr_chain_push() -> None:
-    chain = select_pr_chain_from_user_opened_prs()
+gh = lazy_import("src.utils.gh")
+pr_chain = lazy_import("src.utils.pr_chain")
 
-    push(chain)
+
+@command
+def pr_chain_push(all_chains: bool = False, force_with_lease: bool = False) -> None:
+    if all_chains:
+        assert not force_with_lease, "--all-chains never forces a push"
+        pr_chain.push_all_chains(gh.get_pr_chains(gh.get_user_opened_prs()))
+        return
+
+    if daemon_client.running():
+        daemon_client.run_chain_command("push", force_with_lease=force_with_lease)
+        return
+
+    chain = gh.select_pr_chain_from_user_opened_prs()
+
+    pr_chain.push(chain, force_with_lease=force_with_lease)
 
 
 if __name__ == "__main__":
-    pr_chain_push()
+    run_cli(
+        pr_chain_push,
+        "--all-chains" in sys.argv[1:],
+        "--force-with-lease" in sys.argv[1:],
+    )
@@ -0,0 +1,23 @@
+from src.config.logger import logger
+from src.utils import daemon_client
+from src.utils.lazy import lazy_import
+from src.utils.metrics import command, run_cli
+
+gh = lazy_import("src.utils.gh")
+pr_chain = lazy_import("src.utils.pr_chain")
+
+
+@command
+def pr_chain_restack() -> None:
+    if daemon_client.running():
+        daemon_client.run_chain_command("restack")
+    else:
+        chain = gh.select_pr_chain_from_user_opened_prs()
+
+        pr_chain.restack(chain)
+
+    logger.info("Push the chain with `pr_chain_push --force-with-lease`")
+
+
+if __name__ == "__main__":
+    run_cli(pr_chain_restack)
@@ -0,0 +1,29 @@
+import json
+import sys
+
+from src.config.logger import logger
+from src.utils import daemon_client
+from src.utils.lazy import lazy_import
+from src.utils.metrics import command, run_cli
+
+gh = lazy_import("src.utils.gh")
+pr_chain = lazy_import("src.utils.pr_chain")
+
+
+@command
+def pr_chain_status(as_json: bool = False) -> None:
+    """Show how far every PR of a chain is ahead of / behind its base and origin
+    (`--json` prints the same rows as JSON on stdout)."""
+    if daemon_client.running():
+        rows = daemon_client.run_chain_command("status")
+    else:
+        rows = pr_chain.chain_status(gh.select_pr_chain_from_user_opened_prs())
+
+    if as_json:
+        print(json.dumps(rows, indent=2))
+    else:
+        logger.info("Chain status: \n" + pr_chain.format_chain_status(rows))
+
+
+if __name__ == "__main__":
+    run_cli(pr_chain_status, "--json" in sys.argv[1:])
@@ -0,0 +1,16 @@
+from src.config.logger import logger
+from src.utils.gh import pr_store, refresh_pr_store
+from src.utils.metrics import command, run_cli
+
+
+@command
+def resync_prs() -> None:
+    """Rebuild the local PR store from scratch."""
+    refresh_pr_store(full=True)
+    logger.info(
+        f"Stored {len(pr_store().load())} open PRs in {len(pr_store().chains())} chains"
+    )
+
+
+if __name__ == "__main__":
+    run_cli(resync_prs)
@@ -1,24 +1,125 @@
 import os
+from collections.abc import Callable
+from typing import Any
 
-from dotenv import load_dotenv
+_dotenv_loaded = False
 
-load_dotenv()
+
+def _load_dotenv() -> None:
+    global _dotenv_loaded
+    if not _dotenv_loaded:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        _dotenv_loaded = True
 
 
 def get_env(name: str) -> str:
+    _load_dotenv()
     env = os.getenv(name)
     assert env is not None
     assert len(env) > 0
     return env
 
 
-GITHUB_ACCESS_TOKEN = get_env("GITHUB_ACCESS_TOKEN")
-LOCAL_REPO_PATH = get_env("LOCAL_REPO_PATH")
-GITHUB_REPO = get_env("GITHUB_REPO")
-GITHUB_USERNAME = get_env("GITHUB_USERNAME")
+def get_env_or_default(name: str, default: str) -> str:
+    _load_dotenv()
+    env = os.getenv(name)
+    if not env:
+        return default
+    return env
+
+
+def _reviewers() -> list[str]:
+    reviewers = get_env("REVIEWERS").split(",")
+    assert len(reviewers) > 0
+    return reviewers
+
+
+def _branch_prefix() -> str:
+    branch_prefix = get_env("BRANCH_PREFIX")
+    assert len(branch_prefix) > 0
+    return branch_prefix
+
+
+# Variables are read (and asserted) on first access, e.g. by
+# `from src.config.env_vars import LOCAL_REPO_PATH`, so every command only needs the
+# configuration of the modules it imports (git-only code never needs a GitHub token).
+_VARIABLES: dict[str, Callable[[], Any]] = {
+    "GITHUB_ACCESS_TOKEN": lambda: get_env("GITHUB_ACCESS_TOKEN"),
+    "LOCAL_REPO_PATH": lambda: get_env("LOCAL_REPO_PATH"),
+    "GITHUB_REPO": lambda: get_env("GITHUB_REPO"),
+    "GITHUB_API_URL": lambda: get_env_or_default(
+        "GITHUB_API_URL", "https://api.github.com"
+    ),
+    "GITHUB_USERNAME": lambda: get_env("GITHUB_USERNAME"),
+    "GITHUB_CACHE_PATH": lambda: get_env_or_default(
+        "GITHUB_CACHE_PATH", ".cache/github.sqlite3"
+    ),
+    # 0 = off
+    "GITHUB_CACHE_MAX_MB": lambda: int(get_env_or_default("GITHUB_CACHE_MAX_MB", "64")),
+    # seconds
+    "GITHUB_CACHE_TTL": lambda: float(get_env_or_default("GITHUB_CACHE_TTL", "0")),
+    "GITHUB_MUTATIONS_PER_SECOND": lambda: float(
+        get_env_or_default("GITHUB_MUTATIONS_PER_SECOND", "1")
+    ),
+    "GITHUB_MUTATIONS_BURST": lambda: int(
+        get_env_or_default("GITHUB_MUTATIONS_BURST", "10")
+    ),
+    "STACK_STORE_PATH": lambda: get_env_or_default(
+        "STACK_STORE_PATH", ".cache/stacks.sqlite3"
+    ),
+    "WORKTREE_HASH_CACHE_PATH": lambda: get_env_or_default(
+        "WORKTREE_HASH_CACHE_PATH", ".cache/worktree_hashes.sqlite3"
+    ),
+    # TRACE has every git call with its output; DEBUG or above never formats them
+    "LOG_FILE_LEVEL": lambda: get_env_or_default("LOG_FILE_LEVEL", "TRACE"),
+    # level of git calls and their output; output which is only logged is not even
+    # captured when no sink logs this level
+    "GIT_LOG_LEVEL": lambda: get_env_or_default("GIT_LOG_LEVEL", "TRACE"),
+    # 1 = write the log file from a background thread
+    "LOG_ENQUEUE": lambda: get_env_or_default("LOG_ENQUEUE", "1") == "1",
+    # a log file is rotated when it reaches this size or age, 0 = never
+    "LOG_ROTATION_MB": lambda: float(get_env_or_default("LOG_ROTATION_MB", "20")),
+    "LOG_ROTATION_HOURS": lambda: float(get_env_or_default("LOG_ROTATION_HOURS", "24")),
+    # number of log files kept (of all runs), 0 = all
+    "LOG_RETENTION": lambda: int(get_env_or_default("LOG_RETENTION", "20")),
+    # worktrees used by `--all-chains`, one per worker, kept between runs
+    "WORKTREE_POOL_PATH": lambda: get_env_or_default(
+        "WORKTREE_POOL_PATH", ".cache/worktrees"
+    ),
+    "ALL_CHAINS_WORKERS": lambda: int(
+        get_env_or_default("ALL_CHAINS_WORKERS", str(min(4, os.cpu_count() or 1)))
+    ),
+    # "merge", "squash" or "rebase"
+    "LAND_MERGE_METHOD": lambda: get_env_or_default("LAND_MERGE_METHOD", "merge"),
+    # seconds between readiness checks while landing (doubling while nothing changes)
+    "LAND_POLL_SECONDS": lambda: float(get_env_or_default("LAND_POLL_SECONDS", "5")),
+    # local port of a webhook receiver waking the landing on GitHub events (it has to
+    # be reachable by GitHub, e.g. via `gh webhook forward`), "" = polling only
+    "WEBHOOK_PORT": lambda: get_env_or_default("WEBHOOK_PORT", ""),
+    # secret of the webhook, "" = signatures are not checked
+    "WEBHOOK_SECRET": lambda: get_env_or_default("WEBHOOK_SECRET", ""),
+    # socket of `python -m src.cli.daemon`, "" = always run commands in-process
+    "DAEMON_SOCKET_PATH": lambda: get_env_or_default(
+        "DAEMON_SOCKET_PATH", ".cache/daemon.sock"
+    ),
+    # seconds between refreshes of the daemon's PRs (chains are selected from them)
+    "DAEMON_REFRESH_SECONDS": lambda: float(
+        get_env_or_default("DAEMON_REFRESH_SECONDS", "60")
+    ),
+    # e.g. "gz", "zip", "" = none
+    "LOG_COMPRESSION": lambda: get_env_or_default("LOG_COMPRESSION", "gz"),
+    # "" = no trace
+    "METRICS_TRACE_PATH": lambda: get_env_or_default("METRICS_TRACE_PATH", ""),
+    "REVIEWERS": _reviewers,
+    "BRANCH_PREFIX": _branch_prefix,
+}
 
-REVIEWERS = get_env("REVIEWERS").split(",")
-BRANCH_PREFIX = get_env("BRANCH_PREFIX")
 
-assert len(REVIEWERS) > 0
-assert len(BRANCH_PREFIX) > 0
+def __getattr__(name: str) -> Any:
+    if name not in _VARIABLES:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    value = _VARIABLES[name]()
+    globals()[name] = value  # read once
+    return value
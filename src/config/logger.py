@@ -1,7 +1,13 @@
 import sys
+import time
+from collections.abc import Callable
+from typing import Any
 
 from loguru import logger
 
+from src.config import env_vars
+
+STDERR_LEVEL = "DEBUG"
 logger_format_stderr = (
     "<green>{time:HH:mm:ss}</green> " "<level>{level: <8}</level>| " "{message}"
 )
@@ -11,6 +17,42 @@ logger_format_file = (
     "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> | "
     "<level>{message}</level>"
 )
+
+
+def rotation(max_mb: float, max_hours: float) -> Callable[[Any, Any], bool]:
+    """Rotate a log file once it reaches `max_mb` or `max_hours` (0 = no limit)."""
+    opened: dict[str, float] = {}
+
+    def should_rotate(message: Any, file: Any) -> bool:
+        started = opened.setdefault(file.name, time.time())
+        if max_mb and file.tell() + len(message) > max_mb * 2**20:
+            return True
+        return bool(max_hours) and time.time() - started > max_hours * 3600
+
+    return should_rotate
+
+
+def is_logged(level: str) -> bool:
+    """Whether messages of `level` reach any sink (so it is worth producing them)."""
+    lowest = min(
+        logger.level(STDERR_LEVEL).no, logger.level(env_vars.LOG_FILE_LEVEL).no
+    )
+    return logger.level(level).no >= lowest
+
+
 logger.remove()
-logger.add(sys.stderr, format=logger_format_stderr, level="DEBUG")
-logger.add("logs/file_{time}.log", format=logger_format_file, level="TRACE")
+logger.add(sys.stderr, format=logger_format_stderr, level=STDERR_LEVEL)
+# The file is only created once something is logged (not by merely importing the
+# logger). With `enqueue`, messages are written by a background thread (flushed at exit).
+# Messages below every sink's level are dropped before being formatted, so expensive
+# ones (e.g. git output) are logged lazily: `logger.opt(lazy=True).trace("{}", f)`.
+logger.add(
+    "logs/file_{time}.log",
+    format=logger_format_file,
+    level=env_vars.LOG_FILE_LEVEL,
+    delay=True,
+    enqueue=env_vars.LOG_ENQUEUE,
+    rotation=rotation(env_vars.LOG_ROTATION_MB, env_vars.LOG_ROTATION_HOURS),
+    retention=env_vars.LOG_RETENTION or None,
+    compression=env_vars.LOG_COMPRESSION or None,
+)
@@ -1,11 +1,35 @@
+import importlib
 import re
-from typing import TypedDict
-
-from github.PullRequest import PullRequest
-from pydantic import BaseModel
+from typing import TYPE_CHECKING, Any, TypedDict
 
 from src.models.types.branch import *
 
+if TYPE_CHECKING:
+    from github.PullRequest import PullRequest
+
+    from src.models.types.plans import (
+        MergeStep,
+        PullRequestBlueprint,
+        PullRequestChange,
+    )
+
+# names imported on first use, so that importing the light types (branches, commits)
+# loads neither pydantic nor PyGithub
+_LAZY_NAMES = {
+    "PullRequest": "github.PullRequest",
+    "PullRequestBlueprint": "src.models.types.plans",
+    "MergeStep": "src.models.types.plans",
+    "PullRequestChange": "src.models.types.plans",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY_NAMES:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    value = getattr(importlib.import_module(_LAZY_NAMES[name]), name)
+    globals()[name] = value
+    return value
+
 
 class Commit(str):
     def __new__(cls, commit_hash):
@@ -19,13 +43,7 @@ class Commit(str):
         return bool(re.match(r"^[0-9a-f]{40}$", commit_hash))
 
 
-class PullRequestBlueprint(BaseModel):
-    head: Branch  # source
-    base: Branch  # target
-    title: str
-
-
-class PRChain(list[PullRequest]):
+class PRChain(list["PullRequest"]):
     pass
 
 
@@ -0,0 +1,25 @@
+from pydantic import BaseModel
+
+from src.models.types.branch import BaseBranch, Branch, HeadBranch
+
+
+class PullRequestBlueprint(BaseModel):
+    head: Branch  # source
+    base: Branch  # target
+    title: str
+
+
+class PullRequestChange(BaseModel):
+    """What reconciling a blueprint takes: creating its PR (`number` is None) or editing
+    fields (`base`, `title`) of its open PR."""
+
+    blueprint: PullRequestBlueprint
+    number: int | None = None
+    edit: dict[str, str] = {}
+
+
+class MergeStep(BaseModel):
+    """Merge `base` into `head` (one link of a PR chain)."""
+
+    base: BaseBranch
+    head: HeadBranch
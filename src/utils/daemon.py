@@ -0,0 +1,194 @@
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from github.PullRequest import PullRequest
+
+from src.config import env_vars
+from src.config.logger import logger
+from src.models.types import Branch, PRChain
+from src.utils import metrics
+from src.utils.gh import _stored_prs, chain_label, refresh_chain, refresh_pr_store
+from src.utils.git import git_session
+from src.utils.pr_chain import chain_status, fetch, merge_base_into_head, push, restack
+from src.utils.stack_graph import StackGraph
+
+Send = Callable[[dict[str, Any]], None]
+
+# commands run on a chain selected by the client, with their options as keywords;
+# what they return is sent back as the result (it must be JSON serializable)
+CHAIN_COMMANDS: dict[str, Callable[..., Any]] = {
+    "status": chain_status,
+    "fetch": fetch,
+    "merge_base_into_head": merge_base_into_head,
+    "restack": restack,
+    "push": push,
+}
+# commands changing branches run on their chain as it is on GitHub right now
+MUTATING_COMMANDS = {"merge_base_into_head", "restack", "push"}
+
+
+class StackDaemon:
+    """Serves chain commands over a Unix socket, from state kept warm between them: the
+    GitHub client, the PRs and their stack graph, and the git batch processes.
+
+    Chains are served from the PRs as of the last refresh, which runs in the background
+    every `refresh_seconds`, so selecting a chain and reading its status cost no request.
+    Before a command changing branches, only the PRs of its chain are re-fetched (with
+    conditional requests), so it runs on the chain as it is on GitHub. Commands run one
+    at a time, as git state (ref snapshot, session) is per process.
+    """
+
+    def __init__(self, socket_path: Path, refresh_seconds: float) -> None:
+        self.socket_path = socket_path
+        self.refresh_seconds = refresh_seconds
+        self.repo_path = str(Path(env_vars.LOCAL_REPO_PATH).resolve())
+        self.prs: dict[int, PullRequest] = {}
+        self.graph = StackGraph([])
+        self.refreshed_at = 0.0
+        self._state_lock = threading.Lock()
+        self._command_lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def refresh(self) -> None:
+        refresh_pr_store()
+        prs = _stored_prs()
+        with self._state_lock:
+            self.prs = {pr.number: pr for pr in prs}
+            self.graph = StackGraph(prs)
+            self.refreshed_at = time.time()
+
+    def _refresh_loop(self) -> None:
+        while not self._stopped.wait(self.refresh_seconds):
+            try:
+                self.refresh()
+            except Exception as e:  # the daemon keeps serving its last known PRs
+                logger.warning(f"Refreshing PRs failed: {type(e).__name__}: {e}")
+
+    def handle(self, request: dict[str, Any], send: Send) -> Any:
+        """Answer one request; log messages of a command are sent as they are logged."""
+        op = request["op"]
+        if op == "ping":
+            return {
+                "pid": os.getpid(),
+                "repo": self.repo_path,
+                "refreshed_at": self.refreshed_at,
+            }
+        if op == "chains":
+            with self._state_lock:
+                graph = self.graph
+            branch = request.get("branch")
+            if branch:
+                chains = graph.chains_containing(Branch(branch))
+            else:
+                chains = graph.chains()
+            return [
+                {"label": chain_label(chain), "prs": [pr.number for pr in chain]}
+                for chain in chains
+            ]
+        if op == "run":
+            return self._run(request, send)
+        if op == "stop":
+            self._stopped.set()
+            return "stopping"
+        raise ValueError(f"Unknown request: {op}")
+
+    def _run(self, request: dict[str, Any], send: Send) -> Any:
+        run = CHAIN_COMMANDS[request["command"]]
+        with self._state_lock:
+            prs = self.prs
+        chain = PRChain(prs[number] for number in request["prs"] if number in prs)
+        if not chain or chain_label(chain) != request["label"]:
+            raise ValueError(
+                "Selected chain has changed in the meantime, select it again"
+            )
+        if request["command"] in MUTATING_COMMANDS:
+            try:
+                chain = refresh_chain(chain)
+            except ValueError:
+                self.refresh()  # so that the chain is selected again as it is now
+                raise
+
+        thread_id = threading.get_ident()
+        sink = logger.add(
+            lambda message: send(
+                {
+                    "log": message.record["level"].name,
+                    "message": message.record["message"],
+                }
+            ),
+            level="DEBUG",
+            format="{message}",
+            filter=lambda record: record["thread"].id == thread_id,
+        )
+        try:
+            with self._command_lock:
+                logger.info(f"Running {request['command']} on {request['label']}")
+                result = metrics.command(run)(chain, **request.get("options", {}))
+                logger.debug("Metrics: \n" + metrics.summary())
+                metrics.clear()
+                return result
+        finally:
+            logger.remove(sink)
+
+    def serve(self) -> None:
+        """Serve until a client sends `stop` (or the process is interrupted)."""
+        if self.socket_path.exists():
+            with socket.socket(socket.AF_UNIX) as probe:
+                try:
+                    probe.connect(str(self.socket_path))
+                    raise Exception(f"A daemon is already serving {self.socket_path}")
+                except ConnectionRefusedError:
+                    self.socket_path.unlink()  # left over by a killed daemon
+
+        self.refresh()
+        git_session()  # started now, not by the first command
+        logger.info(f"Loaded {len(self.prs)} PRs of {env_vars.GITHUB_REPO}")
+
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        server = _Server(str(self.socket_path), self)
+        os.chmod(self.socket_path, 0o600)  # it can push branches on behalf of the user
+        threading.Thread(target=self._refresh_loop, daemon=True).start()
+        threading.Thread(
+            target=lambda: (self._stopped.wait(), server.shutdown()), daemon=True
+        ).start()
+        logger.info(f"Daemon serving {self.repo_path} on {self.socket_path}")
+        try:
+            server.serve_forever()
+        finally:
+            self._stopped.set()
+            server.server_close()
+            self.socket_path.unlink(missing_ok=True)
+            logger.info("Daemon stopped")
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """One request per connection: a JSON line in; JSON lines out, `{"log": ...}` while
+    the request runs and finally `{"result": ...}` or `{"error": ...}`."""
+
+    server: "_Server"
+
+    def handle(self) -> None:
+        def send(message: dict[str, Any]) -> None:
+            self.wfile.write((json.dumps(message) + "\n").encode())
+
+        try:
+            request = json.loads(self.rfile.readline())
+            send({"result": self.server.stack_daemon.handle(request, send)})
+        except Exception as e:
+            logger.warning(f"Request failed: {type(e).__name__}: {e}")
+            send({"error": f"{type(e).__name__}: {e}"})
+
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, stack_daemon: StackDaemon) -> None:
+        self.stack_daemon = stack_daemon
+        super().__init__(path, _Handler)
@@ -0,0 +1,86 @@
+import json
+import os
+import socket
+from pathlib import Path
+from typing import Any
+
+from src.config import env_vars
+from src.config.logger import logger
+from src.utils.lazy import lazy_import
+from src.utils.metrics import span
+
+q = lazy_import("questionary")
+
+PING_TIMEOUT = 0.5  # seconds, a running daemon answers right away
+
+
+def request(message: dict[str, Any], timeout: float | None = None) -> Any:
+    """Send a request to the daemon and return its result; log messages of the request
+    are logged here as the daemon sends them."""
+    with span(f"daemon {message['op']}", "daemon"):
+        with socket.socket(socket.AF_UNIX) as connection:
+            connection.settimeout(timeout)
+            connection.connect(env_vars.DAEMON_SOCKET_PATH)
+            connection.sendall((json.dumps(message) + "\n").encode())
+            for line in connection.makefile("r", encoding="utf-8"):
+                response = json.loads(line)
+                if "log" in response:
+                    logger.log(response["log"], response["message"])
+                elif "error" in response:
+                    raise Exception(f"Daemon: {response['error']}")
+                else:
+                    return response["result"]
+    raise ConnectionError("Daemon closed the connection")
+
+
+def running() -> bool:
+    """Whether a daemon serves this repo; otherwise commands run in-process."""
+    path = env_vars.DAEMON_SOCKET_PATH
+    if not path or not os.path.exists(path):
+        return False
+    try:
+        info = request({"op": "ping"}, timeout=PING_TIMEOUT)
+    except OSError as e:
+        logger.debug(f"Daemon not reachable ({e}), running in-process")
+        return False
+    if info["repo"] != str(Path(env_vars.LOCAL_REPO_PATH).resolve()):
+        logger.warning(f"Daemon serves {info['repo']}, running in-process")
+        return False
+    return True
+
+
+def select_chain(branch: str | None = None) -> dict[str, Any]:
+    """Prompt the user to select one of the daemon's chains (as `select_pr_chain`).
+    If `branch` is given, only chains containing it are offered."""
+    chains = request({"op": "chains", "branch": branch})
+    if not chains:
+        logger.error("No chains found")
+        raise ValueError("No chains found")
+    if len(chains) == 1 and branch:
+        return chains[0]
+
+    options = [chain["label"] for chain in chains]
+    selection = q.select("Choose a chain:", choices=options).ask()
+    logger.info(f"Selected chain: {selection}")
+    if not selection:
+        logger.error("No chain selected")
+        raise ValueError("No chain selected")
+    return chains[options.index(selection)]
+
+
+def run_chain_command(name: str, **options: Any) -> Any:
+    """Select a chain and run a command of `CHAIN_COMMANDS` on it in the daemon.
+
+    Commands import `gh` and `pr_chain` with `lazy_import`, so neither is loaded at all
+    when the daemon runs the command.
+    """
+    chain = select_chain()
+    return request(
+        {
+            "op": "run",
+            "command": name,
+            "prs": chain["prs"],
+            "label": chain["label"],
+            "options": options,
+        }
+    )
@@ -1,136 +1,383 @@
-from time import sleep
+import asyncio
+import atexit
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
 
-import questionary as q
 from github import Github
 from github.PullRequest import PullRequest
-from tabulate import tabulate
-
-from src.config.env_vars import (
-    BRANCH_PREFIX,
-    GITHUB_ACCESS_TOKEN,
-    GITHUB_REPO,
-    GITHUB_USERNAME,
-    REVIEWERS,
-)
+from github.Repository import Repository
+
+from src.config import env_vars
 from src.config.logger import logger
-from src.models.types import (
-    BaseBranch,
-    HeadBranch,
-    PRChain,
-    PullRequest,
-    PullRequestBlueprint,
+from src.models.types import Branch, PRChain, PullRequestBlueprint, PullRequestChange
+from src.utils.gh_async import AsyncGitHubClient
+from src.utils.gh_cache import ResponseCache
+from src.utils.gh_graphql import (
+    DiscoveredPullRequest,
+    list_branches,
+    make_pull_request,
+    open_prs_by_head,
+    search_prs,
 )
+from src.utils.gh_http import (
+    get_response_cache,
+    get_scheduler,
+    install_response_cache,
+    install_scheduler,
+)
+from src.utils.gh_scheduler import RateLimitScheduler, run_concurrently
+from src.utils.gh_watch import StackWatcher, WebhookReceiver
+from src.utils.lazy import lazy_import
+from src.utils.other import pr_blueprint_levels
+from src.utils.pr_branches import base, head
+from src.utils.stack_graph import StackGraph
+from src.utils.stack_store import StackStore
+
+q = lazy_import("questionary")
+tabulate = lazy_import("tabulate")
+
+
+def install_request_hooks() -> None:
+    """Install the response cache and the request scheduler (once, on first use)."""
+    if get_scheduler() is not None:
+        return
+    if env_vars.GITHUB_CACHE_MAX_MB > 0:
+        install_response_cache(
+            ResponseCache(
+                Path(env_vars.GITHUB_CACHE_PATH),
+                env_vars.GITHUB_CACHE_MAX_MB * 2**20,
+                env_vars.GITHUB_CACHE_TTL,
+            )
+        )
+    install_scheduler(
+        RateLimitScheduler(
+            env_vars.GITHUB_MUTATIONS_PER_SECOND, env_vars.GITHUB_MUTATIONS_BURST
+        )
+    )
+    atexit.register(log_response_cache_stats)
+
+
+def log_response_cache_stats() -> None:
+    cache = get_response_cache()
+    if cache is not None:
+        logger.debug(f"GitHub response cache: {cache.stats()}")
+    scheduler = get_scheduler()
+    if scheduler is not None:
+        logger.debug(f"GitHub requests: {scheduler.stats()}")
+
+
+def log_estimated_api_cost(reads: int, mutations: int) -> None:
+    install_request_hooks()
+    scheduler = get_scheduler()
+    if scheduler is not None:
+        logger.info(f"Estimated API cost: {scheduler.estimate(reads, mutations)}")
+
+
+_github: Github | None = None
+_repo: Repository | None = None
+
+
+def github_client() -> Github:
+    global _github
+    if _github is None:
+        install_request_hooks()
+        _github = Github(env_vars.GITHUB_ACCESS_TOKEN, base_url=env_vars.GITHUB_API_URL)
+    return _github
+
 
-g = Github(GITHUB_ACCESS_TOKEN)
-repo = g.get_repo(GITHUB_REPO)
+def gh_repo() -> Repository:
+    """GITHUB_REPO, without fetching it (no request until a PR or branch is needed)."""
+    global _repo
+    if _repo is None:
+        _repo = github_client().get_repo(env_vars.GITHUB_REPO, lazy=True)
+    return _repo
 
 
-def head(pr: PullRequest) -> HeadBranch:
-    return HeadBranch(pr.head.label.split(":")[1])
+_async_client: AsyncGitHubClient | None = None
 
 
-def base(pr: PullRequest) -> BaseBranch:
-    return BaseBranch(pr.base.label.split(":")[1])
+def async_client() -> AsyncGitHubClient:
+    """Pooled keep-alive client for concurrent bulk per-PR requests."""
+    global _async_client
+    if _async_client is None:
+        install_request_hooks()
+        _async_client = AsyncGitHubClient(
+            env_vars.GITHUB_API_URL, env_vars.GITHUB_ACCESS_TOKEN
+        )
+        atexit.register(_async_client.close)
+    return _async_client
+
+
+_pr_store: StackStore | None = None
+
+
+def pr_store() -> StackStore:
+    """Local store of user's open PRs, refreshed incrementally."""
+    global _pr_store
+    if _pr_store is None:
+        _pr_store = StackStore(Path(env_vars.STACK_STORE_PATH), env_vars.GITHUB_REPO)
+    return _pr_store
+
+
+def pulls_path(pr_number: int | None = None) -> str:
+    path = f"/repos/{env_vars.GITHUB_REPO}/pulls"
+    return path if pr_number is None else f"{path}/{pr_number}"
 
 
 def gh_get_pr_title(pr_number: int) -> str:
-    pr = repo.get_pull(pr_number)
+    pr = gh_repo().get_pull(pr_number)
     return pr.title
 
 
-def create_gh_pr(
-    pr_blueprint: PullRequestBlueprint, silent: bool = False
-) -> int | None:
+def _create_pulls(levels: list[list[PullRequestBlueprint]]) -> list[int]:
+    """Create PRs level by level of their dependency DAG, the PRs of a level
+    concurrently (mutations are still paced by the scheduler). A failure stops before
+    the next level, so no PR is left based on a branch whose PR is missing."""
+    client = async_client()
+
+    async def create_level(level: list[PullRequestBlueprint]) -> list[Any]:
+        return await asyncio.gather(
+            *[
+                client.post(
+                    pulls_path(),
+                    {
+                        "title": pr_blueprint.title,
+                        "body": "",
+                        "head": pr_blueprint.head,
+                        "base": pr_blueprint.base,
+                        "draft": True,
+                    },
+                )
+                for pr_blueprint in level
+            ],
+            return_exceptions=True,
+        )
+
+    pr_numbers = []
+    for level in levels:
+        results = asyncio.run(create_level(level))
+        for pull in results:
+            if not isinstance(pull, BaseException):
+                logger.info(f"Created PR #{pull['number']}: {pull['title']}")
+                pr_numbers.append(pull["number"])
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            logger.error(f"Created PRs before the failure: {pr_numbers}")
+            raise errors[0]
+    return pr_numbers
+
+
+def _check_blueprint_branches(
+    pr_blueprints: list[PullRequestBlueprint], branches: set[str]
+) -> None:
+    for pr_blueprint in pr_blueprints:
+        # make sure that branches begin with user's prefix (except `main`):
+        assert pr_blueprint.head.startswith(env_vars.BRANCH_PREFIX)
+        assert (
+            pr_blueprint.base.startswith(env_vars.BRANCH_PREFIX)
+            or pr_blueprint.base == "main"
+        )
+    missing = {b for bp in pr_blueprints for b in [bp.head, bp.base]} - branches
+    if missing:
+        raise Exception(f"Branches not found on GitHub: {sorted(missing)}")
+
+
+def create_gh_prs(pr_blueprints: list[PullRequestBlueprint]) -> list[int]:
+    """Create Pull Requests from a list of PullRequestBlueprints, those on the same
+    level of the stack concurrently (see `_create_pulls`)."""
+    levels = pr_blueprint_levels(pr_blueprints)
+
+    table = []
+    for i, level in enumerate(levels):
+        for pr_blueprint in level:
+            table.append([i, pr_blueprint.head, pr_blueprint.base, pr_blueprint.title])
     logger.info(
-        f"Creating PR from {pr_blueprint.head} to {pr_blueprint.base} ({pr_blueprint.title})"
+        "Plan: \n"
+        + tabulate.tabulate(table, headers=["Level", "Source", "Target", "Title"])
     )
+    log_estimated_api_cost(reads=1, mutations=len(pr_blueprints))
 
-    if (
-        not silent
-        and not q.confirm(f"Create this PR?", default=False, auto_enter=False).ask()
-    ):
+    if not q.confirm(
+        f"Create PRs according to above plan?", default=False, auto_enter=False
+    ).ask():
         logger.info("Aborting")
-        return None
-
-    # make sure that branches begin with user's prefix (except `main`):
-    assert pr_blueprint.head.startswith(BRANCH_PREFIX)
-    assert pr_blueprint.base.startswith(BRANCH_PREFIX) or pr_blueprint.base == "main"
-
-    # make sure that the target branches exist:
-    assert repo.get_branch(pr_blueprint.head)
-    assert repo.get_branch(pr_blueprint.base)
-
-    sleep(3)
-    pr = repo.create_pull(
-        title=pr_blueprint.title,
-        body="",
-        head=pr_blueprint.head,
-        base=pr_blueprint.base,
-        draft=True,
+        return []
+
+    # make sure that the target branches exist (all of them read at once):
+    branches = list_branches(
+        gh_repo()._requester, env_vars.GITHUB_REPO, env_vars.BRANCH_PREFIX
     )
+    _check_blueprint_branches(pr_blueprints, branches)
 
-    logger.info(f"Created PR #{pr.number}: {pr.title}")
-    sleep(3)
+    pr_numbers = _create_pulls(levels)
+    logger.info(f"Created PRs: {pr_numbers}")
+    return pr_numbers
 
-    return pr.number
 
+def plan_pr_changes(
+    pr_blueprints: list[PullRequestBlueprint],
+    open_prs: list[PullRequest],
+    branches: set[str],
+    fix_titles: bool = False,
+) -> list[PullRequestChange]:
+    """Diff blueprints against open PRs: missing PRs are created, PRs with another base
+    are retargeted (and renamed, with `fix_titles`). Blueprints whose PR is already as
+    planned need nothing, so the plan of an already created stack is empty."""
+    _check_blueprint_branches(pr_blueprints, branches)
 
-def create_gh_prs(pr_blueprints: list[PullRequestBlueprint]) -> list[int]:
-    """Create Pull Requests from a list of PullRequestBlueprints."""
-    pr_numbers = []
+    open_prs_by_head = {head(pr): pr for pr in open_prs}
+    changes = []
+    for pr_blueprint in pr_blueprints:
+        pr = open_prs_by_head.get(pr_blueprint.head)
+        if pr is None:
+            changes.append(PullRequestChange(blueprint=pr_blueprint))
+            continue
+        edit = {}
+        if base(pr) != pr_blueprint.base:
+            edit["base"] = pr_blueprint.base
+        if fix_titles and pr.title != pr_blueprint.title:
+            edit["title"] = pr_blueprint.title
+        if edit:
+            changes.append(
+                PullRequestChange(blueprint=pr_blueprint, number=pr.number, edit=edit)
+            )
+    return changes
+
+
+def reconcile_gh_prs(
+    pr_blueprints: list[PullRequestBlueprint], fix_titles: bool = False
+) -> list[int]:
+    """Create or correct PRs so they match the blueprints; safe to re-run (e.g. after a
+    partial failure). Branches and the open PRs of the blueprints' heads are read in
+    bulk once, so an up-to-date stack costs a constant number of requests whatever its
+    length. PRs are looked up by head, not searched, as the search index may not have
+    PRs created moments ago yet (by the failed run).
+    Return numbers of created and edited PRs.
+    """
+    requester = gh_repo()._requester
+    prs_by_head, branches = run_concurrently(
+        [
+            lambda: open_prs_by_head(
+                requester,
+                env_vars.GITHUB_REPO,
+                [pr_blueprint.head for pr_blueprint in pr_blueprints],
+            ),
+            lambda: list_branches(
+                requester, env_vars.GITHUB_REPO, env_vars.BRANCH_PREFIX
+            ),
+        ]
+    )
+    open_prs = [make_pull_request(requester, pr) for pr in prs_by_head.values()]
+    changes = plan_pr_changes(pr_blueprints, open_prs, branches, fix_titles)
+    if not changes:
+        logger.info(f"All {len(pr_blueprints)} PRs are already as planned")
+        return []
 
     table = []
-    for pr_blueprint in pr_blueprints:
-        table.append([pr_blueprint.head, pr_blueprint.base, pr_blueprint.title])
-    logger.info("Plan: \n" + tabulate(table, headers=["Source", "Target", "Title"]))
+    for change in changes:
+        blueprint = change.blueprint
+        action = (
+            "create"
+            if change.number is None
+            else f"#{change.number}: "
+            + ", ".join(f"{field} -> {value}" for field, value in change.edit.items())
+        )
+        table.append([blueprint.head, blueprint.base, blueprint.title, action])
+    logger.info(
+        "Plan: \n"
+        + tabulate.tabulate(table, headers=["Source", "Target", "Title", "Change"])
+    )
+    log_estimated_api_cost(reads=0, mutations=len(changes))
 
     if not q.confirm(
-        f"Create PRs according to above plan?", default=False, auto_enter=False
+        f"Apply {len(changes)} changes according to above plan?",
+        default=False,
+        auto_enter=False,
     ).ask():
         logger.info("Aborting")
         return []
 
-    for pr_blueprint in pr_blueprints:
-        pr_number = create_gh_pr(pr_blueprint, silent=True)
-        if pr_number:
-            pr_numbers.append(pr_number)
-    logger.info(f"Created PRs: {pr_numbers}")
+    client = async_client()
+    edits = [change for change in changes if change.number is not None]
+
+    async def edit_prs() -> None:
+        await asyncio.gather(
+            *[client.patch(pulls_path(change.number), change.edit) for change in edits]
+        )
+
+    asyncio.run(edit_prs())
+    for change in edits:
+        logger.info(f"Edited PR #{change.number}: {change.edit}")
+    pr_numbers = [change.number for change in edits if change.number is not None]
+    pr_numbers += _create_pulls(
+        pr_blueprint_levels(
+            [change.blueprint for change in changes if change.number is None]
+        )
+    )
+    logger.info(f"Created or edited PRs: {pr_numbers}")
     return pr_numbers
 
 
+def refresh_pr_store(full: bool = False) -> None:
+    """Fetch PRs changed since the last refresh (newest first, stopping at the first
+    unchanged one) into the local store; `full` re-fetches all open PRs."""
+    store = pr_store()
+    since = None if full else store.refresh_since()
+    if since is None:
+        changed_prs = search_prs(
+            gh_repo()._requester,
+            env_vars.GITHUB_REPO,
+            f"is:pr is:open author:{env_vars.GITHUB_USERNAME}",
+        )
+        store.apply(changed_prs, full=True)
+    else:
+        changed_prs = search_prs(
+            gh_repo()._requester,
+            env_vars.GITHUB_REPO,
+            f"is:pr author:{env_vars.GITHUB_USERNAME} sort:updated-desc",
+            stop=lambda pr: pr["updated_at"] < since,
+        )
+        store.apply(changed_prs)
+
+    paths = StackGraph(_stored_prs()).leaf_paths()
+    store.save_chains(
+        {
+            leaf: [pr.number for pr in path.to_chain()]
+            for leaf, path in paths.items()
+            if path.length > 1
+        }
+    )
+    logger.debug(
+        f"Refreshed PR store ({'full' if since is None else f'since {since}'}): "
+        f"{len(changed_prs)} changed PRs"
+    )
+
+
+def _stored_prs() -> list[PullRequest]:
+    return [make_pull_request(gh_repo()._requester, pr) for pr in pr_store().load()]
+
+
 def get_user_opened_prs() -> list[PullRequest]:
-    """Find users's PRs."""
-    prs = repo.get_pulls(state="open")
-    user_prs: list[PullRequest] = []
-    for pr in prs:
-        if pr.user.login == GITHUB_USERNAME:
-            user_prs.append(pr)
-    return user_prs
+    """Find users's PRs (one GraphQL round trip per 100 changed PRs)."""
+    refresh_pr_store()
+    return _stored_prs()
 
 
 def get_pr_chains(prs: list[PullRequest]) -> list[PRChain]:
     """Find chains of PRs."""
-    pr_dict = {pr.base.label: [] for pr in prs}
-    for pr in prs:
-        pr_dict[pr.base.label].append(pr)
-
-    def dfs(pr: PullRequest, chain: PRChain, chains_dict: dict) -> None:
-        chain.append(pr)
-        if pr.head.label in pr_dict:
-            for next_pr in pr_dict[pr.head.label]:
-                dfs(next_pr, PRChain(chain.copy()), chains_dict)
-        else:
-            if len(chain) > 1 and (
-                pr.head.label not in chains_dict
-                or len(chain) > len(chains_dict[pr.head.label])
-            ):
-                chains_dict[pr.head.label] = chain
+    return StackGraph(prs).chains()
 
-    chains_dict = {}
-    for pr in prs:
-        dfs(pr, PRChain([]), chains_dict)
 
-    return list(chains_dict.values())
+def chain_label(chain: PRChain) -> str:
+    """Label of a chain offered for selection, e.g. "branch1 <- 653,432,542 <- branch2"
+    where the first PR's base is branch1 and the last PR's head is branch2."""
+    return (
+        f"{base(chain[0])} <- "
+        + ",".join([str(pr.number) for pr in chain])
+        + f" <- {head(chain[-1])}"
+    )
 
 
 def select_pr_chain(chains: list[PRChain]) -> PRChain:
@@ -139,21 +386,7 @@ def select_pr_chain(chains: list[PRChain]) -> PRChain:
         logger.error("No chains found")
         raise ValueError("No chains found")
 
-    # options should look like this:
-    # "branch1 <- 653,432,542,435,534 <- branch2"
-    # in a way so first_pr.base == branch1 and last_pr.head == branch2
-    # and also numbers are pr numbers
-
-    options = []
-    for chain in chains:
-        first_pr = chain[0]
-        last_pr = chain[-1]
-        options.append(
-            f"{first_pr.base.label.split(':')[1]} <- "
-            + ",".join([str(pr.number) for pr in chain])
-            + f" <- {last_pr.head.label.split(':')[1]}"
-        )
-
+    options = [chain_label(chain) for chain in chains]
     selection = q.select("Choose a chain:", choices=options).ask()
     logger.info(f"Selected chain: {selection}")
     chain = chains[options.index(selection)] if selection else None
@@ -166,67 +399,148 @@ def select_pr_chain(chains: list[PRChain]) -> PRChain:
 
 
 def select_pr_chain_from_user_opened_prs() -> PRChain:
-    """Prompt the user to select a chain of PRs from user's opened PRs."""
-    prs = get_user_opened_prs()
-    selected_chain = get_pr_chains(prs)
-    return select_pr_chain(selected_chain)
+    """Prompt the user to select a chain of PRs from user's opened PRs.
 
+    Chains are offered right away from the local store, while it is refreshed in the
+    background; the selected chain is then returned with refreshed PRs.
+    """
 
-def change_pr_title(pr: PullRequest, new_title: str) -> None:
-    """Change the title of a PR."""
-    pr_number = pr.number
-    old_title = pr.title
+    def select(prs: list[PullRequest]) -> PRChain:
+        return select_pr_chain(StackGraph(prs).chains())
 
-    if old_title == new_title:
-        logger.info(f"PR #{pr_number} has already wanted title. Skipping.")
-        return None
+    if pr_store().high_water_mark() is None:
+        return select(get_user_opened_prs())
 
-    logger.info(
-        f"Changing PR #{pr_number} title \nfrom: \n{old_title} \nto: \n{new_title}"
-    )
-    if not q.confirm(
-        f"Change PR #{pr_number} title to: {new_title}?", default=False, auto_enter=True
-    ).ask():
-        logger.info("Aborting")
-        return None
-
-    assert (
-        pr.title == old_title
-    )  # make sure that the PR title is still the same to avoid race conditions, not sure if it retrieves it again though
-
-    pr.edit(title=new_title)
-    logger.info(f"Changed PR #{pr_number} title to: {new_title}")
+    with ThreadPoolExecutor(max_workers=1) as background:
+        refresh = background.submit(refresh_pr_store)
+        chain = select(_stored_prs())
+        refresh.result()  # raises errors of the refresh
 
+    fresh_prs = {pr.number: pr for pr in _stored_prs()}
+    fresh_chain = PRChain(
+        fresh_prs[pr.number] for pr in chain if pr.number in fresh_prs
+    )
+    if [(pr.number, pr.base.label, pr.head.label) for pr in fresh_chain] != [
+        (pr.number, pr.base.label, pr.head.label) for pr in chain
+    ]:
+        logger.warning("Selected chain has changed in the meantime, select it again")
+        return select(list(fresh_prs.values()))
+    return fresh_chain
+
+
+def refresh_chain(chain: PRChain) -> PRChain:
+    """Re-fetch the PRs of a chain (conditional requests, in parallel) and return it,
+    unless it changed on GitHub in the meantime (a PR closed, retargeted...)."""
+    fresh_chain = PRChain(
+        run_concurrently([lambda n=pr.number: gh_repo().get_pull(n) for pr in chain])
+    )
+    closed = [pr.number for pr in fresh_chain if pr.state != "open"]
+    if closed or [(pr.number, pr.base.label, pr.head.label) for pr in fresh_chain] != [
+        (pr.number, pr.base.label, pr.head.label) for pr in chain
+    ]:
+        raise ValueError("Selected chain has changed in the meantime, select it again")
+    return fresh_chain
+
+
+def change_prs_titles(prs: list[PullRequest], new_titles: list[str]) -> None:
+    """Change titles of many PRs (as freshly selected, their titles are current): titles
+    of the confirmed changes are re-read in parallel, then the changes are sent
+    concurrently."""
+    client = async_client()
+
+    async def fetch_titles(prs: list[PullRequest]) -> list[str]:
+        pulls = await asyncio.gather(*[client.get(pulls_path(pr.number)) for pr in prs])
+        return [pull["title"] for pull in pulls]
+
+    async def edit_titles(changes: list[tuple[PullRequest, str]]) -> None:
+        await asyncio.gather(
+            *[client.patch(pulls_path(pr.number), {"title": t}) for pr, t in changes]
+        )
 
-def ask_for_review(pr: PullRequest) -> None:
-    """Ask REVIEWERS to review a PR if they are not under review already."""
-    # TODO: remove DRAFT status
-    pr_number = pr.number
-
-    # aaa =list(pr.get_reviews())
-    # # change draft to non-draft:
-    # if pr.draft:
-    #     pr.edit(draft=False)
-    #     print()
+    confirmed = []
+    for pr, new_title in zip(prs, new_titles):
+        old_title = pr.title
+        if old_title == new_title:
+            logger.info(f"PR #{pr.number} has already wanted title. Skipping.")
+            continue
+        logger.info(
+            f"Changing PR #{pr.number} title \nfrom: \n{old_title} \nto: \n{new_title}"
+        )
+        if not q.confirm(
+            f"Change PR #{pr.number} title to: {new_title}?",
+            default=False,
+            auto_enter=True,
+        ).ask():
+            logger.info("Aborting")
+            continue
+        confirmed.append((pr, old_title, new_title))
+
+    # a title may have been edited while the user was answering the prompts
+    latest_titles = asyncio.run(fetch_titles([pr for pr, _, _ in confirmed]))
+    unchanged = []
+    for (pr, old_title, new_title), latest_title in zip(confirmed, latest_titles):
+        if latest_title != old_title:
+            logger.warning(
+                f"PR #{pr.number} title changed to {latest_title!r} in the meantime."
+                " Skipping."
+            )
+            continue
+        unchanged.append((pr, new_title))
+
+    asyncio.run(edit_titles(unchanged))
+    for pr, new_title in unchanged:
+        logger.info(f"Changed PR #{pr.number} title to: {new_title}")
+
+
+def ask_for_review_prs(prs: list[PullRequest]) -> None:
+    """Ask REVIEWERS to review many PRs: review state is prefetched in parallel, then the
+    confirmed review requests are sent concurrently."""
+    client = async_client()
 
-    if pr.draft:
-        raise Exception(f"PR {pr_number} is draft")
+    for pr in prs:
+        if pr.draft:
+            raise Exception(f"PR {pr.number} is draft")
+
+    async def already_asked(pr: PullRequest) -> bool:
+        if isinstance(pr, DiscoveredPullRequest):  # known from discovery
+            return bool(pr.requested_reviewers) or pr.reviews_count > 0
+        requested, reviews = await asyncio.gather(
+            client.get(f"{pulls_path(pr.number)}/requested_reviewers"),
+            client.get(f"{pulls_path(pr.number)}/reviews?per_page=1"),
+        )
+        return bool(requested["users"] or requested["teams"] or reviews)
 
-    if pr.requested_reviewers or pr.get_reviews().totalCount > 0:
-        logger.info(f"PR #{pr_number}: already asked for review.")
-        return None
+    async def fetch_review_states() -> list[bool]:
+        return await asyncio.gather(*[already_asked(pr) for pr in prs])
 
-    logger.info(f"Asking {REVIEWERS} to review PR #{pr_number}")
-    if not q.confirm(
-        f"Ask {REVIEWERS} to review PR #{pr_number} ({pr.title})?",
-        default=False,
-        auto_enter=True,
-    ).ask():
-        logger.info("Aborting")
-        return None
+    async def request_reviews(prs_to_ask: list[PullRequest]) -> None:
+        await asyncio.gather(
+            *[
+                client.post(
+                    f"{pulls_path(pr.number)}/requested_reviewers",
+                    {"reviewers": env_vars.REVIEWERS},
+                )
+                for pr in prs_to_ask
+            ]
+        )
 
-    pr.create_review_request(reviewers=REVIEWERS)
-    logger.info(f"Asked {REVIEWERS} to review PR #{pr_number}")
+    confirmed = []
+    for pr, asked in zip(prs, asyncio.run(fetch_review_states())):
+        if asked:
+            logger.info(f"PR #{pr.number}: already asked for review.")
+            continue
+        if not q.confirm(
+            f"Ask {env_vars.REVIEWERS} to review PR #{pr.number} ({pr.title})?",
+            default=False,
+            auto_enter=True,
+        ).ask():
+            logger.info("Aborting")
+            continue
+        confirmed.append(pr)
+
+    asyncio.run(request_reviews(confirmed))
+    for pr in confirmed:
+        logger.info(f"Asked {env_vars.REVIEWERS} to review PR #{pr.number}")
 
 
 def is_approved(pr: PullRequest) -> bool:
@@ -245,25 +559,36 @@ def is_approved(pr: PullRequest) -> bool:
     return approved
 
 
-def pr_is_ready_to_merge(pr: PullRequest, wait: bool = False) -> bool:
-    """Check if a PR is ready to merge."""
+def pr_is_ready_to_merge(
+    pr: PullRequest, wait: bool = False, head_sha: str | None = None
+) -> bool:
+    """Check if a PR is ready to merge.
+    With `wait`, return False instead of raising while it may still become ready: its
+    checks are not done or GitHub is computing its mergeability (`mergeable` is null,
+    e.g. after a push or a retarget). With `head_sha` (just pushed), it is not ready
+    until GitHub has updated the PR to that commit."""
     pr.update()
 
     pr_number = pr.number
 
+    if head_sha is not None and pr.head.sha != head_sha:
+        if not wait:
+            raise Exception(f"PR #{pr_number} is not at {head_sha}: {pr.head.sha=}")
+        return False
+
     if pr.merged:
         raise Exception(f"PR #{pr_number} is already merged")
 
     if not is_approved(pr):
         raise Exception(f"PR #{pr_number} is not approved")
 
-    if not pr.mergeable:
+    if pr.mergeable is False or (pr.mergeable is None and not wait):
         raise Exception(f"PR #{pr_number} is not mergeable")
 
     if pr.draft:
         raise Exception(f"PR #{pr_number} is 'draft'")
 
-    if not pr.rebaseable:
+    if pr.rebaseable is False or (pr.rebaseable is None and not wait):
         raise Exception(f"PR #{pr_number} is not rebaseable")
 
     if pr.state != "open":
@@ -284,26 +609,71 @@ def pr_is_ready_to_merge(pr: PullRequest, wait: bool = False) -> bool:
             logger.trace(f"PR #{pr_number} is ready to merge")
             return True
     else:
+        if pr.mergeable is None or pr.rebaseable is None:
+            return False
         return pr.mergeable_state == "clean"
 
 
-def wait_pr_ready_to_merge(pr: PullRequest) -> None:
-    """Wait until a PR is ready to merge."""
+def pr_readiness(pr: PullRequest) -> str:
+    """Readiness of any PR of a chain (not only the bottom one):
+    'merged', 'draft', 'not approved' or its mergeable_state ('clean' == ready)."""
+    pr.update()
+    if pr.merged:
+        return "merged"
+    if pr.draft:
+        return "draft"
+    if not is_approved(pr):
+        return "not approved"
+    return pr.mergeable_state
+
+
+def wait_pr_ready_to_merge(
+    pr: PullRequest,
+    webhook_receiver: WebhookReceiver | None = None,
+    min_interval: float = 5,
+    head_sha: str | None = None,
+) -> None:
+    """Wait until a PR is ready to merge. With `head_sha` (just pushed), only once GitHub
+    has updated the PR to it, as readiness of its previous head is meaningless."""
     pr_number = pr.number
-    while True:
-        if not pr_is_ready_to_merge(pr, wait=True):
-            raise Exception(f"PR #{pr_number} is not ready to merge")
-        else:
-            if pr.mergeable_state == "clean":
-                break
-            else:
-                logger.info(
-                    f"PR #{pr_number} is not ready to merge: {pr.mergeable_state=}. Waiting for it..."
-                )
-                sleep(10)
+
+    def check(pr: PullRequest) -> str:
+        if pr_is_ready_to_merge(pr, wait=True, head_sha=head_sha):
+            return "clean"
+        if head_sha is not None and pr.head.sha != head_sha:
+            return "head not updated"
+        if pr.mergeable is None or pr.rebaseable is None:
+            return "mergeability not computed"
+        return pr.mergeable_state
+
+    StackWatcher([pr], check, webhook_receiver, min_interval=min_interval).wait(
+        lambda states: states[pr_number] == "clean"
+    )
     logger.info(f"PR #{pr_number} is ready to merge")
 
 
+def merge_pr(pr: PullRequest, merge_method: str = "merge") -> None:
+    """Merge a PR on GitHub (it should be `pr_is_ready_to_merge`)."""
+    status = pr.merge(merge_method=merge_method)
+    if not status.merged:
+        raise Exception(f"PR #{pr.number} was not merged: {status.message}")
+    logger.info(f"Merged PR #{pr.number} ({pr.title})")
+
+
+def retarget_prs(prs: list[PullRequest], new_base: Branch) -> None:
+    """Change the base branch of many PRs (requests sent concurrently)."""
+    client = async_client()
+
+    async def edit_bases() -> None:
+        await asyncio.gather(
+            *[client.patch(pulls_path(pr.number), {"base": new_base}) for pr in prs]
+        )
+
+    asyncio.run(edit_bases())
+    for pr in prs:
+        logger.info(f"Retargeted PR #{pr.number} to {new_base}")
+
+
 if __name__ == "__main__":
     pass
 
@@ -0,0 +1,130 @@
+import asyncio
+import http.client
+import json
+import queue
+import urllib.parse
+from typing import Any
+
+from github import GithubException
+
+from src.config.logger import logger
+from src.utils.gh_http import MAX_RETRIES, get_response_cache, get_scheduler
+from src.utils.metrics import endpoint, span
+
+
+class AsyncGitHubClient:
+    """Minimal asyncio GitHub REST client for bulk per-PR operations.
+
+    The transport is blocking `http.client`: every request runs in a worker thread
+    (`asyncio.to_thread`), so requests overlap thanks to threads, not non-blocking
+    sockets. Requests share a pool of keep-alive connections (one TLS handshake per
+    connection, not per request); a request waits for a free connection, so at most
+    `max_concurrency` requests are in flight at once. The pool is not bound to an event
+    loop, so the client can be reused by several `asyncio.run` calls (e.g. with
+    interactive prompts between them). Rate limits are handled by the same scheduler as
+    PyGithub requests, and modifications invalidate the same response cache.
+    """
+
+    def __init__(self, base_url: str, token: str, max_concurrency: int = 8) -> None:
+        url = urllib.parse.urlparse(base_url)
+        self.scheme = url.scheme
+        self.host = url.hostname
+        self.port = url.port
+        self.prefix = url.path.rstrip("/")
+        self.headers = {
+            "Authorization": f"token {token}",
+            "Accept": "application/vnd.github+json",
+            "User-Agent": "stacked-pr-manager",
+        }
+        self._connections: queue.Queue[http.client.HTTPConnection] = queue.Queue()
+        for _ in range(max_concurrency):
+            self._connections.put(self._connect())
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.host, self.port, timeout=30)
+        return http.client.HTTPConnection(self.host, self.port, timeout=30)
+
+    def close(self) -> None:
+        while not self._connections.empty():
+            self._connections.get_nowait().close()
+
+    def _request_pooled(
+        self, verb: str, path: str, body: str | None
+    ) -> tuple[int, dict[str, str], str]:
+        with span(f"{verb} {endpoint(self.prefix + path)}", "api") as api_span:
+            connection = self._connections.get()  # blocks until a connection is free
+            try:
+                status, headers, output = self._request_sync(
+                    connection, verb, path, body
+                )
+            finally:
+                self._connections.put(connection)
+            api_span.args["status"] = status
+            api_span.args["bytes"] = len(output)
+            if "x-ratelimit-remaining" in headers:
+                api_span.args["rate_limit_remaining"] = headers["x-ratelimit-remaining"]
+            return status, headers, output
+
+    def _request_sync(
+        self,
+        connection: http.client.HTTPConnection,
+        verb: str,
+        path: str,
+        body: str | None,
+    ) -> tuple[int, dict[str, str], str]:
+        headers = dict(self.headers)
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+        scheduler = get_scheduler()
+        mutation = verb != "GET"
+
+        for attempt in range(1, MAX_RETRIES + 1):
+            if scheduler is not None:
+                scheduler.before_request(mutation)
+            try:
+                connection.request(verb, self.prefix + path, body=body, headers=headers)
+                response = connection.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError):
+                # the server closed an idle keep-alive connection, reconnect once
+                connection.close()
+                connection.request(verb, self.prefix + path, body=body, headers=headers)
+                response = connection.getresponse()
+            # read fully, so the connection is reusable
+            output = response.read().decode()
+            response_headers = {k.lower(): v for k, v in response.getheaders()}
+            logger.trace("{} {} -> {}", verb, path, response.status)
+
+            wait = None
+            if scheduler is not None:
+                wait = scheduler.after_response(response.status, response_headers)
+            if wait is None or attempt == MAX_RETRIES:
+                return response.status, response_headers, output
+            scheduler.back_off(wait, f"secondary rate limit on {verb} {path}")
+        return response.status, response_headers, output
+
+    async def request(self, verb: str, path: str, body: Any = None) -> Any:
+        """Send a request over a pooled connection and return the decoded JSON."""
+        status, headers, output = await asyncio.to_thread(
+            self._request_pooled,
+            verb,
+            path,
+            None if body is None else json.dumps(body),
+        )
+        data = json.loads(output) if output else None
+        if status >= 400:
+            raise GithubException(status, data, headers)
+        cache = get_response_cache()
+        if verb != "GET" and cache is not None:
+            # like PyGithub requests, a modification makes cached reads of it stale
+            cache.invalidate(self.prefix + path.split("?")[0])
+        return data
+
+    async def get(self, path: str) -> Any:
+        return await self.request("GET", path)
+
+    async def post(self, path: str, body: Any) -> Any:
+        return await self.request("POST", path, body)
+
+    async def patch(self, path: str, body: Any) -> Any:
+        return await self.request("PATCH", path, body)
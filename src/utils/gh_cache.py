@@ -0,0 +1,168 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+
+@dataclass
+class CachedResponse:
+    """A stored GitHub response (mimics the httplib response PyGithub expects)."""
+
+    status: int
+    headers: dict[str, str]
+    text: str
+    stored_at: float
+
+    def getheaders(self):
+        return self.headers.items()
+
+    def read(self) -> str:
+        return self.text
+
+    @property
+    def etag(self) -> str | None:
+        return self.headers.get("etag")
+
+    @property
+    def last_modified(self) -> str | None:
+        return self.headers.get("last-modified")
+
+
+class ResponseCache:
+    """Persistent, size-bounded LRU cache of GitHub GET responses.
+
+    Entries are keyed by URL, Accept header and (hashed) token, so responses are never
+    shared between tokens with different scopes. Stale entries are revalidated with
+    `If-None-Match`/`If-Modified-Since`; GitHub does not count 304s against the rate limit.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_bytes: int,
+        ttl: float = 0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl  # serve entries younger than this without asking GitHub at all
+        self.clock = clock
+
+        self.hits = 0  # served from cache without a request (within TTL)
+        self.revalidated = 0  # 304 Not Modified, served from cache
+        self.misses = 0  # full response downloaded
+
+        # the connection is shared by concurrent requests
+        self._lock = threading.RLock()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)"
+        )
+        self._db.commit()
+
+    @staticmethod
+    def key(url: str, accept: str, authorization: str) -> str:
+        scope = hashlib.sha256(authorization.encode()).hexdigest()[:16]
+        return hashlib.sha256(f"{scope} {accept} {url}".encode()).hexdigest()
+
+    def get(self, key: str) -> CachedResponse | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, headers, body, stored_at FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                (self.clock(), key),
+            )
+            self._db.commit()
+        status, headers, body, stored_at = row
+        return CachedResponse(status, json.loads(headers), body, stored_at)
+
+    def is_fresh(self, response: CachedResponse) -> bool:
+        return self.ttl > 0 and self.clock() - response.stored_at < self.ttl
+
+    def put(
+        self, key: str, url: str, status: int, headers: dict[str, str], body: str
+    ) -> None:
+        now = self.clock()
+        size = len(body) + len(url)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, status, json.dumps(headers), body, size, now, now),
+            )
+            self._evict()
+            self._db.commit()
+
+    def refresh(self, key: str) -> None:
+        """Mark an entry as just revalidated (restarts its TTL)."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE responses SET stored_at = ? WHERE key = ?", (self.clock(), key)
+            )
+            self._db.commit()
+
+    def invalidate(self, url: str) -> None:
+        """Drop entries for a resource (with any query) and its sub-resources after it
+        was modified (e.g. `/pulls/1` and `/pulls/1/reviews`, but not `/pulls/10`)."""
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM responses WHERE url = ? OR substr(url, 1, ?) IN (?, ?)",
+                (url, len(url) + 1, f"{url}/", f"{url}?"),
+            )
+            self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        (total,) = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        ).fetchall()
+        to_delete = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            to_delete.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", to_delete)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+        }
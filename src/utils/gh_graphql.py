@@ -0,0 +1,250 @@
+from collections.abc import Callable
+from typing import Any
+
+from github.GithubObject import NotSet
+from github.PullRequest import PullRequest
+from github.Requester import Requester
+
+# Everything that chain selection and the later per-PR steps read of a PR
+PULL_REQUEST_FIELDS = """
+fragment PullRequestFields on PullRequest {
+  number
+  title
+  state
+  isDraft
+  createdAt
+  updatedAt
+  author { login }
+  headRefName
+  headRefOid
+  headRepositoryOwner { login }
+  baseRefName
+  baseRefOid
+  mergeable
+  mergeStateStatus
+  reviewDecision
+  reviews { totalCount }
+  reviewRequests(first: 100) {
+    nodes {
+      requestedReviewer {
+        ... on User { login }
+      }
+    }
+  }
+}
+"""
+
+# One search query returns everything that chain selection and the later per-PR
+# steps read, so discovering user's PRs costs one round trip per 100 PRs
+# (instead of paging through every open PR of the repository over REST).
+USER_OPENED_PRS_QUERY = (
+    """
+query($searchQuery: String!, $cursor: String) {
+  search(query: $searchQuery, type: ISSUE, first: 100, after: $cursor) {
+    pageInfo {
+      hasNextPage
+      endCursor
+    }
+    nodes { ...PullRequestFields }
+  }
+}
+"""
+    + PULL_REQUEST_FIELDS
+)
+
+# Branch names matching a query (e.g. the user's prefix) and whether `main` exists: one
+# round trip per 100 branches, instead of one `GET /branches/{branch}` per branch.
+BRANCHES_QUERY = """
+query($owner: String!, $name: String!, $refQuery: String!, $cursor: String) {
+  repository(owner: $owner, name: $name) {
+    main: ref(qualifiedName: "refs/heads/main") { name }
+    refs(refPrefix: "refs/heads/", query: $refQuery, first: 100, after: $cursor) {
+      pageInfo {
+        hasNextPage
+        endCursor
+      }
+      nodes { name }
+    }
+  }
+}
+"""
+
+# Open PRs of given head branches, one aliased `pullRequests` connection per branch (as
+# many as `HEADS_PER_QUERY`): unlike the search index, it is up to date right after a PR
+# was created.
+HEADS_PER_QUERY = 100
+
+# GraphQL `mergeable` enum -> REST `mergeable` field
+_MERGEABLE = {"MERGEABLE": True, "CONFLICTING": False, "UNKNOWN": None}
+
+
+class DiscoveredPullRequest(PullRequest):
+    """PullRequest pre-populated from the GraphQL discovery query.
+
+    Attributes not returned by the query are still completed lazily over REST.
+    """
+
+    def _initAttributes(self) -> None:
+        super()._initAttributes()
+        self._review_decision = NotSet
+        self._reviews_count = NotSet
+
+    def _useAttributes(self, attributes: dict[str, Any]) -> None:
+        super()._useAttributes(attributes)
+        if "review_decision" in attributes:
+            self._review_decision = self._makeStringAttribute(
+                attributes["review_decision"]
+            )
+        if "reviews_count" in attributes:
+            self._reviews_count = self._makeIntAttribute(attributes["reviews_count"])
+
+    @property
+    def review_decision(self) -> str | None:
+        """APPROVED, CHANGES_REQUESTED, REVIEW_REQUIRED or None (as of discovery)."""
+        return self._review_decision.value
+
+    @property
+    def reviews_count(self) -> int:
+        """Number of submitted reviews (as of discovery)."""
+        return self._reviews_count.value
+
+
+def graphql_query(
+    requester: Requester, query: str, variables: dict[str, Any]
+) -> dict[str, Any]:
+    """Run a GraphQL query through PyGithub's requester and return its `data`."""
+    _, response = requester.requestJsonAndCheck(
+        "POST", "/graphql", input={"query": query, "variables": variables}
+    )
+    if response.get("errors"):
+        raise Exception(f"GraphQL query failed: {response['errors']}")
+    return response["data"]
+
+
+def _pr_attributes(node: dict[str, Any], repo_full_name: str) -> dict[str, Any]:
+    """Translate a GraphQL PullRequest node to REST-shaped PullRequest attributes."""
+    repo_owner = repo_full_name.split("/")[0]
+    head_owner = (node.get("headRepositoryOwner") or {}).get("login", repo_owner)
+    requested_reviewers = [
+        {"login": request["requestedReviewer"]["login"]}
+        for request in node["reviewRequests"]["nodes"]
+        if request.get("requestedReviewer") and "login" in request["requestedReviewer"]
+    ]
+    return {
+        "url": f"/repos/{repo_full_name}/pulls/{node['number']}",
+        "number": node["number"],
+        "title": node["title"],
+        "state": node["state"].lower(),
+        "draft": node["isDraft"],
+        "created_at": node["createdAt"],
+        "updated_at": node["updatedAt"],
+        "user": {"login": (node.get("author") or {}).get("login")},
+        "head": {
+            "label": f"{head_owner}:{node['headRefName']}",
+            "ref": node["headRefName"],
+            "sha": node["headRefOid"],
+        },
+        "base": {
+            "label": f"{repo_owner}:{node['baseRefName']}",
+            "ref": node["baseRefName"],
+            "sha": node["baseRefOid"],
+        },
+        "mergeable": _MERGEABLE.get(node["mergeable"]),
+        "mergeable_state": node["mergeStateStatus"].lower(),
+        "requested_reviewers": requested_reviewers,
+        "review_decision": node["reviewDecision"],
+        "reviews_count": node["reviews"]["totalCount"],
+    }
+
+
+def search_prs(
+    requester: Requester,
+    repo_full_name: str,
+    search_query: str,
+    stop: Callable[[dict[str, Any]], bool] | None = None,
+) -> list[dict[str, Any]]:
+    """Return REST-shaped attributes of PRs matching a search query.
+    Paging stops early at the first PR for which `stop(attributes)` is True."""
+    prs: list[dict[str, Any]] = []
+    cursor = None
+    while True:
+        data = graphql_query(
+            requester,
+            USER_OPENED_PRS_QUERY,
+            {"searchQuery": f"repo:{repo_full_name} {search_query}", "cursor": cursor},
+        )
+        search = data["search"]
+        for node in search["nodes"]:
+            if not node:  # search may return non-PR nodes as empty objects
+                continue
+            attributes = _pr_attributes(node, repo_full_name)
+            if stop is not None and stop(attributes):
+                return prs
+            prs.append(attributes)
+        if not search["pageInfo"]["hasNextPage"]:
+            return prs
+        cursor = search["pageInfo"]["endCursor"]
+
+
+def make_pull_request(
+    requester: Requester, attributes: dict[str, Any]
+) -> DiscoveredPullRequest:
+    return DiscoveredPullRequest(requester, {}, attributes, completed=False)
+
+
+def list_branches(
+    requester: Requester, repo_full_name: str, ref_query: str
+) -> set[str]:
+    """Names of branches matching `ref_query` (and `main` if it exists)."""
+    owner, name = repo_full_name.split("/")
+    branches: set[str] = set()
+    cursor = None
+    while True:
+        data = graphql_query(
+            requester,
+            BRANCHES_QUERY,
+            {"owner": owner, "name": name, "refQuery": ref_query, "cursor": cursor},
+        )
+        repository = data["repository"]
+        if repository["main"]:
+            branches.add(repository["main"]["name"])
+        branches.update(node["name"] for node in repository["refs"]["nodes"])
+        if not repository["refs"]["pageInfo"]["hasNextPage"]:
+            return branches
+        cursor = repository["refs"]["pageInfo"]["endCursor"]
+
+
+def open_prs_by_head(
+    requester: Requester, repo_full_name: str, heads: list[str]
+) -> dict[str, dict[str, Any]]:
+    """REST-shaped attributes of the open PR of each head branch of the repo (heads
+    without one are left out), `HEADS_PER_QUERY` heads per round trip."""
+    owner, name = repo_full_name.split("/")
+    prs: dict[str, dict[str, Any]] = {}
+    for start in range(0, len(heads), HEADS_PER_QUERY):
+        chunk = heads[start : start + HEADS_PER_QUERY]
+        aliases = [f"h{i}" for i in range(len(chunk))]
+        query = (
+            "query($owner: String!, $name: String!"
+            + "".join(f", ${alias}: String!" for alias in aliases)
+            + ") {\n  repository(owner: $owner, name: $name) {\n"
+            + "".join(
+                f"    {alias}: pullRequests(headRefName: ${alias}, states: OPEN,"
+                " first: 10) { nodes { ...PullRequestFields } }\n"
+                for alias in aliases
+            )
+            + "  }\n}\n"
+            + PULL_REQUEST_FIELDS
+        )
+        data = graphql_query(
+            requester,
+            query,
+            {"owner": owner, "name": name} | dict(zip(aliases, chunk)),
+        )
+        for alias, head in zip(aliases, chunk):
+            for node in data["repository"][alias]["nodes"]:
+                attributes = _pr_attributes(node, repo_full_name)
+                # PRs from forks with a branch of the same name aren't the stack's
+                if attributes["head"]["label"] == f"{owner}:{head}":
+                    prs[head] = attributes
+    return prs
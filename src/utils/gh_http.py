@@ -0,0 +1,146 @@
+import requests
+from github.Requester import (
+    HTTPRequestsConnectionClass,
+    HTTPSRequestsConnectionClass,
+    Requester,
+)
+
+from src.utils.gh_cache import ResponseCache
+from src.utils.gh_scheduler import RateLimitScheduler
+from src.utils.metrics import Span, endpoint, span
+
+MAX_RETRIES = 3
+
+_response_cache: ResponseCache | None = None
+_scheduler: RateLimitScheduler | None = None
+_sessions: dict[str, requests.Session] = {}
+
+
+class _ConnectionMixin:
+    """Hooks every PyGithub HTTP request.
+
+    PyGithub creates a new connection object per request once custom connection classes
+    are injected, so the underlying `requests.Session` is shared to keep connections alive.
+    """
+
+    protocol: str
+    adapter: requests.adapters.HTTPAdapter
+    session: requests.Session
+    verb: str
+    url: str
+    input: str | None
+    headers: dict[str, str]
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        if self.protocol not in _sessions:
+            self.session.mount(f"{self.protocol}://", self.adapter)
+            _sessions[self.protocol] = self.session
+        self.session = _sessions[self.protocol]
+
+    def _send(self):
+        """Send the request, waiting and retrying whenever GitHub asks to slow down."""
+        scheduler = _scheduler
+        if scheduler is None:
+            return super().getresponse()
+        mutation = scheduler.is_mutation(self.verb, self.url, self.input)
+        for attempt in range(1, MAX_RETRIES + 1):
+            scheduler.before_request(mutation)
+            response = super().getresponse()
+            headers = {k.lower(): v for k, v in response.getheaders()}
+            wait = scheduler.after_response(response.status, headers)
+            if wait is None or attempt == MAX_RETRIES:
+                return response  # after the last attempt, there's nothing to wait for
+            scheduler.back_off(wait, f"secondary rate limit on {self.verb} {self.url}")
+        return response
+
+    def getresponse(self):
+        with span(f"{self.verb} {endpoint(self.url)}", "api") as api_span:
+            response = self._getresponse(api_span)
+            headers = {k.lower(): v for k, v in response.getheaders()}
+            api_span.args["status"] = response.status
+            api_span.args["bytes"] = len(response.read() or "")
+            if "x-ratelimit-remaining" in headers:
+                api_span.args["rate_limit_remaining"] = headers["x-ratelimit-remaining"]
+            return response
+
+    def _getresponse(self, api_span: Span):
+        cache = _response_cache
+        if cache is None:
+            return self._send()
+
+        if self.verb != "GET":
+            response = self._send()
+            if response.status < 400:
+                cache.invalidate(self.url.split("?")[0])
+            return response
+
+        if "If-None-Match" in self.headers or "If-Modified-Since" in self.headers:
+            # caller does its own conditional request (e.g. `PullRequest.update()`)
+            return self._send()
+
+        key = ResponseCache.key(
+            self.url,
+            self.headers.get("Accept", ""),
+            self.headers.get("Authorization", ""),
+        )
+        cached = cache.get(key)
+        if cached is not None:
+            if cache.is_fresh(cached):
+                cache.hits += 1
+                api_span.args["cache"] = "hit"
+                return cached
+            if cached.etag:
+                self.headers["If-None-Match"] = cached.etag
+            elif cached.last_modified:
+                self.headers["If-Modified-Since"] = cached.last_modified
+
+        response = self._send()
+        if response.status == 304 and cached is not None:
+            cache.revalidated += 1
+            api_span.args["cache"] = "revalidated"
+            cache.refresh(key)
+            # keep fresh rate limit headers of the 304 response
+            fresh_headers = {k.lower(): v for k, v in response.getheaders()}
+            fresh_headers.pop("content-length", None)
+            cached.headers.update(fresh_headers)
+            return cached
+
+        cache.misses += 1
+        headers = {k.lower(): v for k, v in response.getheaders()}
+        if response.status == 200 and ("etag" in headers or "last-modified" in headers):
+            cache.put(key, self.url, response.status, headers, response.read())
+        return response
+
+
+class HTTPConnection(_ConnectionMixin, HTTPRequestsConnectionClass):
+    pass
+
+
+class HTTPSConnection(_ConnectionMixin, HTTPSRequestsConnectionClass):
+    pass
+
+
+def install_connection_classes() -> None:
+    """Route all PyGithub requests through the hooks above."""
+    Requester.injectConnectionClasses(HTTPConnection, HTTPSConnection)
+
+
+def install_response_cache(cache: ResponseCache) -> None:
+    global _response_cache
+    _response_cache = cache
+    install_connection_classes()
+
+
+def get_response_cache() -> ResponseCache | None:
+    return _response_cache
+
+
+def install_scheduler(scheduler: RateLimitScheduler) -> None:
+    global _scheduler
+    _scheduler = scheduler
+    install_connection_classes()
+
+
+def get_scheduler() -> RateLimitScheduler | None:
+    return _scheduler
@@ -0,0 +1,139 @@
+import json
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from typing import TypeVar
+
+from src.config.logger import logger
+
+T = TypeVar("T")
+
+MUTATING_VERBS = {"POST", "PATCH", "PUT", "DELETE"}
+
+
+class RateLimitScheduler:
+    """Paces all GitHub requests according to what GitHub actually reports.
+
+    - primary limit: `X-RateLimit-Remaining`/`X-RateLimit-Reset` of every response; requests
+      wait for the reset only when nothing is remaining,
+    - secondary limit: `Retry-After` (or a 403/429 without it) makes the request wait and be
+      retried, and halves the rate of mutations,
+    - mutations go through a token bucket (GitHub asks for ~1 mutation per second), whose
+      rate recovers gradually after a secondary limit.
+    """
+
+    def __init__(
+        self,
+        mutations_per_second: float = 1.0,
+        burst: int = 1,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.max_rate = mutations_per_second
+        self.rate = mutations_per_second
+        self.burst = burst
+        self.clock = clock  # epoch seconds, as `X-RateLimit-Reset`
+        self.sleep = sleep
+        self.tokens = float(burst)
+        self.refilled_at = clock()
+
+        self.remaining: int | None = None
+        self.limit: int | None = None
+        self.reset_at: float | None = None  # epoch seconds
+
+        self.requests = 0
+        self.waited_s = 0.0
+        self._lock = threading.Lock()
+
+    def back_off(self, seconds: float, reason: str) -> None:
+        """Wait as GitHub asks (e.g. the `after_response` delay before a retry)."""
+        logger.debug(f"Waiting {seconds:.1f}s for GitHub ({reason})")
+        self.waited_s += seconds
+        self.sleep(seconds)
+
+    def _take_token(self) -> float:
+        """Take a mutation token; return how long to wait for it."""
+        with self._lock:
+            now = self.clock()
+            elapsed = max(0.0, now - self.refilled_at)  # the clock may be set back
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+            self.refilled_at = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0
+            return -self.tokens / self.rate
+
+    @staticmethod
+    def is_mutation(verb: str, url: str, input) -> bool:
+        if url.split("?")[0].endswith("/graphql"):  # GraphQL reads are POSTs too
+            query = json.loads(input).get("query", "") if isinstance(input, str) else ""
+            return query.lstrip().startswith("mutation")
+        return verb in MUTATING_VERBS
+
+    def before_request(self, mutation: bool) -> None:
+        self.requests += 1
+        if self.remaining == 0 and self.reset_at is not None:
+            wait = self.reset_at - self.clock()
+            if wait > 0:
+                self.back_off(wait, "primary rate limit exhausted")
+        if mutation:
+            wait = self._take_token()
+            if wait > 0:
+                self.back_off(wait, "pacing mutations")
+
+    def after_response(self, status: int, headers: dict[str, str]) -> float | None:
+        """Record rate limit headers; return seconds to wait before a retry, if needed."""
+        if "x-ratelimit-remaining" in headers:
+            self.remaining = int(headers["x-ratelimit-remaining"])
+        if "x-ratelimit-limit" in headers:
+            self.limit = int(headers["x-ratelimit-limit"])
+        if "x-ratelimit-reset" in headers:
+            self.reset_at = float(headers["x-ratelimit-reset"])
+
+        if status not in [403, 429]:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + 0.1 * self.max_rate)
+            return None
+
+        if "retry-after" in headers:
+            wait = float(headers["retry-after"])
+        elif self.remaining == 0 and self.reset_at is not None:
+            wait = max(0.0, self.reset_at - self.clock())
+        elif status == 429:
+            wait = 60.0  # secondary limit without a hint, GitHub asks for at least a minute
+        else:
+            return None  # a plain "forbidden"
+
+        with self._lock:
+            self.rate = max(self.max_rate / 16, self.rate / 2)
+        return wait
+
+    def estimate(self, reads: int, mutations: int) -> str:
+        """Human readable API cost of a command, checked against the known rate limit."""
+        total = reads + mutations
+        pacing_s = max(0.0, (mutations - self.burst) / self.max_rate)
+        message = f"~{total} API requests ({reads} reads, {mutations} mutations, ~{pacing_s:.0f}s of mutation pacing)"
+        if self.remaining is not None:
+            message += f", {self.remaining}/{self.limit} remaining"
+            if total > self.remaining:
+                message += " - NOT ENOUGH, will wait for the rate limit reset"
+        return message
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "requests": self.requests,
+            "waited_s": round(self.waited_s, 1),
+            "remaining": -1 if self.remaining is None else self.remaining,
+        }
+
+
+def run_concurrently(
+    functions: Iterable[Callable[[], T]], max_workers: int = 8
+) -> list[T]:
+    """Run independent (read-only) GitHub calls in parallel, return results in order."""
+    functions = list(functions)
+    if len(functions) <= 1:
+        return [function() for function in functions]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda function: function(), functions))
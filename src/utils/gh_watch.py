@@ -0,0 +1,131 @@
+import hashlib
+import hmac
+import threading
+import time
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from github.PullRequest import PullRequest
+
+from src.config.logger import logger
+from src.utils.gh_scheduler import run_concurrently
+
+WAKE_UP_EVENTS = {
+    "pull_request",
+    "pull_request_review",
+    "check_suite",
+    "check_run",
+    "status",
+}
+
+
+class WebhookReceiver:
+    """Local HTTP endpoint for GitHub webhooks, waking watchers on relevant events.
+
+    GitHub has to be able to reach it (e.g. through `gh webhook forward` or a tunnel).
+    """
+
+    def __init__(self, port: int, secret: str | None = None, host: str = "127.0.0.1"):
+        self.secret = secret
+        self._event = threading.Event()
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args) -> None:
+                logger.trace(f"webhook: {format % args}")
+
+            def do_POST(self) -> None:
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if not receiver.verify(body, self.headers.get("X-Hub-Signature-256")):
+                    self.send_response(401)
+                    self.end_headers()
+                    return
+                self.send_response(204)
+                self.end_headers()
+                receiver.receive(self.headers.get("X-GitHub-Event", ""))
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        logger.info(f"Listening for GitHub webhooks on http://{host}:{self.port}")
+
+    def verify(self, body: bytes, signature: str | None) -> bool:
+        if self.secret is None:
+            return True
+        digest = hmac.new(self.secret.encode(), body, hashlib.sha256).hexdigest()
+        expected = f"sha256={digest}"
+        return signature is not None and hmac.compare_digest(signature, expected)
+
+    def receive(self, event: str) -> None:
+        """Wake the watcher up on a relevant event (it re-checks every PR, so the
+        payload isn't kept)."""
+        if event not in WAKE_UP_EVENTS:
+            return
+        logger.debug(f"Received '{event}' webhook")
+        self._event.set()
+
+    def wait(self, timeout: float) -> bool:
+        """Wait for a relevant event; return False on timeout."""
+        woken = self._event.wait(timeout)
+        self._event.clear()
+        return woken
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class StackWatcher:
+    """Tracks readiness of every PR of a chain at once.
+
+    Each round checks all PRs concurrently (GET requests are conditional, so unchanged PRs
+    cost no rate limit). The interval doubles while nothing changes and resets when
+    anything does; a webhook event wakes the watcher immediately.
+    """
+
+    def __init__(
+        self,
+        prs: list[PullRequest],
+        check: Callable[[PullRequest], str],
+        receiver: WebhookReceiver | None = None,
+        min_interval: float = 5,
+        max_interval: float = 120,
+    ) -> None:
+        self.prs = prs
+        self.check = check
+        self.receiver = receiver
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+
+    def poll(self) -> dict[int, str]:
+        states = run_concurrently([lambda pr=pr: self.check(pr) for pr in self.prs])
+        return {pr.number: state for pr, state in zip(self.prs, states)}
+
+    def wait(
+        self,
+        done: Callable[[dict[int, str]], bool],
+        timeout: float | None = None,
+    ) -> dict[int, str]:
+        """Poll until `done(states)`; states map PR number to its readiness."""
+        started_at = time.monotonic()
+        interval = self.min_interval
+        last_states = None
+        while True:
+            states = self.poll()
+            if done(states):
+                return states
+            if states != last_states:
+                logger.info(f"Waiting for PRs: {states}")
+                interval = self.min_interval
+            else:
+                interval = min(interval * 2, self.max_interval)
+            last_states = states
+
+            waited = time.monotonic() - started_at
+            if timeout is not None and waited >= timeout:
+                raise TimeoutError(f"PRs are not ready after {waited:.0f}s: {states}")
+            if self.receiver is not None:
+                if self.receiver.wait(interval):
+                    interval = self.min_interval
+            else:
+                time.sleep(interval)
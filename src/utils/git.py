@@ -1,23 +1,98 @@
+import atexit
+import hashlib
+import os
 import re
+import shlex
 import subprocess
+import tempfile
 from pathlib import Path
 
-from dirhash import dirhash
-
-from src.config.env_vars import LOCAL_REPO_PATH
-from src.config.logger import logger
+from src.config.env_vars import GIT_LOG_LEVEL, LOCAL_REPO_PATH, WORKTREE_HASH_CACHE_PATH
+from src.config.logger import is_logged, logger
 from src.models.types import BaseBranch, Branch, Commit, HeadBranch
-
-
-def _run_git_command(args: list[str]) -> tuple[str, str]:
+from src.utils.git_refs import FOR_EACH_REF_ARGS, RefSnapshot
+from src.utils.git_session import GitSession
+from src.utils.metrics import span
+from src.utils.worktree_hash import (
+    DIRTY_STATUS_ARGS,
+    FileHashCache,
+    dirty_paths,
+    fingerprint,
+)
+
+_git_session: GitSession | None = None
+_ref_snapshot: RefSnapshot | None = None
+_file_hash_cache: FileHashCache | None = None
+
+
+def git_session() -> GitSession:
+    """Warm `git cat-file` batch processes shared by all lookups of this run."""
+    global _git_session
+    if _git_session is None:
+        _git_session = GitSession(LOCAL_REPO_PATH)
+        atexit.register(_git_session.close)
+    return _git_session
+
+
+def ref_snapshot() -> RefSnapshot:
+    """All refs of the repo, read with one `git for-each-ref` and reused until invalidated."""
+    global _ref_snapshot
+    if _ref_snapshot is None:
+        stdout, stderr = _run_git_command(FOR_EACH_REF_ARGS)
+        assert stderr == ""
+        _ref_snapshot = RefSnapshot(stdout)
+    return _ref_snapshot
+
+
+def invalidate_ref_snapshot() -> None:
+    """Must be called after every git command that moves a ref."""
+    global _ref_snapshot
+    _ref_snapshot = None
+
+
+def use_worktree(path: str) -> None:
+    """Run the git commands of this process in another worktree of the repo (refs are
+    shared by all worktrees), e.g. in a worker of `run_on_chains`."""
+    global LOCAL_REPO_PATH, _git_session, _file_hash_cache
+    LOCAL_REPO_PATH = path
+    if _git_session is not None:
+        _git_session.close()
+        _git_session = None
+    _file_hash_cache = None  # bound to the files of a worktree
+    invalidate_ref_snapshot()
+
+
+def _run_git_command_unchecked(
+    args: list[str], env: dict[str, str] | None = None, output: bool = True
+) -> tuple[int, str, str]:
+    """Without `output` (the caller only needs the exit status), stdout and stderr are
+    only captured to be logged, if `GIT_LOG_LEVEL` is logged at all ("" otherwise)."""
     all_args: list[str] = ["git", "-C", LOCAL_REPO_PATH] + args
-    result = subprocess.run(all_args, capture_output=True, text=True)
-    logger.trace(" ".join(all_args))
-    logger.trace("-stdout: " + result.stdout.strip())
-    if result.stderr:
-        logger.trace("#stderr: " + result.stderr.strip())
-    assert result.returncode == 0
-    return result.stdout.strip(), result.stderr.strip()
+    pipe = subprocess.PIPE if output or is_logged(GIT_LOG_LEVEL) else subprocess.DEVNULL
+    with span(f"git {args[0]}", "git", argv=" ".join(args)) as git_span:
+        result = subprocess.run(
+            all_args,
+            stdout=pipe,
+            stderr=pipe,
+            text=True,
+            env=os.environ | env if env else None,
+        )
+        stdout, stderr = result.stdout or "", result.stderr or ""
+        git_span.args["returncode"] = result.returncode
+        git_span.args["bytes"] = len(stdout) + len(stderr)
+    # outputs can be large (push, merge...), only formatted if the level is logged
+    log = logger.opt(lazy=True).log
+    log(GIT_LOG_LEVEL, "{}", lambda: " ".join(all_args))
+    log(GIT_LOG_LEVEL, "-stdout: {}", lambda: stdout.strip())
+    if stderr:
+        log(GIT_LOG_LEVEL, "#stderr: {}", lambda: stderr.strip())
+    return result.returncode, stdout.strip(), stderr.strip()
+
+
+def _run_git_command(args: list[str], output: bool = True) -> tuple[str, str]:
+    returncode, stdout, stderr = _run_git_command_unchecked(args, output=output)
+    assert returncode == 0
+    return stdout, stderr
 
 
 def git_checkout(branch: Branch) -> int:
@@ -47,6 +122,7 @@ def git_pull(branch: Branch) -> bool:
     git_checkout(branch)
     # if git_checkout(branch) < 0:
     stdout, stderr = _run_git_command(["pull"])
+    invalidate_ref_snapshot()
     assert stderr == "" or "[new branch]" in stderr
     if stdout == f"Already up to date.":
         return False
@@ -62,9 +138,7 @@ def git_pull_one_commit(branch: Branch, expected_commit_title: str) -> None:
     """Adapted from https://stackoverflow.com/a/64033792/8896457"""
     assert branch == Branch("main")  # currently only main is needed to be pulled
     assert git_checkout(branch) == -1
-    stdout1, stderr1 = _run_git_command(["fetch"])
-    assert stdout1 == ""
-    assert stderr1 == ""
+    git_fetch_branches([branch])
 
     stdout2, stderr2 = _run_git_command(["rev-list", f"{branch}..origin/{branch}"])
 
@@ -79,50 +153,125 @@ def git_pull_one_commit(branch: Branch, expected_commit_title: str) -> None:
 
     assert git_checkout(branch) == -1  # make sure that it's still true
     stdout3, stderr3 = _run_git_command(["merge", origin_commit])
+    invalidate_ref_snapshot()
 
     assert stderr3 == ""
     assert f"Updating {local_commit[:9]}..{origin_commit[:9]}" in stdout3
 
 
-def get_commit_title(commit: Commit) -> str:
-    """Get first line of commit message"""
-    stdout, stderr = _run_git_command(["show", "-s", "--format=%B", commit])
-    assert stderr == ""
-    return stdout.split("\n")[0]
+def git_fetch_branches(branches: list[Branch]) -> dict[Branch, str]:
+    """Fetch only `branches` from origin into their remote-tracking refs (instead of every
+    ref of the remote). Return a per-branch result.
 
+    `ls-remote` first reads the remote tips of just these branches: if they all match the
+    remote-tracking refs, nothing is fetched. Otherwise one `git fetch` with explicit
+    refspecs updates the stale ones, negotiating from the chain's local branches only.
+    In a partial clone (`--filter=blob:none`) git applies the clone's filter to it too.
+    """
+    branches = list(dict.fromkeys(branches))
+    stdout, stderr = _run_git_command(
+        ["ls-remote", "--heads", "origin"] + [f"refs/heads/{b}" for b in branches]
+    )
+    remote: dict[Branch, Commit] = {}
+    for line in stdout.split("\n") if stdout else []:
+        commit, refname = line.split("\t")
+        remote[Branch(refname.removeprefix("refs/heads/"))] = Commit(commit)
+
+    snapshot = ref_snapshot()
+    results: dict[Branch, str] = {}
+    to_fetch: list[Branch] = []
+    for branch in branches:
+        tracking = snapshot.get(f"refs/remotes/origin/{branch}")
+        if branch not in remote:
+            results[branch] = "not on origin"
+        elif tracking == remote[branch]:
+            results[branch] = "up to date"
+        else:
+            to_fetch.append(branch)
+            old = tracking[:9] if tracking else "(new)"
+            results[branch] = f"fetched {old}..{remote[branch][:9]}"
+    if not to_fetch:
+        return results
+
+    negotiation_tips = [
+        f"--negotiation-tip={refname}"
+        for branch in branches
+        for refname in [f"refs/heads/{branch}", f"refs/remotes/origin/{branch}"]
+        if refname in snapshot.refs
+    ]
+    refspecs = [f"+refs/heads/{b}:refs/remotes/origin/{b}" for b in to_fetch]
+    returncode, stdout, stderr = _run_git_command_unchecked(
+        ["fetch", "--no-tags", "--no-write-fetch-head", "origin"]
+        + negotiation_tips
+        + refspecs
+    )
+    invalidate_ref_snapshot()
+    if returncode != 0:
+        raise ValueError(f"Fetch of {to_fetch} failed: {stderr}")
+    return results
 
-def git_push(branch: Branch) -> bool:
-    # TODO check if it is possible to push without checkout
-    # TODO check if it is possible to push (no not-pulled commits on remote etc.)
-    assert branch != "main"
-    git_checkout(branch)
-    # if git_checkout(branch) > 0:
-    head_commit_local_before = _git_rev_parse(branch)
-    head_commit_origin_before = _git_rev_parse(Branch("origin/" + branch))
-    stdout, stderr = _run_git_command(["push"])
-    assert stdout == ""
-    if stderr == f"Everything up-to-date":
-        assert head_commit_local_before == head_commit_origin_before
-        return False
 
-    assert head_commit_local_before != head_commit_origin_before
+def get_commit_title(commit: Commit) -> str:
+    """Get first line of commit message"""
+    return git_session().commit_title(commit)
 
-    head_commit_local_after = _git_rev_parse(branch)
-    head_commit_origin_after = _git_rev_parse(Branch("origin/" + branch))
-    assert (
-        head_commit_local_before == head_commit_local_after == head_commit_origin_after
-    )
 
-    assert (
-        f"{head_commit_origin_before[:9]}..{head_commit_origin_after[:9]}  {branch} -> {branch}"
-        in stderr
+def git_push_branches(
+    branches: list[Branch], force_with_lease: bool = False
+) -> dict[Branch, str]:
+    """Push all branches that differ from origin in one atomic `git push`, without checkout.
+    Return a per-branch result parsed from the porcelain output.
+    With `force_with_lease` (e.g. after `git_restack`), a branch is overwritten only if
+    origin still has the commit of its remote-tracking ref.
+    https://git-scm.com/docs/git-push#_output
+    """
+    assert "main" not in branches
+    snapshot = ref_snapshot()
+    results: dict[Branch, str] = {}
+    to_push: list[Branch] = []
+    for branch in branches:
+        if snapshot.get(branch) == snapshot.get(f"origin/{branch}"):
+            results[branch] = "up to date"
+        else:
+            to_push.append(branch)
+    if not to_push:
+        return results
+
+    refspecs = [f"refs/heads/{branch}:refs/heads/{branch}" for branch in to_push]
+    leases = []
+    if force_with_lease:
+        # an empty expected value means the branch must not exist on origin yet
+        leases = [
+            f"--force-with-lease=refs/heads/{branch}:"
+            + (snapshot.get(f"refs/remotes/origin/{branch}") or "")
+            for branch in to_push
+        ]
+    returncode, stdout, stderr = _run_git_command_unchecked(
+        ["push", "--atomic", "--porcelain", "origin"] + leases + refspecs
     )
-    assert git_checkout(branch) == 0
-    logger.info(f"Pushed {branch}")
-    return True
-
-
-def _git_merge_base(branch1: Branch, branch2: Branch) -> Commit:
+    invalidate_ref_snapshot()
+
+    flags = {
+        " ": "pushed",
+        "+": "forced",
+        "*": "created",
+        "=": "up to date",
+        "!": "rejected",
+        "-": "deleted",
+    }
+    for line in stdout.split("\n"):
+        if "\t" not in line:
+            continue  # "To <url>" and "Done"
+        flag, refspec, summary = line.split("\t", 2)
+        branch = Branch(refspec.split(":")[1].removeprefix("refs/heads/"))
+        results[branch] = f"{flags.get(flag, flag)} ({summary})"
+
+    if returncode != 0:
+        raise ValueError(f"Atomic push failed, nothing was pushed: {results} {stderr}")
+    return {branch: results[branch] for branch in branches}
+
+
+def _git_merge_base(branch1: Branch | Commit, branch2: Branch | Commit) -> Commit:
     """Find the most recent common ancestor of two branches
     https://stackoverflow.com/questions/1549146/git-find-the-most-recent-common-ancestor-of-two-branches
     """
@@ -135,9 +284,9 @@ def _git_rev_parse(branch: Branch) -> Commit:
     """Get current commit hash
     https://stackoverflow.com/questions/15798862/what-does-git-rev-parse-do
     """
-    stdout, stderr = _run_git_command(["rev-parse", branch])
-    assert stderr == ""
-    return Commit(stdout)
+    commit = ref_snapshot().get(branch) or git_session().resolve(branch)
+    assert commit is not None, f"Unknown revision {branch}"
+    return commit
 
 
 def _git_branch_merged(base_branch: BaseBranch, head_branch: HeadBranch) -> bool:
@@ -145,22 +294,261 @@ def _git_branch_merged(base_branch: BaseBranch, head_branch: HeadBranch) -> bool
     To merge branch 1 into branch 2, we will need later `git merge branch1` when on branch 2
     https://stackoverflow.com/questions/226976/how-can-i-know-if-a-branch-has-been-already-merged-into-master
     """
-    merge_base = _git_merge_base(base_branch, head_branch)
-    rev1 = _git_rev_parse(base_branch)
-    rev2 = _git_rev_parse(head_branch)
+    merged = _git_commit_merged(
+        _git_rev_parse(base_branch), _git_rev_parse(head_branch)
+    )
+    if not merged:
+        logger.trace(f"Branch {base_branch} is not merged into {head_branch}")
+    return merged
 
-    assert rev2 != merge_base
+
+def _git_commit_merged(rev1: Commit, rev2: Commit) -> bool:
+    """Check if commit 1 is an ancestor of commit 2 (see `_git_branch_merged`)"""
     assert rev2 != rev1
-    if rev1 != merge_base:
-        logger.trace(f"Branch {base_branch} is not merged into {head_branch}")
+
+    # cheap answer for the common (already merged) case, from the warm batch process
+    if git_session().is_ancestor(rev1, rev2):
+        return True
+
+    merge_base = _git_merge_base(rev1, rev2)
+    assert rev2 != merge_base
     return rev1 == merge_base
 
 
-def git_merge_branch_into(base_branch: BaseBranch, head_branch: HeadBranch) -> bool:
-    if _git_branch_merged(base_branch, head_branch):
+def git_ahead_behind(pairs: list[tuple[Commit, Commit]]) -> list[tuple[int, int]]:
+    """For every (left, right) pair, the number of commits only reachable from left and
+    only reachable from right (like `git rev-list --left-right --count left...right`).
+
+    All pairs are counted in one graph walk: commits reachable from every tip (from their
+    octopus merge base) are common to all pairs, so only the commits above it are listed
+    and marked with the set of tips that reach them.
+    """
+    tips = list(dict.fromkeys(commit for pair in pairs for commit in pair))
+    if not tips:
+        return []
+    returncode, merge_base, _ = _run_git_command_unchecked(
+        ["merge-base", "--octopus"] + tips
+    )
+    exclude = [merge_base] if returncode == 0 else []  # 1 == unrelated histories
+    mask_counts: dict[int, int] = {}
+    for _, _, mask in _git_reachability(tips, exclude):
+        mask_counts[mask] = mask_counts.get(mask, 0) + 1
+
+    def only_reachable_from(tip: Commit, other: Commit) -> int:
+        bit, other_bit = 1 << tips.index(tip), 1 << tips.index(other)
+        return sum(
+            n for mask, n in mask_counts.items() if mask & bit and not mask & other_bit
+        )
+
+    return [
+        (only_reachable_from(left, right), only_reachable_from(right, left))
+        for left, right in pairs
+    ]
+
+
+def _git_reachability(
+    tips: list[Commit], exclude: list[Commit]
+) -> list[tuple[Commit, list[Commit], int]]:
+    """Commits reachable from `tips` but not from `exclude` (one `git rev-list`), children
+    first, with their parents and a mask whose bit i is set if tips[i] reaches them."""
+    stdout, _ = _run_git_command(
+        ["rev-list", "--topo-order", "--parents"]
+        + tips
+        + [f"^{commit}" for commit in exclude]
+    )
+    masks = {tip: 0 for tip in tips}
+    for i, tip in enumerate(tips):
+        masks[tip] |= 1 << i
+    walk = []
+    for line in stdout.split("\n") if stdout else []:
+        commit, *parents = line.split(" ")
+        mask = masks.pop(commit, 0)
+        walk.append((Commit(commit), [Commit(parent) for parent in parents], mask))
+        for parent in parents:
+            masks[parent] = masks.get(parent, 0) | mask
+    return walk
+
+
+def git_restack(links: list[tuple[BaseBranch, HeadBranch]]) -> int:
+    """Rebase a whole chain onto the current commit of its first base in a single
+    `git rebase` pass: every commit is replayed once (merges of a base into its head are
+    dropped) and all head branches are moved together when it succeeds. Pushing needs
+    `--force-with-lease` afterwards. Return the number of replayed commits.
+
+    The rebase runs in LOCAL_REPO_PATH (the last head is checked out meanwhile, then the
+    previous checkout is restored). On conflicts it is aborted, so no branch moves.
+    """
+    heads = [head for _, head in links]
+    checked_out = _git_checked_out_branches() - {_git_current_branch()}
+    assert not checked_out & set(heads), f"Checked out elsewhere: {checked_out}"
+    onto = _git_rev_parse(links[0][0])
+
+    # a commit belongs to the first head of the chain which reaches it
+    own_commits: list[list[Commit]] = [[] for _ in heads]
+    walk = _git_reachability([_git_rev_parse(head) for head in heads], [onto])
+    for commit, parents, mask in reversed(walk):  # parents first
+        if len(parents) == 1:
+            own_commits[(mask & -mask).bit_length() - 1].append(commit)
+
+    todo = []
+    for head, commits in zip(heads, own_commits):
+        todo += [f"pick {commit}" for commit in commits]
+        if head != heads[-1]:  # the rebased branch itself is moved by rebase
+            todo.append(f"update-ref refs/heads/{head}")
+
+    returncode, previous, _ = _run_git_command_unchecked(["symbolic-ref", "-q", "HEAD"])
+    if returncode != 0:  # detached
+        previous, _ = _run_git_command(["rev-parse", "HEAD"])
+    with tempfile.NamedTemporaryFile("w", suffix=".todo") as todo_file:
+        todo_file.write("\n".join(todo) + "\n")
+        todo_file.flush()
+        returncode, stdout, stderr = _run_git_command_unchecked(
+            ["rebase", "-i", "--empty=drop", "--onto", onto, onto, heads[-1]],
+            # the "editor" replaces the todo list git generated with ours
+            env={"GIT_SEQUENCE_EDITOR": f"cp {shlex.quote(todo_file.name)}"},
+        )
+    if returncode != 0:
+        _run_git_command_unchecked(["rebase", "--abort"], output=False)
+    _run_git_command(
+        ["checkout", "-q", previous.removeprefix("refs/heads/")], output=False
+    )
+    invalidate_ref_snapshot()
+    if returncode != 0:
+        raise ValueError(f"Restack failed, nothing was changed: {stdout} {stderr}")
+    replayed = sum(map(len, own_commits))
+    logger.info(f"Restacked {len(heads)} branches ({replayed} commits)")
+    return replayed
+
+
+def _git_current_branch() -> Branch | None:
+    """Branch checked out in LOCAL_REPO_PATH (None if HEAD is detached)"""
+    returncode, stdout, _ = _run_git_command_unchecked(
+        ["symbolic-ref", "--quiet", "--short", "HEAD"]
+    )
+    return Branch(stdout) if returncode == 0 else None
+
+
+def _git_worktrees() -> dict[str, Branch | None]:
+    """Path of every worktree of the repo (LOCAL_REPO_PATH and others) with the branch
+    checked out in it (None if detached)"""
+    stdout, _ = _run_git_command(["worktree", "list", "--porcelain"])
+    worktrees: dict[str, Branch | None] = {}
+    for line in stdout.split("\n"):
+        if line.startswith("worktree "):
+            path = line.removeprefix("worktree ")
+            worktrees[path] = None
+        elif line.startswith("branch refs/heads/"):
+            worktrees[path] = Branch(line.removeprefix("branch refs/heads/"))
+    return worktrees
+
+
+def _git_checked_out_branches() -> set[Branch]:
+    """Branches checked out in any worktree of the repo (LOCAL_REPO_PATH or others)"""
+    return {branch for branch in _git_worktrees().values() if branch}
+
+
+def _git_merge_tree(base_commit: Commit, head_commit: Commit) -> tuple[str, list[str]]:
+    """Merge two commits without touching the index or the worktree (git >= 2.38).
+    Return the merged tree and the list of conflicted paths (empty if the merge is clean).
+    https://git-scm.com/docs/git-merge-tree
+    """
+    returncode, stdout, stderr = _run_git_command_unchecked(
+        [
+            "merge-tree",
+            "--write-tree",
+            "--name-only",
+            "--no-messages",
+            head_commit,
+            base_commit,
+        ]
+    )
+    assert returncode in [0, 1], stderr  # 1 == conflicts
+    tree, *conflicts = stdout.split("\n")
+    return tree, conflicts
+
+
+def _git_commit_tree(tree: str, parents: list[Commit], message: str) -> Commit:
+    """Create a commit object (no ref is moved)"""
+    args = ["commit-tree", tree, "-m", message]
+    for parent in parents:
+        args += ["-p", parent]
+    stdout, stderr = _run_git_command(args)
+    assert stderr == ""
+    return Commit(stdout)
+
+
+def _merge_commit_message(base_branch: Branch, head_branch: Branch) -> str:
+    return f"Merge branch '{base_branch}' into {head_branch}"
+
+
+def _git_merge_branch_into_in_index(
+    base_branch: BaseBranch, head_branch: HeadBranch
+) -> list[str]:
+    """Merge base into head with merge-tree + commit-tree + update-ref, without checkout.
+    Return conflicted paths; if there are any, nothing is written.
+    """
+    base_commit = _git_rev_parse(base_branch)
+    head_commit = _git_rev_parse(head_branch)
+    tree, conflicts = _git_merge_tree(base_commit, head_commit)
+    if conflicts:
+        return conflicts
+
+    merge_commit = _git_commit_tree(
+        tree,
+        [head_commit, base_commit],
+        _merge_commit_message(base_branch, head_branch),
+    )
+    # passing the old value makes update-ref fail if the branch moved in the meantime
+    _run_git_command(
+        ["update-ref", f"refs/heads/{head_branch}", merge_commit, head_commit],
+        output=False,
+    )
+    ref_snapshot().set(f"refs/heads/{head_branch}", merge_commit)
+    return []
+
+
+def git_merge_branch_into(
+    base_branch: BaseBranch,
+    head_branch: HeadBranch,
+    in_index: bool = True,
+    check_merged: bool = True,
+    checked_out: set[Branch] | None = None,
+    worktree_fallback: bool = True,
+) -> bool:
+    """`checked_out` are `_git_checked_out_branches()` if the caller already knows them
+    (e.g. for many merges); a merge in the worktree adds its branch to them.
+    Without `worktree_fallback` (e.g. in a worktree of `run_on_chains`), a merge which
+    can't be done in the index raises a ValueError instead of checking out the branch.
+    """
+    assert in_index or worktree_fallback
+    if check_merged and _git_branch_merged(base_branch, head_branch):
         return False
+    if checked_out is None:
+        checked_out = _git_checked_out_branches()
+
+    # a checked out branch can't be moved under its worktree, merge it the usual way
+    if in_index and head_branch not in checked_out:
+        conflicts = _git_merge_branch_into_in_index(base_branch, head_branch)
+        if not conflicts:
+            logger.info(f"Branch {base_branch} merged into {head_branch} (in index)")
+            return True
+        if not worktree_fallback:
+            raise ValueError(
+                f"Merging {base_branch} into {head_branch} conflicts in {conflicts}"
+            )
+        logger.warning(
+            f"Merging {base_branch} into {head_branch} conflicts in {conflicts}, "
+            "falling back to merge in the worktree"
+        )
+    elif not worktree_fallback:
+        raise ValueError(
+            f"Branch {head_branch} is checked out, it can't be merged into"
+        )
+
     git_checkout(head_branch)
+    checked_out.add(head_branch)
     stdout, stderr = _run_git_command(["merge", base_branch])
+    invalidate_ref_snapshot()
     assert stderr == ""
     if stdout == f"Already up to date.":
         return False
@@ -172,16 +560,26 @@ def git_merge_branch_into(base_branch: BaseBranch, head_branch: HeadBranch) -> b
 
 
 def dirhash_repo() -> str:
-    ignore = [".git/", ".venv/", "local/", "__pycache__/"]
-
-    # from dirhash import included_paths
-    # included_paths11 = included_paths( Path(LOCAL_REPO_PATH), ignore=ignore)
-    # # save to file:
-    # with open("included_paths.txt", "w") as f:
-    #     for path in included_paths11:
-    #         f.write(str(path) + "\n")
+    """Fingerprint (40 hex digits) of the working tree, which changes with any change of
+    a tracked or untracked (not ignored) file.
 
-    dir_hash = dirhash(Path(LOCAL_REPO_PATH), algorithm="sha1", ignore=ignore)
+    Tracked files come from git's index: `write-tree` hashes the staged content (reusing
+    cached trees) and `status` lists files that differ from it, checking the index stat
+    cache. Only those and untracked files are read, and their hashes are cached by stat.
+    """
+    global _file_hash_cache
+    returncode, index_tree, _ = _run_git_command_unchecked(["write-tree"])
+    if returncode != 0:  # unmerged entries (e.g. during a conflict)
+        stdout, _ = _run_git_command(["ls-files", "--stage"])
+        index_tree = hashlib.sha1(stdout.encode()).hexdigest()
+    stdout, _ = _run_git_command(DIRTY_STATUS_ARGS)
+
+    if _file_hash_cache is None:
+        _file_hash_cache = FileHashCache(
+            Path(WORKTREE_HASH_CACHE_PATH), LOCAL_REPO_PATH
+        )
+    file_hashes = _file_hash_cache.hash_files(dirty_paths(stdout))
+    dir_hash = fingerprint(index_tree, file_hashes)
     assert len(dir_hash) == 40
     return dir_hash
 
@@ -0,0 +1,43 @@
+from src.models.types import Commit
+
+FOR_EACH_REF_ARGS = [
+    "for-each-ref",
+    "--format=%(objectname) %(*objectname) %(refname)",
+    "refs/heads",
+    "refs/remotes",
+    "refs/tags",
+]
+
+# the order in which git itself resolves a short ref name (see `git help revisions`)
+_SHORT_NAME_PREFIXES = ["refs/", "refs/tags/", "refs/heads/", "refs/remotes/"]
+
+
+class RefSnapshot:
+    """All local branches, remote-tracking branches and tags read at once.
+
+    Built from a single `git for-each-ref` call; it must be invalidated by every operation
+    that moves a ref (merge, pull, fetch, push...).
+    """
+
+    def __init__(self, for_each_ref_output: str) -> None:
+        self.refs: dict[str, Commit] = {}
+        for line in for_each_ref_output.splitlines():
+            objectname, peeled_objectname, refname = line.split(" ", 2)
+            # annotated tags point to a tag object, keep the commit it points to
+            self.refs[refname] = Commit(peeled_objectname or objectname)
+
+    def get(self, name: str) -> Commit | None:
+        """Resolve a full or short ref name (e.g. `main`, `origin/main`)."""
+        for prefix in _SHORT_NAME_PREFIXES:
+            full_name = name if name.startswith("refs/") else prefix + name
+            if full_name in self.refs:
+                return self.refs[full_name]
+        return None
+
+    def set(self, refname: str, commit: Commit) -> None:
+        """Record a ref moved by this process (cheaper than re-reading all refs)."""
+        assert refname.startswith("refs/")
+        self.refs[refname] = commit
+
+    def __len__(self) -> int:
+        return len(self.refs)
@@ -0,0 +1,121 @@
+import heapq
+import subprocess
+
+from src.config.logger import logger
+from src.models.types import Commit
+from src.utils.metrics import span
+
+
+class GitSession:
+    """Long-lived `git cat-file` processes answering object and rev lookups over pipes.
+
+    Every `git` fork pays for loading the index and pack indexes of the repo; the batch
+    processes pay it once and then serve any number of lookups.
+    """
+
+    def __init__(self, repo_path: str) -> None:
+        self.repo_path = repo_path
+        self._processes: dict[str, subprocess.Popen] = {}
+        self._commits: dict[Commit, tuple[list[Commit], int, str]] = {}
+
+    def _process(self, mode: str) -> subprocess.Popen:
+        process = self._processes.get(mode)
+        if process is None or process.poll() is not None:
+            args = ["git", "-C", self.repo_path, "cat-file", mode]
+            logger.trace("{} (started)", " ".join(args))
+            process = subprocess.Popen(
+                args, stdin=subprocess.PIPE, stdout=subprocess.PIPE
+            )
+            self._processes[mode] = process
+        return process
+
+    def _request(self, mode: str, rev: str) -> tuple[str, str, int] | None:
+        """Send one rev to a batch process and parse the `<oid> <type> <size>` header."""
+        assert "\n" not in rev
+        with span(f"git cat-file {mode}", "git", rev=rev):
+            process = self._process(mode)
+            assert process.stdin is not None and process.stdout is not None
+            process.stdin.write(rev.encode() + b"\n")
+            process.stdin.flush()
+            header = process.stdout.readline().decode().rstrip("\n")
+        logger.trace("cat-file {} {} -> {}", mode, rev, header)
+        if header.endswith(" missing") or header.endswith(" ambiguous"):
+            return None
+        oid, object_type, size = header.split(" ")
+        return oid, object_type, int(size)
+
+    def resolve(self, rev: str) -> Commit | None:
+        """Resolve a rev (branch, `origin/branch`, hash...) to a commit, like `rev-parse`."""
+        result = self._request("--batch-check", rev + "^{commit}")
+        if result is None:
+            return None
+        return Commit(result[0])
+
+    def read_object(self, rev: str) -> tuple[str, bytes]:
+        """Return type and raw content of an object."""
+        result = self._request("--batch", rev)
+        if result is None:
+            raise ValueError(f"Object {rev} not found")
+        _, object_type, size = result
+        stdout = self._processes["--batch"].stdout
+        assert stdout is not None
+        content = stdout.read(size)
+        stdout.read(1)  # trailing newline
+        return object_type, content
+
+    def read_commit(self, commit: Commit) -> tuple[list[Commit], int, str]:
+        """Return parents, committer timestamp and message of a commit (memoized)."""
+        if commit in self._commits:
+            return self._commits[commit]
+        object_type, content = self.read_object(commit)
+        assert object_type == "commit"
+        headers, _, message = content.partition(b"\n\n")
+        parents: list[Commit] = []
+        timestamp = 0
+        for line in headers.decode(errors="replace").split("\n"):
+            if line.startswith("parent "):
+                parents.append(Commit(line[len("parent ") :]))
+            elif line.startswith("committer "):
+                timestamp = int(line.rsplit(" ", 2)[1])
+        self._commits[commit] = parents, timestamp, message.decode(errors="replace")
+        return self._commits[commit]
+
+    def commit_title(self, commit: Commit) -> str:
+        """First line of commit message."""
+        _, _, message = self.read_commit(commit)
+        return message.strip().split("\n")[0]
+
+    def is_ancestor(
+        self, ancestor: Commit, descendant: Commit, max_commits: int = 1000
+    ) -> bool:
+        """Return True if `ancestor` is reachable from `descendant` (within a bounded walk).
+
+        The walk goes newest-first and skips commits older than `ancestor`, so it is short
+        when the answer is yes. False means "not found", callers needing a definite answer
+        should fall back to `git merge-base`.
+        """
+        if ancestor == descendant:
+            return True
+        _, ancestor_time, _ = self.read_commit(ancestor)
+        queue = [(0, descendant)]
+        seen = {descendant}
+        while queue and len(seen) <= max_commits:
+            _, commit = heapq.heappop(queue)
+            parents, _, _ = self.read_commit(commit)
+            for parent in parents:
+                if parent == ancestor:
+                    return True
+                if parent in seen:
+                    continue
+                seen.add(parent)
+                _, parent_time, _ = self.read_commit(parent)
+                if parent_time >= ancestor_time:
+                    heapq.heappush(queue, (-parent_time, parent))
+        return False
+
+    def close(self) -> None:
+        for process in self._processes.values():
+            if process.stdin:
+                process.stdin.close()
+            process.wait()
+        self._processes.clear()
@@ -0,0 +1,88 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from github.PullRequest import PullRequest
+
+from src.config.env_vars import LAND_MERGE_METHOD, LAND_POLL_SECONDS
+from src.config.logger import logger
+from src.models.types import BaseBranch, Branch, HeadBranch, PRChain
+from src.utils.gh import merge_pr, pr_readiness, retarget_prs, wait_pr_ready_to_merge
+from src.utils.gh_watch import StackWatcher, WebhookReceiver
+from src.utils.git import git_fetch_branches, git_push_branches, ref_snapshot
+from src.utils.pr_branches import base, head
+from src.utils.stack_plan import execute_merge_plan, plan_merge_base_into_head
+
+ORIGIN_MAIN = BaseBranch("origin/main")
+PUSHED = ("pushed", "forced", "created", "up to date")  # see `git_push_branches`
+
+
+def propagate_and_push(links: list[tuple[BaseBranch, HeadBranch]]) -> None:
+    """Merge every base into its head (where needed) and push the heads."""
+    plan = plan_merge_base_into_head(links)
+    if plan:
+        execute_merge_plan(plan)
+    results = git_push_branches([head_branch for _, head_branch in links])
+    failed = {b: r for b, r in results.items() if not r.startswith(PUSHED)}
+    if failed:
+        raise ValueError(f"Pushing after landing failed: {failed}")
+    logger.info(f"Pushed after landing: {results}")
+
+
+def land_chain(
+    chain: PRChain, webhook_receiver: WebhookReceiver | None = None
+) -> list[int]:
+    """Merge the PRs of a chain on GitHub from the bottom, one after another.
+    Return the numbers of the merged PRs.
+
+    Readiness of all PRs is checked at once first, so a PR which can't become ready
+    (draft, not approved) stops the landing before anything is merged. After each merge,
+    PRs based on the merged branch are retargeted to `main`, and `main` is fetched and
+    merged into the next PR, which is pushed right away (its CI is what is waited for
+    next, once GitHub shows the pushed commit). Merging into the rest of the chain and pushing it runs in the background,
+    overlapping that wait.
+    """
+    states = StackWatcher(chain, pr_readiness).poll()
+    logger.info(f"Readiness of the chain: {states}")
+    blocked = {n: s for n, s in states.items() if s in ["draft", "not approved"]}
+    if blocked:
+        raise Exception(f"PRs can't be landed: {blocked}")
+
+    remaining = [pr for pr in chain if states[pr.number] != "merged"]
+    snapshot = ref_snapshot()
+    for pr in remaining[:1]:  # the others are pushed before they are merged
+        if snapshot.get(head(pr)) != snapshot.get(f"origin/{head(pr)}"):
+            logger.warning(f"Local {head(pr)} differs from origin, origin's is landed")
+    landed: list[int] = []
+    with ThreadPoolExecutor(max_workers=1) as bookkeeping:
+        pending: Future | None = None
+        pushed_sha: str | None = None
+        while remaining:
+            pr = remaining.pop(0)
+            wait_pr_ready_to_merge(
+                pr,
+                webhook_receiver,
+                min_interval=LAND_POLL_SECONDS,
+                head_sha=pushed_sha,
+            )
+            merge_pr(pr, LAND_MERGE_METHOD)
+            landed.append(pr.number)
+            if pending is not None:
+                pending.result()  # git work of the previous step (raises its errors)
+                pending = None
+            if remaining:
+                pushed_sha = _update_next_pr(pr, remaining)
+                pending = bookkeeping.submit(
+                    propagate_and_push,
+                    [(base(next_pr), head(next_pr)) for next_pr in remaining[1:]],
+                )
+        if pending is not None:
+            pending.result()
+    logger.info(f"Landed PRs: {landed}")
+    return landed
+
+
+def _update_next_pr(merged: PullRequest, remaining: list[PullRequest]) -> str | None:
+    """Return the commit the next PR's head was pushed at."""
+    retarget_prs([pr for pr in remaining if base(pr) == head(merged)], Branch("main"))
+    git_fetch_branches([Branch("main")])
+    propagate_and_push([(ORIGIN_MAIN, head(remaining[0]))])
+    return ref_snapshot().get(head(remaining[0]))
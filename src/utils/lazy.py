@@ -0,0 +1,26 @@
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Import a module whose code only runs on first attribute access.
+
+    Keeps heavy dependencies (prompts, tables...) out of the startup of commands that
+    never use them. `from module import name` would load it right away, so lazily
+    imported modules are used through their attributes (`q.confirm`, `tabulate.tabulate`).
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.loader is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    parent, _, child = name.rpartition(".")
+    if parent:  # like `import a.b`, which binds `b` in `a` (`a.b.c` has to resolve)
+        setattr(sys.modules[parent], child, module)
+    return module
@@ -0,0 +1,187 @@
+import cProfile
+import functools
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, TypeVar
+
+from src.config import env_vars
+from src.config.logger import logger
+from src.utils.lazy import lazy_import
+
+tabulate = lazy_import("tabulate")
+
+T = TypeVar("T")
+
+PROFILE_TOP = 30  # functions printed by `--profile`
+
+
+@dataclass
+class Span:
+    """One timed operation: a CLI command, a git call or a GitHub request."""
+
+    name: str
+    category: str  # "command", "git", "api" or "daemon"
+    start: float  # time.perf_counter()
+    parent: "Span | None" = None
+    duration: float = 0.0
+    args: dict[str, Any] = field(default_factory=dict)
+    thread_id: int = field(default_factory=threading.get_ident)
+
+
+_spans: list[Span] = []
+_spans_lock = threading.Lock()
+_local = threading.local()
+_command: Span | None = None  # parent of spans started by worker threads
+_started_at = time.perf_counter()
+
+
+def _stack() -> list[Span]:
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+@contextmanager
+def span(name: str, category: str, **args: Any) -> Iterator[Span]:
+    """Time the block as a child of the current span; more `args` can be added to the
+    yielded span (e.g. the exit status once it is known)."""
+    stack = _stack()
+    parent = stack[-1] if stack else _command
+    current = Span(name, category, time.perf_counter(), parent)
+    current.args.update(args)
+    stack.append(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.args["error"] = type(e).__name__
+        raise
+    finally:
+        current.duration = time.perf_counter() - current.start
+        stack.pop()
+        with _spans_lock:
+            _spans.append(current)
+
+
+def command(function: Callable[..., T]) -> Callable[..., T]:
+    """Record every call of a CLI command as a span, parent of its git and API calls."""
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs) -> T:
+        global _command
+        with span(function.__name__, "command") as current:
+            previous, _command = _command, current
+            try:
+                return function(*args, **kwargs)
+            finally:
+                _command = previous
+
+    return wrapper
+
+
+def endpoint(url: str) -> str:
+    """URL path without the query, with numbers (PRs, reviews...) replaced by `{n}`."""
+    path = url.split("?")[0]
+    if "://" in path:
+        path = "/" + path.split("://", 1)[1].partition("/")[2]
+    return re.sub(r"/\d+(?=/|$)", "/{n}", path)
+
+
+def spans() -> list[Span]:
+    with _spans_lock:
+        return list(_spans)
+
+
+def clear() -> None:
+    """Forget recorded spans, e.g. after each request of a long-running daemon."""
+    with _spans_lock:
+        _spans.clear()
+
+
+def summary() -> str:
+    """Table of recorded spans grouped by category and name, slowest first."""
+    groups: dict[tuple[str, str], list[Span]] = {}
+    for recorded in spans():
+        groups.setdefault((recorded.category, recorded.name), []).append(recorded)
+
+    table = []
+    for (category, name), group in groups.items():
+        durations = [recorded.duration for recorded in group]
+        table.append(
+            [
+                category,
+                name,
+                len(group),
+                round(sum(durations) * 1000, 1),
+                round(max(durations) * 1000, 1),
+                sum(recorded.args.get("bytes", 0) for recorded in group),
+                sum(1 for recorded in group if _failed(recorded)),
+            ]
+        )
+    table.sort(key=lambda row: (row[0] != "command", -row[3]))
+    return tabulate.tabulate(
+        table,
+        headers=["Category", "Name", "Calls", "Total ms", "Max ms", "Bytes", "Errors"],
+    )
+
+
+def _failed(recorded: Span) -> bool:
+    return (
+        "error" in recorded.args
+        or recorded.args.get("returncode", 0) != 0
+        or recorded.args.get("status", 0) >= 400
+    )
+
+
+def write_chrome_trace(path: Path) -> None:
+    """Write spans in the Trace Event Format (chrome://tracing, Perfetto)."""
+    pid = os.getpid()
+    events = [
+        {
+            "name": recorded.name,
+            "cat": recorded.category,
+            "ph": "X",
+            "ts": round((recorded.start - _started_at) * 1e6, 1),
+            "dur": round(recorded.duration * 1e6, 1),
+            "pid": pid,
+            "tid": recorded.thread_id,
+            "args": {key: str(value) for key, value in recorded.args.items()},
+        }
+        for recorded in spans()
+    ]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}))
+    logger.info(f"Wrote trace of {len(events)} spans to {path}")
+
+
+def report() -> None:
+    if not spans():
+        return
+    logger.info("Metrics: \n" + summary())
+    if env_vars.METRICS_TRACE_PATH:
+        write_chrome_trace(Path(env_vars.METRICS_TRACE_PATH))
+
+
+def run_cli(function: Callable[..., Any], *args: Any) -> None:
+    """Run a CLI command and report its metrics (even if it fails).
+    With `--profile` on the command line, the command runs under cProfile."""
+    try:
+        if "--profile" not in sys.argv[1:]:
+            function(*args)
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.runcall(function, *args)
+        finally:
+            stats = pstats.Stats(profiler, stream=sys.stderr)
+            stats.sort_stats("cumulative").print_stats(PROFILE_TOP)
+    finally:
+        report()
@@ -26,3 +26,43 @@ def create_pr_blueprints_from_branches(
             )
 
     return pr_blueprints
+
+
+def create_pr_blueprints_from_spec(
+    bases: dict[Branch, Branch],
+) -> list[PullRequestBlueprint]:
+    """Create PullRequestBlueprints from the base of every head (of a stack spec)."""
+    return [
+        PullRequestBlueprint(head=head, base=base, title=head)
+        for head, base in bases.items()
+    ]
+
+
+def pr_blueprint_levels(
+    pr_blueprints: list[PullRequestBlueprint],
+) -> list[list[PullRequestBlueprint]]:
+    """Group blueprints by level of their dependency DAG: a PR based on the head of
+    another blueprint is one level above it, a PR based on any other branch (`main`,
+    existing PRs) is on level 0. PRs of one level don't depend on each other.
+    """
+    by_head = {pr_blueprint.head: pr_blueprint for pr_blueprint in pr_blueprints}
+    depths: dict[Branch, int] = {}
+    for pr_blueprint in pr_blueprints:
+        path: list[Branch] = []  # heads down to a known depth or a branch outside
+        branch = pr_blueprint.head
+        while branch in by_head and branch not in depths:
+            if branch in path:
+                raise Exception(f"Cycle of PR bases: {' <- '.join(path)}")
+            path.append(branch)
+            branch = by_head[branch].base
+        depth = depths.get(branch, -1)
+        for head in reversed(path):
+            depth += 1
+            depths[head] = depth
+
+    levels: list[list[PullRequestBlueprint]] = [
+        [] for _ in range(max(depths.values(), default=-1) + 1)
+    ]
+    for pr_blueprint in pr_blueprints:
+        levels[depths[pr_blueprint.head]].append(pr_blueprint)
+    return levels
@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from src.models.types import BaseBranch, HeadBranch
+
+if TYPE_CHECKING:
+    from github.PullRequest import PullRequest
+
+
+def head(pr: PullRequest) -> HeadBranch:
+    return HeadBranch(pr.head.label.split(":")[1])
+
+
+def base(pr: PullRequest) -> BaseBranch:
+    return BaseBranch(pr.base.label.split(":")[1])
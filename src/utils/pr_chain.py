@@ -1,24 +1,224 @@
+from typing import Any
+
 from src.config.logger import logger
-from src.models.types import PRChain
-from src.utils.gh import base, head
-from src.utils.git import _git_branch_merged, git_merge_branch_into, git_push
+from src.models.types import BaseBranch, Branch, Commit, HeadBranch, PRChain
+from src.utils.git import (
+    _git_commit_merged,
+    _git_commit_tree,
+    _git_merge_tree,
+    _git_rev_parse,
+    _merge_commit_message,
+    get_commit_title,
+    git_ahead_behind,
+    git_fetch_branches,
+    git_push_branches,
+    git_restack,
+    invalidate_ref_snapshot,
+    ref_snapshot,
+)
+from src.utils.lazy import lazy_import
+from src.utils.pr_branches import base, head
+from src.utils.stack_plan import (
+    execute_merge_plan,
+    format_merge_plan,
+    plan_merge_base_into_head,
+)
+from src.utils.worktree_pool import merge_chains, push_chains, run_on_chains
+
+tabulate = lazy_import("tabulate")
 
+STATUS_HEADERS = [
+    "PR",
+    "Base",
+    "Head",
+    "Ahead",
+    "Behind",
+    "Merge",
+    "Origin",
+    "Last commit",
+]
 
-def merge_base_into_head(chain: PRChain) -> None:
+
+def merge_base_into_head(chain: PRChain, dry_run: bool = False) -> None:
     """Sync stacked branches in the order they are given"""
-    for i in range(len(chain) - 1, -1, -1):
-        logger.trace(f"{i=}")
-        current_pr = chain[i]
-        if _git_branch_merged(base(current_pr), head(current_pr)):
+    invalidate_ref_snapshot()  # read all refs of the chain fresh, once
+    if dry_run:
+        predict_merge_conflicts(chain)
+        return
+
+    plan = plan_merge_base_into_head(chain_links(chain))
+    if not plan:
+        logger.info("Chain is up to date")
+        return
+    logger.info("Merge plan: \n" + format_merge_plan(plan))
+    execute_merge_plan(plan)
+
+
+def merge_base_into_head_all_chains(chains: list[PRChain]) -> None:
+    """Sync all chains, independent ones in parallel (see `run_on_chains`)"""
+    results = run_on_chains(
+        merge_chains, [chain_links(chain) for chain in chains], skip_checked_out=True
+    )
+    invalidate_ref_snapshot()  # moved by the workers
+    logger.info(
+        "Merge results: \n"
+        + tabulate.tabulate(list(results.items()), headers=["Chains", "Result"])
+    )
+
+
+def chain_links(chain: PRChain) -> list[tuple[BaseBranch, HeadBranch]]:
+    return [(base(pr), head(pr)) for pr in chain]
+
+
+def predict_merge_conflicts(chain: PRChain) -> dict[HeadBranch, list[str]]:
+    """Simulate `merge_base_into_head` for every link of the chain without moving any ref.
+    Return conflicted paths per head branch (links that would merge cleanly are omitted).
+    """
+    simulated: dict[Branch, Commit] = {}  # branch -> its commit after simulated merges
+    conflicts: dict[HeadBranch, list[str]] = {}
+    table = []
+    for pr in chain:
+        base_commit = simulated.get(base(pr)) or _git_rev_parse(base(pr))
+        head_commit = _git_rev_parse(head(pr))
+        if _git_commit_merged(base_commit, head_commit):
+            simulated[head(pr)] = head_commit
+            table.append([base(pr), head(pr), "up to date"])
+            continue
+
+        tree, link_conflicts = _git_merge_tree(base_commit, head_commit)
+        if link_conflicts:
+            conflicts[head(pr)] = link_conflicts
+            simulated[head(pr)] = head_commit  # next links are predicted without it
+            table.append([base(pr), head(pr), "CONFLICT: " + ", ".join(link_conflicts)])
             continue
-        else:
-            for j in range(i, len(chain)):
-                logger.trace(f".{j=}")
-                current_pr = chain[j]
-                git_merge_branch_into(base(current_pr), head(current_pr))
 
+        # unreferenced commit object, so the next link is predicted against merged base
+        simulated[head(pr)] = _git_commit_tree(
+            tree,
+            [head_commit, base_commit],
+            _merge_commit_message(base(pr), head(pr)),
+        )
+        table.append([base(pr), head(pr), "clean merge"])
+
+    logger.info(
+        "Merge prediction: \n"
+        + tabulate.tabulate(table, headers=["Base", "Head", "Result"])
+    )
+    return conflicts
 
-def push(chain: PRChain) -> None:
-    """Push all head branches in PR chain"""
+
+def chain_status(chain: PRChain) -> list[dict[str, Any]]:
+    """Every link of the chain: how far its head is ahead of / behind its base, whether it
+    needs a merge of its base, its last commit and how it compares to origin.
+    All counts come from one graph walk, whatever the length of the chain.
+    """
+    invalidate_ref_snapshot()
+    snapshot = ref_snapshot()
+    pairs = []
     for pr in chain:
-        git_push(head(pr))
+        head_commit = _git_rev_parse(head(pr))
+        origin_commit = snapshot.get(f"origin/{head(pr)}")
+        pairs.append((head_commit, _git_rev_parse(base(pr))))
+        pairs.append((head_commit, origin_commit or head_commit))
+    counts = git_ahead_behind(pairs)
+
+    rows = []
+    needs_merge = False  # once a link is merged into, every link above it is stale
+    for i, pr in enumerate(chain):
+        ahead, behind = counts[2 * i]
+        needs_merge = needs_merge or behind > 0
+        rows.append(
+            {
+                "pr": pr.number,
+                "base": base(pr),
+                "head": head(pr),
+                "ahead": ahead,
+                "behind": behind,
+                "stale": behind > 0,
+                "needs_merge": needs_merge,
+                "origin": _origin_status(
+                    snapshot.get(f"origin/{head(pr)}") is not None, *counts[2 * i + 1]
+                ),
+                "title": get_commit_title(pairs[2 * i][0]),
+            }
+        )
+    return rows
+
+
+def _origin_status(pushed: bool, ahead: int, behind: int) -> str:
+    if not pushed:
+        return "not pushed"
+    if ahead and behind:
+        return f"diverged (+{ahead} -{behind})"
+    if ahead:
+        return f"ahead {ahead}"
+    if behind:
+        return f"behind {behind}"
+    return "up to date"
+
+
+def format_chain_status(rows: list[dict[str, Any]]) -> str:
+    return tabulate.tabulate(
+        [
+            [
+                f"#{row['pr']}",
+                row["base"],
+                row["head"],
+                row["ahead"],
+                row["behind"],
+                _merge_status(row),
+                row["origin"],
+                row["title"],
+            ]
+            for row in rows
+        ],
+        headers=STATUS_HEADERS,
+    )
+
+
+def _merge_status(row: dict[str, Any]) -> str:
+    if row["stale"]:
+        return "stale"
+    return "after merges below" if row["needs_merge"] else "up to date"
+
+
+def fetch(chain: PRChain) -> None:
+    """Fetch `main` and the branches of the PR chain from origin (nothing else)"""
+    branches = [Branch("main")]
+    for pr in chain:
+        branches += [base(pr), head(pr)]
+    results = git_fetch_branches(branches)
+    logger.info(
+        "Fetch results: \n"
+        + tabulate.tabulate(list(results.items()), headers=["Branch", "Result"])
+    )
+
+
+def push_all_chains(chains: list[PRChain]) -> None:
+    """Push head branches of all chains, independent ones in parallel"""
+    results = run_on_chains(push_chains, [chain_links(chain) for chain in chains])
+    invalidate_ref_snapshot()
+    logger.info(
+        "Push results: \n"
+        + tabulate.tabulate(list(results.items()), headers=["Chains", "Result"])
+    )
+
+
+def restack(chain: PRChain) -> None:
+    """Rebase the chain onto its first base in one pass (instead of merging every base
+    into its head); push it afterwards with `force_with_lease`"""
+    invalidate_ref_snapshot()
+    if not plan_merge_base_into_head(chain_links(chain)):
+        logger.info("Chain is up to date")
+        return
+    git_restack(chain_links(chain))
+
+
+def push(chain: PRChain, force_with_lease: bool = False) -> None:
+    """Push all head branches in PR chain (in one atomic push)"""
+    invalidate_ref_snapshot()
+    results = git_push_branches([head(pr) for pr in chain], force_with_lease)
+    logger.info(
+        "Push results: \n"
+        + tabulate.tabulate(list(results.items()), headers=["Branch", "Result"])
+    )
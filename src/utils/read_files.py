@@ -1,10 +1,15 @@
 from pathlib import Path
+from typing import Any
 
-import questionary as q
-from ruamel.yaml import YAML
-
+from src.config.env_vars import BRANCH_PREFIX
 from src.config.logger import logger
 from src.models.types import Branch
+from src.utils.lazy import lazy_import
+
+q = lazy_import("questionary")
+yaml = lazy_import("ruamel.yaml")
+
+SPEC_SUFFIXES = [".yaml", ".yml"]
 
 
 def load_branches_from_file(file: Path) -> list[Branch]:
@@ -20,11 +25,90 @@ def load_branches_from_file(file: Path) -> list[Branch]:
     return branches
 
 
+def load_stack_spec(file: Path) -> dict[Branch, Branch]:
+    """Load a YAML spec of stacks: the base branch of every head branch, in file order.
+
+        stacks:
+          - base: main  # optional, `main` by default
+            branches:  # each one based on the previous one
+              - kz/feature
+              - kz/feature-api:  # a mapping forks sub-stacks from its branch
+                  - [kz/feature-api-docs]
+                  - [kz/feature-api-v2, kz/feature-api-v2-tests]
+              - kz/feature-ui  # based on kz/feature-api
+
+    A stack may also be based on a branch of another stack. The whole spec is
+    validated in one pass, and all its errors are reported together.
+    """
+    spec = yaml.YAML(typ="safe").load(file)
+    errors: list[str] = []
+    bases: dict[Branch, Branch] = {}
+
+    def branch(name: Any, where: str) -> Branch | None:
+        if not isinstance(name, str) or not Branch.is_valid(name):
+            errors.append(f"{where}: {name!r} is not a valid branch name")
+            return None
+        return Branch(name)
+
+    def add_stack(base: Branch, items: Any, where: str) -> None:
+        if not isinstance(items, list) or not items:
+            errors.append(f"{where}: expected a non-empty list of branches")
+            return
+        for i, item in enumerate(items):
+            item_where = f"{where}[{i}]"
+            forks: Any = []
+            if isinstance(item, dict):
+                if len(item) != 1:
+                    errors.append(f"{item_where}: expected one branch with its forks")
+                    return
+                [(item, forks)] = item.items()
+                if not isinstance(forks, list):
+                    errors.append(f"{item_where}: expected a list of forked stacks")
+                    forks = []
+            head = branch(item, item_where)
+            if head is None:
+                return  # the rest of the stack has no valid base
+            if not head.startswith(BRANCH_PREFIX):
+                errors.append(
+                    f"{item_where}: {head} doesn't start with {BRANCH_PREFIX}"
+                )
+            if head in bases or head == "main":
+                errors.append(f"{item_where}: {head} is already in the spec")
+            else:
+                bases[head] = base
+            for j, fork in enumerate(forks):
+                add_stack(head, fork, f"{item_where}.{head}[{j}]")
+            base = head
+
+    if not isinstance(spec, dict) or not isinstance(spec.get("stacks"), list):
+        raise Exception(f"Invalid stack spec {file}: expected a `stacks` list")
+    for i, stack in enumerate(spec["stacks"]):
+        where = f"stacks[{i}]"
+        if not isinstance(stack, dict) or set(stack) - {"base", "branches"}:
+            errors.append(f"{where}: expected a mapping of `base` and `branches`")
+            continue
+        base = branch(stack.get("base", "main"), f"{where}.base")
+        if base is None:
+            continue
+        if not (base.startswith(BRANCH_PREFIX) or base == "main"):
+            errors.append(f"{where}.base: {base} doesn't start with {BRANCH_PREFIX}")
+        add_stack(base, stack.get("branches"), f"{where}.branches")
+
+    if errors:
+        raise Exception(f"Invalid stack spec {file}:\n" + "\n".join(errors))
+    return bases
+
+
 def find_branches_file() -> Path:
-    """Return file from directory, if more than one file, ask user to select one."""
+    """Return file from directory, if more than one file, ask user to select one.
+    Files are lists of branches (`*.txt`) or stack specs (`*.yaml`, `*.yml`)."""
     BRANCHES_DIR = Path("branches/")
 
-    files = list(BRANCHES_DIR.glob("*.txt"))
+    files = sorted(
+        file
+        for pattern in ["*.txt"] + [f"*{suffix}" for suffix in SPEC_SUFFIXES]
+        for file in BRANCHES_DIR.glob(pattern)
+    )
     if len(files) == 0:
         raise Exception("No files found in branches/ directory.")
     elif len(files) == 1:
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, NamedTuple
+
+from src.models.types import PRChain
+
+if TYPE_CHECKING:
+    from github.PullRequest import PullRequest
+
+
+class ChainPath(NamedTuple):
+    """A root-to-PR path stored as a linked list, so paths share their prefixes."""
+
+    pr: PullRequest
+    parent: ChainPath | None
+    length: int
+
+    def to_chain(self) -> PRChain:
+        prs = []
+        node: ChainPath | None = self
+        while node is not None:
+            prs.append(node.pr)
+            node = node.parent
+        return PRChain(reversed(prs))
+
+
+class StackGraph:
+    """Index of PRs as a forest of stacks: PR -> PRs based on its head branch.
+
+    Built in one pass; every query walks each PR at most once, so discovering chains is
+    linear in the number of PRs (plus the size of the returned chains).
+    """
+
+    def __init__(self, prs: list[PullRequest]) -> None:
+        self.prs = prs
+        self.children: dict[str, list[PullRequest]] = {}  # base label -> PRs
+        self.by_head: dict[str, list[PullRequest]] = {}  # head label -> PRs
+        self.by_branch: dict[str, list[PullRequest]] = {}  # head/base name -> PRs
+        for pr in prs:
+            self.children.setdefault(pr.base.label, []).append(pr)
+            self.by_head.setdefault(pr.head.label, []).append(pr)
+            for label in [pr.head.label, pr.base.label]:
+                self.by_branch.setdefault(label.split(":")[1], []).append(pr)
+        # roots are based on a branch which is not a head of any PR (e.g. `main`)
+        self.roots = [pr for pr in prs if pr.base.label not in self.by_head]
+        self._leaf_paths: dict[str, ChainPath] | None = None
+
+    def leaf_paths(self) -> dict[str, ChainPath]:
+        """The longest root-to-leaf path for every leaf PR, keyed by the leaf's head label."""
+        if self._leaf_paths is None:
+            self._leaf_paths = self._find_leaf_paths()
+        return self._leaf_paths
+
+    def _find_leaf_paths(self) -> dict[str, ChainPath]:
+        paths: dict[str, ChainPath] = {}
+        expanded: set[int] = set()
+        stack = [ChainPath(root, None, 1) for root in reversed(self.roots)]
+        while stack:
+            path = stack.pop()
+            if id(path.pr) in expanded:  # only possible if two PRs share a head branch
+                continue
+            expanded.add(id(path.pr))
+
+            next_prs = self.children.get(path.pr.head.label)
+            if next_prs:
+                for next_pr in reversed(next_prs):
+                    stack.append(ChainPath(next_pr, path, path.length + 1))
+                continue
+
+            leaf = path.pr.head.label
+            if leaf not in paths or path.length > paths[leaf].length:
+                paths[leaf] = path
+        return paths
+
+    def chains(self) -> list[PRChain]:
+        """All maximal chains (at least 2 PRs long)."""
+        return [
+            path.to_chain() for path in self.leaf_paths().values() if path.length > 1
+        ]
+
+    def _leaves_below(self, pr: PullRequest) -> list[str]:
+        leaves = []
+        stack = [pr]
+        visited: set[int] = set()
+        while stack:
+            pr = stack.pop()
+            if id(pr) in visited:
+                continue
+            visited.add(id(pr))
+            next_prs = self.children.get(pr.head.label)
+            if next_prs:
+                stack.extend(next_prs)
+            else:
+                leaves.append(pr.head.label)
+        return leaves
+
+    def chains_containing(self, branch: str) -> list[PRChain]:
+        """Chains in which `branch` is the head or the base of some PR."""
+        paths = self.leaf_paths()
+        chains = []
+        seen_leaves = set()
+        for pr in self.by_branch.get(branch, []):
+            for leaf in self._leaves_below(pr):
+                if leaf in seen_leaves or leaf not in paths or paths[leaf].length < 2:
+                    continue
+                seen_leaves.add(leaf)
+                chains.append(paths[leaf].to_chain())
+        return chains
@@ -0,0 +1,48 @@
+from src.config.logger import logger
+from src.models.types import BaseBranch, HeadBranch, MergeStep
+from src.utils.git import (
+    _git_branch_merged,
+    _git_checked_out_branches,
+    git_merge_branch_into,
+)
+from src.utils.lazy import lazy_import
+
+tabulate = lazy_import("tabulate")
+
+
+def plan_merge_base_into_head(
+    links: list[tuple[BaseBranch, HeadBranch]]
+) -> list[MergeStep]:
+    """Compute the minimal ordered list of merges that brings a stack up to date.
+
+    `links` are (base, head) pairs ordered from the bottom of the stack. Merging into a
+    link changes its head, which is the base of the next link, so every link after the
+    first stale one is stale too: one pass up to the first stale link is enough, and
+    each branch is merged into at most once.
+    """
+    for i, (base_branch, head_branch) in enumerate(links):
+        if not _git_branch_merged(base_branch, head_branch):
+            return [MergeStep(base=base, head=head) for base, head in links[i:]]
+    return []
+
+
+def format_merge_plan(plan: list[MergeStep]) -> str:
+    return tabulate.tabulate(
+        [[i + 1, step.base, step.head] for i, step in enumerate(plan)],
+        headers=["#", "Merge", "Into"],
+    )
+
+
+def execute_merge_plan(plan: list[MergeStep], worktree_fallback: bool = True) -> None:
+    """See `git_merge_branch_into` for `worktree_fallback`."""
+    checked_out = _git_checked_out_branches()  # once for the whole plan
+    for step in plan:
+        # the plan already knows the link is stale, skip re-checking it
+        git_merge_branch_into(
+            step.base,
+            step.head,
+            check_merged=False,
+            checked_out=checked_out,
+            worktree_fallback=worktree_fallback,
+        )
+    logger.info(f"Executed merge plan ({len(plan)} merges)")
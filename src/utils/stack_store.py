@@ -0,0 +1,136 @@
+import json
+import sqlite3
+from collections.abc import Iterator
+from contextlib import closing, contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+# search results can lag behind updates, re-read this much before the high-water mark
+HIGH_WATER_MARK_OVERLAP = timedelta(minutes=5)
+
+
+class StackStore:
+    """Local SQLite copy of user's open PRs (and the chains they form), per repo.
+
+    PRs are stored as REST-shaped attributes (see `gh_graphql._pr_attributes`) together
+    with the `updated_at` high-water mark, so a refresh only needs PRs updated since then.
+    """
+
+    def __init__(self, path: Path, repo: str) -> None:
+        self.path = path
+        self.repo = repo
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._transaction() as db:
+            db.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS prs (
+                    repo TEXT NOT NULL,
+                    number INTEGER NOT NULL,
+                    head TEXT NOT NULL,
+                    base TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    attributes TEXT NOT NULL,
+                    PRIMARY KEY (repo, number)
+                );
+                CREATE TABLE IF NOT EXISTS chains (
+                    repo TEXT NOT NULL,
+                    leaf TEXT NOT NULL,
+                    numbers TEXT NOT NULL,
+                    PRIMARY KEY (repo, leaf)
+                );
+                CREATE TABLE IF NOT EXISTS sync (
+                    repo TEXT PRIMARY KEY,
+                    high_water_mark TEXT NOT NULL
+                );
+                """
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # a connection per call, so the store can be refreshed from a background thread
+        return sqlite3.connect(self.path)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with closing(self._connect()) as db, db:
+            yield db
+
+    def high_water_mark(self) -> str | None:
+        with closing(self._connect()) as db:
+            row = db.execute(
+                "SELECT high_water_mark FROM sync WHERE repo = ?", (self.repo,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def load(self) -> list[dict[str, Any]]:
+        """Attributes of all stored (open) PRs."""
+        with closing(self._connect()) as db:
+            rows = db.execute(
+                "SELECT attributes FROM prs WHERE repo = ? ORDER BY number",
+                (self.repo,),
+            ).fetchall()
+        return [json.loads(attributes) for (attributes,) in rows]
+
+    def chains(self) -> list[list[int]]:
+        """PR numbers of stored chains."""
+        with closing(self._connect()) as db:
+            rows = db.execute(
+                "SELECT numbers FROM chains WHERE repo = ?", (self.repo,)
+            ).fetchall()
+        return [json.loads(numbers) for (numbers,) in rows]
+
+    def apply(self, changed_prs: list[dict[str, Any]], full: bool = False) -> None:
+        """Store changed PRs (closed/merged ones are removed) and advance the high-water
+        mark. With `full`, `changed_prs` replace everything stored for the repo (with no
+        PRs, the high-water mark is the time of the sync)."""
+        high_water_mark = self.high_water_mark()
+        with self._transaction() as db:
+            if full:
+                db.execute("DELETE FROM prs WHERE repo = ?", (self.repo,))
+            for pr in changed_prs:
+                if pr["state"] != "open":
+                    db.execute(
+                        "DELETE FROM prs WHERE repo = ? AND number = ?",
+                        (self.repo, pr["number"]),
+                    )
+                    continue
+                db.execute(
+                    "INSERT OR REPLACE INTO prs VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        self.repo,
+                        pr["number"],
+                        pr["head"]["label"],
+                        pr["base"]["label"],
+                        pr["updated_at"],
+                        json.dumps(pr),
+                    ),
+                )
+
+            newest = max((pr["updated_at"] for pr in changed_prs), default=None)
+            if newest is None and full:
+                newest = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+            if newest is not None:
+                if full or high_water_mark is None or newest > high_water_mark:
+                    db.execute(
+                        "INSERT OR REPLACE INTO sync VALUES (?, ?)", (self.repo, newest)
+                    )
+
+    def save_chains(self, chains: dict[str, list[int]]) -> None:
+        """Store derived chains (leaf head label -> PR numbers)."""
+        with self._transaction() as db:
+            db.execute("DELETE FROM chains WHERE repo = ?", (self.repo,))
+            db.executemany(
+                "INSERT INTO chains VALUES (?, ?, ?)",
+                [
+                    (self.repo, leaf, json.dumps(numbers))
+                    for leaf, numbers in chains.items()
+                ],
+            )
+
+    def refresh_since(self) -> str | None:
+        """Timestamp from which PRs have to be re-fetched (None == full sync needed)."""
+        high_water_mark = self.high_water_mark()
+        if high_water_mark is None:
+            return None
+        since = datetime.fromisoformat(high_water_mark.replace("Z", "+00:00"))
+        return (since - HIGH_WATER_MARK_OVERLAP).strftime("%Y-%m-%dT%H:%M:%SZ")
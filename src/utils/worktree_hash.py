@@ -0,0 +1,158 @@
+import hashlib
+import mmap
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from pathlib import Path
+
+# lists only files whose working tree content differs from the index, and untracked
+# files (not ignored by .gitignore); git refreshes its index stat cache on the way
+DIRTY_STATUS_ARGS = [
+    "status",
+    "--porcelain=v2",
+    "-z",
+    "--untracked-files=all",
+    "--no-renames",
+]
+IGNORED_DIRECTORIES = {".git", ".venv", "local", "__pycache__"}
+
+PARALLEL_MIN_FILES = 64  # below this, a process pool costs more than it saves
+PARALLEL_MIN_BYTES = 16 * 2**20
+RACY_SECONDS = 2  # files modified this recently are hashed, but not cached
+
+DELETED = "deleted"
+
+
+def dirty_paths(status_output: str) -> list[str]:
+    """Paths (relative to the repo) of modified, deleted and untracked files, given the
+    output of `git status` with `DIRTY_STATUS_ARGS`."""
+    paths = []
+    for entry in status_output.split("\0"):
+        if entry.startswith("? "):
+            path = entry[2:]
+        elif entry.startswith("1 ") or entry.startswith("u "):
+            # "1 XY sub mH mI mW hH hI path", "u XY sub m1 m2 m3 mW h1 h2 h3 path"
+            fields = entry.split(" ", 8 if entry[0] == "1" else 10)
+            if entry[0] == "1" and fields[1][1] == ".":
+                continue  # only staged, the index tree covers it
+            path = fields[-1]
+        else:
+            continue
+        if not IGNORED_DIRECTORIES.intersection(path.split("/")[:-1]):
+            paths.append(path)
+    return paths
+
+
+def hash_file(path: str) -> str:
+    """SHA-1 of a file's content (mapped into memory, not copied), `DELETED` if it is gone."""
+    try:
+        if os.path.islink(path):
+            return hashlib.sha1(os.readlink(path).encode()).hexdigest()
+        if os.path.isdir(path):  # e.g. a modified submodule
+            return hashlib.sha1(b"directory").hexdigest()
+        digest = hashlib.sha1()
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size > 0:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+                    digest.update(content)
+        return digest.hexdigest()
+    except FileNotFoundError:
+        return DELETED
+
+
+class FileHashCache:
+    """Persistent cache of file hashes keyed by the file's stat (size, mtime, inode).
+
+    Only dirty and untracked files are ever hashed, so only those are stored; entries
+    of files which became clean are dropped on every `hash_files`.
+    """
+
+    def __init__(self, path: Path, repo_path: str) -> None:
+        self.path = path
+        self.repo_path = repo_path
+        self.hits = 0
+        self.misses = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(sqlite3.connect(path)) as db, db:
+            db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS hashes (
+                    repo TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    stat TEXT NOT NULL,
+                    sha1 TEXT NOT NULL,
+                    PRIMARY KEY (repo, path)
+                )
+                """
+            )
+
+    @staticmethod
+    def _stat_key(path: str) -> str | None:
+        try:
+            stat = os.lstat(path)
+        except FileNotFoundError:
+            return None
+        if stat.st_mtime_ns > (time.time() - RACY_SECONDS) * 1e9:
+            return None  # may still change within the same mtime tick
+        return f"{stat.st_size}:{stat.st_mtime_ns}:{stat.st_ino}:{stat.st_ctime_ns}"
+
+    def hash_files(self, paths: list[str]) -> dict[str, str]:
+        """Hashes of files (relative to the repo), reusing those whose stat is unchanged."""
+        with closing(sqlite3.connect(self.path)) as db:
+            stored = {
+                path: (stat, sha1)
+                for path, stat, sha1 in db.execute(
+                    "SELECT path, stat, sha1 FROM hashes WHERE repo = ?",
+                    (self.repo_path,),
+                )
+            }
+
+        hashes: dict[str, str] = {}
+        stat_keys: dict[str, str | None] = {}
+        to_hash = []
+        for path in paths:
+            stat_key = self._stat_key(os.path.join(self.repo_path, path))
+            stat_keys[path] = stat_key
+            if stat_key is not None and stored.get(path, (None,))[0] == stat_key:
+                hashes[path] = stored[path][1]
+            else:
+                to_hash.append(path)
+        self.hits += len(hashes)
+        self.misses += len(to_hash)
+
+        full_paths = [os.path.join(self.repo_path, path) for path in to_hash]
+        for path, sha1 in zip(to_hash, _hash_files(full_paths)):
+            hashes[path] = sha1
+
+        with closing(sqlite3.connect(self.path)) as db, db:
+            db.execute("DELETE FROM hashes WHERE repo = ?", (self.repo_path,))
+            db.executemany(
+                "INSERT INTO hashes VALUES (?, ?, ?, ?)",
+                [
+                    (self.repo_path, path, stat_keys[path], sha1)
+                    for path, sha1 in hashes.items()
+                    if stat_keys[path] is not None
+                ],
+            )
+        return hashes
+
+
+def _hash_files(paths: list[str]) -> list[str]:
+    if len(paths) < PARALLEL_MIN_FILES:
+        total_bytes = sum(
+            os.path.getsize(path) for path in paths if os.path.isfile(path)
+        )
+        if total_bytes < PARALLEL_MIN_BYTES:
+            return [hash_file(path) for path in paths]
+    with ProcessPoolExecutor() as executor:
+        return list(executor.map(hash_file, paths, chunksize=16))
+
+
+def fingerprint(index_tree: str, file_hashes: dict[str, str]) -> str:
+    """Combine the index tree with hashes of files that differ from it (40 hex digits)."""
+    digest = hashlib.sha1(f"index {index_tree}\n".encode())
+    for path in sorted(file_hashes):
+        digest.update(f"{file_hashes[path]} {path}\n".encode())
+    return digest.hexdigest()
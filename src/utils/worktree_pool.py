@@ -0,0 +1,156 @@
+import hashlib
+import multiprocessing
+import shutil
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from src.config import env_vars
+from src.config.logger import logger
+from src.models.types import Branch
+from src.utils.git import (
+    _git_worktrees,
+    _run_git_command,
+    _run_git_command_unchecked,
+    git_push_branches,
+    use_worktree,
+)
+from src.utils.stack_plan import execute_merge_plan, plan_merge_base_into_head
+
+Link = tuple[str, str]  # (base branch, head branch)
+Task = Callable[[list[list[Link]]], str]  # run on a group of chains, return a summary
+
+
+def independent_groups(chains: list[list[Link]]) -> list[list[list[Link]]]:
+    """Group chains which share a head branch (e.g. stacks forking from a common PR),
+    so a branch is only ever merged into or pushed by one worker."""
+    groups: list[tuple[set[str], list[list[Link]]]] = []
+    for chain in chains:
+        heads = {head for _, head in chain}
+        overlapping = [group for group in groups if group[0] & heads]
+        merged = (heads, [chain])
+        for group in overlapping:
+            groups.remove(group)
+            merged = (merged[0] | group[0], group[1] + merged[1])
+        groups.append(merged)
+    return [group_chains for _, group_chains in groups]
+
+
+def prepare_worktrees(count: int, registered: dict[str, Branch | None]) -> list[Path]:
+    """Worktrees of LOCAL_REPO_PATH for the workers, created once and reused by later
+    runs. They are added detached and without checkout, so creating one is cheap even
+    for a big repo; tasks never check out files in them (a merge which can't be done in
+    the index fails instead). `registered` are the repo's `_git_worktrees()`.
+    """
+    root = Path(env_vars.WORKTREE_POOL_PATH).resolve()
+    name = hashlib.sha1(str(Path(env_vars.LOCAL_REPO_PATH).resolve()).encode())
+    worktrees = []
+    for i in range(count):
+        worktree = root / f"{name.hexdigest()[:12]}-{i}"
+        if str(worktree) not in registered:
+            if worktree.exists():  # left over from a pruned worktree
+                shutil.rmtree(worktree)
+            _run_git_command(["worktree", "prune"], output=False)
+            _run_git_command(
+                ["worktree", "add", "-q", "--detach", "--no-checkout", str(worktree)],
+                output=False,
+            )
+            logger.debug(f"Created worktree {worktree}")
+        worktrees.append(worktree)
+    return worktrees
+
+
+def _release_worktree() -> None:
+    """Abort a merge and detach, in case the worktree was left with a branch checked
+    out (e.g. by an interrupted run): no branch may stay checked out in it."""
+    returncode, _, _ = _run_git_command_unchecked(
+        ["rev-parse", "-q", "--verify", "MERGE_HEAD"], output=False
+    )
+    if returncode == 0:  # a merge is in progress
+        _run_git_command_unchecked(["merge", "--abort"], output=False)
+    _run_git_command_unchecked(["checkout", "--quiet", "--detach"], output=False)
+
+
+def _init_worker(worktrees: "multiprocessing.Queue[str]") -> None:
+    use_worktree(worktrees.get())
+
+
+def merge_chains(chains: list[list[Link]]) -> str:
+    """Worker task: bring every chain of a group up to date (see `run_on_chains` for
+    branches checked out in a worktree)."""
+    merges = 0
+    for links in chains:
+        plan = plan_merge_base_into_head(links)  # shared links are done by then
+        if plan:
+            execute_merge_plan(plan, worktree_fallback=False)
+            merges += len(plan)
+    return f"{merges} merges" if merges else "up to date"
+
+
+def push_chains(chains: list[list[Link]]) -> str:
+    """Worker task: push all head branches of a group (in one atomic push)."""
+    heads = list(dict.fromkeys(head for links in chains for _, head in links))
+    results = git_push_branches(heads)
+    pushed = [branch for branch, result in results.items() if result != "up to date"]
+    return f"pushed {len(pushed)} branches" if pushed else "up to date"
+
+
+def _run_task(task: Task, chains: list[list[Link]]) -> str:
+    _release_worktree()
+    try:
+        return task(chains)
+    except Exception as e:  # reported with the other groups, the rest keeps going
+        return f"FAILED: {type(e).__name__}: {e}"
+    finally:
+        _release_worktree()
+
+
+def run_on_chains(
+    task: Task, chains: list[list[Link]], skip_checked_out: bool = False
+) -> dict[str, str]:
+    """Run `task` on every independent group of chains, groups in parallel processes
+    (at most ALL_CHAINS_WORKERS), each in its own cached worktree.
+    Progress is logged as groups finish; return the result per group.
+
+    With `skip_checked_out` (for tasks moving branches), a group with a head branch
+    checked out in a worktree is not run (only that worktree can move the branch), its
+    result says where the branch is checked out.
+    """
+    all_groups = independent_groups(chains)
+    if not all_groups:
+        return {}
+    registered = _git_worktrees()
+    checked_out = {branch: path for path, branch in registered.items() if branch}
+    labels = [_group_label(group) for group in all_groups]
+    results: dict[str, str] = {}
+    for group, label in zip(all_groups, labels):
+        heads = [head for links in group for _, head in links if head in checked_out]
+        if skip_checked_out and heads:
+            where = checked_out[heads[0]]
+            results[label] = f"SKIPPED: branch {heads[0]} is checked out at {where}"
+            logger.warning(f"{label}: {results[label]}")
+    groups = [g for g, label in zip(all_groups, labels) if label not in results]
+    if not groups:
+        return results
+    workers = min(env_vars.ALL_CHAINS_WORKERS, len(groups))
+    # fresh interpreters, without the parent's git processes and ref snapshot
+    context = multiprocessing.get_context("spawn")
+    worktrees = context.Queue()
+    for worktree in prepare_worktrees(workers, registered):
+        worktrees.put(str(worktree))
+
+    with ProcessPoolExecutor(
+        workers, mp_context=context, initializer=_init_worker, initargs=(worktrees,)
+    ) as executor:
+        futures = {
+            executor.submit(_run_task, task, group): _group_label(group)
+            for group in groups
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            results[futures[future]] = future.result()
+            logger.info(f"[{done}/{len(groups)}] {futures[future]}: {future.result()}")
+    return {label: results[label] for label in labels}
+
+
+def _group_label(group: list[list[Link]]) -> str:
+    return ", ".join(f"{links[0][0]} <- {links[-1][1]}" for links in group)
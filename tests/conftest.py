@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+# some modules read their configuration when imported (e.g. `BRANCH_PREFIX`)
+os.environ.update(
+    {
+        "BRANCH_PREFIX": "kz/",
+        "LOCAL_REPO_PATH": ".",
+        "GITHUB_ACCESS_TOKEN": "test",
+        "GITHUB_REPO": "owner/repo",
+        "GITHUB_USERNAME": "test",
+        "REVIEWERS": "reviewer",
+        "LOG_ENQUEUE": "0",  # log files are written before the test changes directory
+    }
+)
+
+
+@pytest.fixture(autouse=True)
+def _in_tmp_path(tmp_path, monkeypatch):
+    """Log files and local caches (relative paths) stay out of the project."""
+    monkeypatch.chdir(tmp_path)
+
+
+@pytest.fixture
+def stack_repo(tmp_path):
+    """Create a synthetic repo (see `create_stack_repo`) in which the git commands of the
+    test run: `stack_repo(depth, **kwargs)` returns its path."""
+    from benchmarks.synthetic_repo import create_stack_repo
+    from src.utils import git
+
+    previous = git.LOCAL_REPO_PATH
+
+    def create(depth: int, **kwargs):
+        path = tmp_path / "repo"
+        create_stack_repo(path, depth, **kwargs)
+        git.use_worktree(str(path))
+        return path
+
+    yield create
+    git.use_worktree(previous)
+
+
+class Clock:
+    """Injected time (epoch seconds), only moved by the test or by `sleep`."""
+
+    def __init__(self) -> None:
+        self.now = 1_700_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock() -> Clock:
+    return Clock()
@@ -0,0 +1,120 @@
+import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from src.models.types import PullRequestBlueprint, PullRequestChange
+from src.utils.gh import plan_pr_changes, wait_pr_ready_to_merge
+from src.utils.gh_graphql import make_pull_request
+
+BRANCHES = {"main", "kz/a001", "kz/a002", "kz/a003"}
+
+
+def blueprint(head: str, base: str) -> PullRequestBlueprint:
+    return PullRequestBlueprint(head=head, base=base, title=head)
+
+
+def open_pr(number: int, head: str, base: str, title: str | None = None):
+    return make_pull_request(
+        None,
+        {
+            "number": number,
+            "title": title or head,
+            "head": {"label": f"owner:{head}", "ref": head},
+            "base": {"label": f"owner:{base}", "ref": base},
+        },
+    )
+
+
+STACK = [
+    blueprint("kz/a001", "main"),
+    blueprint("kz/a002", "kz/a001"),
+    blueprint("kz/a003", "kz/a002"),
+]
+
+
+def test_missing_prs_are_created():
+    changes = plan_pr_changes(STACK, [open_pr(1, "kz/a001", "main")], BRANCHES)
+    assert changes == [
+        PullRequestChange(blueprint=STACK[1]),
+        PullRequestChange(blueprint=STACK[2]),
+    ]
+
+
+def test_created_stack_needs_nothing():
+    open_prs = [
+        open_pr(3, "kz/a003", "kz/a002"),
+        open_pr(1, "kz/a001", "main"),
+        open_pr(2, "kz/a002", "kz/a001", title="Renamed"),
+        open_pr(4, "kz/other", "main"),
+    ]
+    assert plan_pr_changes(STACK, open_prs, BRANCHES) == []
+
+
+def test_retarget_and_fix_titles():
+    open_prs = [
+        open_pr(1, "kz/a001", "main"),
+        open_pr(2, "kz/a002", "main", title="Renamed"),
+        open_pr(3, "kz/a003", "kz/a002", title="Renamed"),
+    ]
+    assert plan_pr_changes(STACK, open_prs, BRANCHES) == [
+        PullRequestChange(blueprint=STACK[1], number=2, edit={"base": "kz/a001"}),
+    ]
+    assert plan_pr_changes(STACK, open_prs, BRANCHES, fix_titles=True) == [
+        PullRequestChange(
+            blueprint=STACK[1], number=2, edit={"base": "kz/a001", "title": "kz/a002"}
+        ),
+        PullRequestChange(blueprint=STACK[2], number=3, edit={"title": "kz/a003"}),
+    ]
+
+
+def test_missing_branches():
+    with pytest.raises(Exception, match=r"Branches not found on GitHub: \['kz/a003'\]"):
+        plan_pr_changes(STACK, [], BRANCHES - {"kz/a003"})
+
+
+class StubPullRequest:
+    """Approved PR based on main, whose `update()` reads the next of `states`."""
+
+    def __init__(self, states: list[dict]) -> None:
+        self.number = 1
+        self.states = iter(states)
+        self.created_at = datetime.datetime.now()
+        self.base = SimpleNamespace(label="owner:main")
+
+    def update(self) -> None:
+        self.__dict__.update(next(self.states))
+
+    def get_reviews(self) -> list:
+        return [SimpleNamespace(state="APPROVED")]
+
+
+def pr_state(sha="new", mergeable=True, mergeable_state="clean") -> dict:
+    return {
+        "head": SimpleNamespace(sha=sha),
+        "state": "open",
+        "merged": False,
+        "draft": False,
+        "mergeable": mergeable,
+        "rebaseable": mergeable,
+        "mergeable_state": mergeable_state,
+    }
+
+
+def test_wait_while_mergeability_is_computed():
+    pr = StubPullRequest(
+        [
+            pr_state(sha="old"),  # clean, but GitHub doesn't show the push yet
+            pr_state(mergeable=None, mergeable_state="unknown"),
+            pr_state(mergeable_state="blocked"),
+            pr_state(),
+        ]
+    )
+    wait_pr_ready_to_merge(pr, min_interval=0, head_sha="new")
+    assert next(pr.states, None) is None
+
+
+def test_wait_for_an_unmergeable_pr():
+    pr = StubPullRequest([pr_state(mergeable=False, mergeable_state="dirty")])
+    with pytest.raises(Exception, match="PR #1 is not mergeable"):
+        wait_pr_ready_to_merge(pr, min_interval=0)
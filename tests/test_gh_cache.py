@@ -0,0 +1,99 @@
+import pytest
+from github import Github
+
+from benchmarks.fake_github import FakeGitHub
+from src.utils import gh_http
+from src.utils.gh_cache import ResponseCache
+
+PULLS = "/repos/owner/repo/pulls"
+
+
+def cache_with(tmp_path, clock, **kwargs) -> ResponseCache:
+    return ResponseCache(tmp_path / "cache.sqlite3", clock=clock, **kwargs)
+
+
+def put(cache: ResponseCache, url: str, body: str = "{}") -> str:
+    key = ResponseCache.key(url, "", "token")
+    cache.put(key, url, 200, {"etag": '"1"'}, body)
+    return key
+
+
+def test_ttl(tmp_path, clock):
+    cache = cache_with(tmp_path, clock, max_bytes=2**20, ttl=60)
+    key = put(cache, f"{PULLS}/1")
+    clock.sleep(59)
+    assert cache.is_fresh(cache.get(key))
+
+    clock.sleep(2)
+    assert not cache.is_fresh(cache.get(key))
+    cache.refresh(key)  # revalidated
+    assert cache.is_fresh(cache.get(key))
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    url_size = len(f"{PULLS}/1")
+    cache = cache_with(tmp_path, clock, max_bytes=3 * (url_size + 10))
+    keys = []
+    for number in range(1, 4):
+        keys.append(put(cache, f"{PULLS}/{number}", "x" * 10))
+        clock.sleep(1)
+    cache.get(keys[0])
+    clock.sleep(1)
+
+    keys.append(put(cache, f"{PULLS}/4", "x" * 10))
+
+    assert [cache.get(key) is not None for key in keys] == [True, False, True, True]
+    too_big = put(cache, f"{PULLS}/5", "x" * 1000)
+    assert cache.get(too_big) is None
+
+
+def test_invalidate_a_resource_and_its_sub_resources(tmp_path, clock):
+    cache = cache_with(tmp_path, clock, max_bytes=2**20)
+    urls = [
+        f"{PULLS}/1",
+        f"{PULLS}/1?per_page=100",
+        f"{PULLS}/1/reviews",
+        f"{PULLS}/10",
+        PULLS,
+    ]
+    keys = [put(cache, url) for url in urls]
+
+    cache.invalidate(f"{PULLS}/1")
+
+    assert [cache.get(key) is not None for key in keys] == [
+        False,
+        False,
+        False,
+        True,
+        True,
+    ]
+
+
+@pytest.fixture
+def github(tmp_path, clock, monkeypatch):
+    """PyGithub repo served by a `FakeGitHub`, with a response cache (TTL 60s)."""
+    server = FakeGitHub("owner/repo")
+    for branch in ["main", "kz/a001"]:
+        server.add_branch(branch)
+    server.add_pr("kz/a001", "main")
+    cache = cache_with(tmp_path, clock, max_bytes=2**20, ttl=60)
+    monkeypatch.setattr(gh_http, "_response_cache", cache)
+    gh_http.install_connection_classes()
+    yield server, cache, Github("token", base_url=server.url).get_repo("owner/repo")
+    server.close()
+
+
+def test_requests_through_the_cache(github, clock):
+    server, cache, repo = github
+    assert repo.get_pull(1).title == "kz/a001"
+    requests = server.requests.total()
+
+    assert repo.get_pull(1).title == "kz/a001"  # within the TTL
+    assert (server.requests.total(), cache.hits) == (requests, 1)
+
+    clock.sleep(61)
+    assert repo.get_pull(1).title == "kz/a001"  # revalidated with its ETag
+    assert (server.not_modified, cache.revalidated) == (1, 1)
+
+    repo.get_pull(1).edit(title="Renamed")  # invalidates it
+    assert repo.get_pull(1).title == "Renamed"
@@ -0,0 +1,66 @@
+import pytest
+
+from src.utils.gh_scheduler import RateLimitScheduler
+
+
+@pytest.fixture
+def scheduler(clock) -> RateLimitScheduler:
+    return RateLimitScheduler(2, burst=3, clock=clock, sleep=clock.sleep)
+
+
+def test_mutations_are_paced(scheduler, clock):
+    for _ in range(3):  # the burst
+        scheduler.before_request(mutation=True)
+    assert scheduler.waited_s == 0
+
+    scheduler.before_request(mutation=True)
+    scheduler.before_request(mutation=True)
+    assert scheduler.waited_s == pytest.approx(0.5 + 0.5)
+    for _ in range(10):
+        scheduler.before_request(mutation=False)  # reads are not paced
+    assert scheduler.waited_s == pytest.approx(1)
+
+    clock.sleep(10)  # the bucket refills up to the burst
+    for _ in range(3):
+        scheduler.before_request(mutation=True)
+    assert scheduler.waited_s == pytest.approx(1)
+
+
+def test_exhausted_primary_limit(scheduler, clock):
+    headers = {
+        "x-ratelimit-remaining": "0",
+        "x-ratelimit-limit": "5000",
+        "x-ratelimit-reset": str(clock() + 30),
+    }
+    assert scheduler.after_response(200, headers) is None
+
+    scheduler.before_request(mutation=False)
+
+    assert scheduler.waited_s == 30
+    assert scheduler.after_response(403, headers) == 0  # reset is over
+
+
+def test_secondary_limit(scheduler):
+    assert scheduler.after_response(403, {"retry-after": "5"}) == 5
+    assert scheduler.rate == 1  # mutations are slowed down
+    assert scheduler.after_response(429, {}) == 60  # no hint
+    assert scheduler.rate == 0.5
+    for _ in range(3):
+        scheduler.after_response(200, {})
+    assert scheduler.rate == pytest.approx(1.1)  # and recover gradually
+    assert scheduler.after_response(403, {}) is None  # not a rate limit
+
+
+def test_back_off(scheduler, clock):
+    start = clock()
+    scheduler.back_off(5, "secondary rate limit")
+    assert (clock() - start, scheduler.waited_s) == (5, 5)
+
+
+def test_graphql_mutations():
+    assert RateLimitScheduler.is_mutation("PATCH", "/repos/o/r/pulls/1", None)
+    assert not RateLimitScheduler.is_mutation("GET", "/repos/o/r/pulls/1", None)
+    assert not RateLimitScheduler.is_mutation("POST", "/graphql", '{"query": "{ x }"}')
+    assert RateLimitScheduler.is_mutation(
+        "POST", "/graphql", '{"query": " mutation { x }"}'
+    )
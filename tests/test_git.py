@@ -0,0 +1,224 @@
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from benchmarks.synthetic_repo import add_remote_activity
+from src.utils.git import (
+    git_ahead_behind,
+    git_fetch_branches,
+    git_merge_branch_into,
+    git_push_branches,
+    git_restack,
+    invalidate_ref_snapshot,
+    ref_snapshot,
+)
+
+
+def git(path: Path, *args: str) -> str:
+    return subprocess.run(
+        ["git", "-C", str(path), *args], check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+def commit_on_main(path: Path, file: str, content: str) -> None:
+    """Commit a change of `file` on main (checked out)."""
+    (path / file).parent.mkdir(parents=True, exist_ok=True)
+    (path / file).write_text(content)
+    git(path, "add", file)
+    git(path, "commit", "-qm", f"Change {file} on main")
+    invalidate_ref_snapshot()
+
+
+def test_merge_in_index(stack_repo):
+    path = stack_repo(2)
+    head, base = git(path, "rev-parse", "kz/b001"), git(path, "rev-parse", "main")
+
+    assert git_merge_branch_into("main", "kz/b001")
+
+    merge = git(path, "rev-parse", "kz/b001")
+    assert ref_snapshot().get("kz/b001") == merge
+    assert git(path, "log", "-1", "--format=%P %s", merge) == (
+        f"{head} {base} Merge branch 'main' into kz/b001"
+    )
+    assert git(path, "show", "kz/b001:main.txt") == "1"
+    assert git(path, "show", "kz/b001:kz/b001.txt") == "1"
+    # nothing was checked out
+    assert git(path, "symbolic-ref", "--short", "HEAD") == "main"
+    assert git(path, "status", "--porcelain") == ""
+
+
+def test_already_merged(stack_repo):
+    path = stack_repo(2)
+    assert git_merge_branch_into("main", "kz/b001")
+    merge = git(path, "rev-parse", "kz/b001")
+
+    assert not git_merge_branch_into("main", "kz/b001")
+    assert git(path, "rev-parse", "kz/b001") == merge
+
+
+def test_conflict(stack_repo):
+    path = stack_repo(2)
+    commit_on_main(path, "kz/b001.txt", "conflict\n")
+    head = git(path, "rev-parse", "kz/b001")
+
+    with pytest.raises(ValueError, match=r"conflicts in \['kz/b001.txt'\]"):
+        git_merge_branch_into("main", "kz/b001", worktree_fallback=False)
+    assert git(path, "rev-parse", "kz/b001") == head
+    assert ref_snapshot().get("kz/b001") == head
+
+
+def test_checked_out_branch_is_merged_in_its_worktree(stack_repo):
+    path = stack_repo(2, origin=True)
+    git(path, "checkout", "-q", "kz/b001")
+    head = git(path, "rev-parse", "kz/b001")
+    with pytest.raises(ValueError, match="Branch kz/b001 is checked out"):
+        git_merge_branch_into("main", "kz/b001", worktree_fallback=False)
+
+    assert git_merge_branch_into("main", "kz/b001")
+
+    assert git(path, "rev-parse", "kz/b001^1") == head
+    assert (path / "main.txt").read_text() == "1\n"
+    assert git(path, "status", "--porcelain") == ""
+
+
+RESTACK_LINKS = [("main", "kz/b001"), ("kz/b001", "kz/b002"), ("kz/b002", "kz/b003")]
+
+
+def test_restack(stack_repo):
+    path = stack_repo(3)
+    git_merge_branch_into("main", "kz/b001")  # merges of bases are dropped
+
+    assert git_restack(RESTACK_LINKS) == 6
+
+    # every branch is moved, still on top of the previous one
+    assert git(path, "log", "--format=%s", "main..kz/b003").split("\n") == [
+        f"{change} kz/b00{i}" for i in [3, 2, 1] for change in ["Update", "Add"]
+    ]
+    for i, (base, head) in enumerate(RESTACK_LINKS, start=1):
+        assert git(path, "log", "-1", "--format=%s", head) == f"Update kz/b00{i}"
+        assert git(path, "rev-parse", f"{head}~2") == git(path, "rev-parse", base)
+        assert ref_snapshot().get(head) == git(path, "rev-parse", head)
+    assert git(path, "symbolic-ref", "--short", "HEAD") == "main"
+
+
+def test_restack_conflict(stack_repo):
+    path = stack_repo(3)
+    commit_on_main(path, "kz/b002.txt", "conflict\n")
+    heads = [git(path, "rev-parse", head) for _, head in RESTACK_LINKS]
+
+    with pytest.raises(ValueError, match="Restack failed, nothing was changed"):
+        git_restack(RESTACK_LINKS)
+
+    assert [git(path, "rev-parse", head) for _, head in RESTACK_LINKS] == heads
+    assert git(path, "symbolic-ref", "--short", "HEAD") == "main"
+    assert git(path, "status", "--porcelain") == ""
+
+
+def origin(path: Path) -> Path:
+    return path.parent / f"{path.name}-origin.git"  # see `create_stack_repo`
+
+
+def push_from_elsewhere(path: Path, branch: str) -> str:
+    """Add a commit to `branch` on origin, as if someone else pushed it."""
+    commit = git(
+        origin(path),
+        *["-c", "user.name=Other", "-c", "user.email=other@example.com"],
+        *["commit-tree", f"{branch}^{{tree}}", "-p", branch, "-m", "Other change"],
+    )
+    git(origin(path), "update-ref", f"refs/heads/{branch}", commit)
+    return commit
+
+
+def test_push(stack_repo):
+    path = stack_repo(3, origin=True)
+    old = git(origin(path), "rev-parse", "kz/b002")
+
+    results = git_push_branches(["kz/b002", "kz/b003"])
+
+    new = git(path, "rev-parse", "kz/b002")
+    assert results["kz/b002"] == f"pushed ({old[:7]}..{new[:7]})"
+    assert results["kz/b003"].startswith("pushed")
+    for branch in ["kz/b002", "kz/b003"]:
+        assert git(origin(path), "rev-parse", branch) == git(path, "rev-parse", branch)
+    assert git_push_branches(["kz/b002", "kz/b003"]) == {
+        "kz/b002": "up to date",
+        "kz/b003": "up to date",
+    }
+
+
+def test_rejected_push_is_atomic(stack_repo):
+    path = stack_repo(3, origin=True)
+    push_from_elsewhere(path, "kz/b001")
+    old = git(origin(path), "rev-parse", "kz/b002")
+
+    with pytest.raises(ValueError, match="Atomic push failed") as error:
+        git_push_branches(["kz/b001", "kz/b002"])
+
+    assert "'kz/b001': 'rejected ([rejected] (fetch first))'" in str(error.value)
+    assert "'kz/b002': 'rejected ([rejected] (atomic push failed))'" in str(error.value)
+    assert git(origin(path), "rev-parse", "kz/b002") == old
+
+
+def test_force_with_lease(stack_repo):
+    path = stack_repo(3, origin=True)
+    git_restack(RESTACK_LINKS)
+
+    results = git_push_branches([head for _, head in RESTACK_LINKS], True)
+
+    assert all(result.startswith("forced") for result in results.values())
+    assert git(origin(path), "rev-parse", "kz/b003") == git(
+        path, "rev-parse", "kz/b003"
+    )
+
+
+def test_rejected_lease(stack_repo):
+    path = stack_repo(3, origin=True)
+    git_restack(RESTACK_LINKS)
+    other = push_from_elsewhere(path, "kz/b002")  # not fetched, so it isn't leased
+
+    with pytest.raises(
+        ValueError, match=r"'kz/b002': 'rejected \(\[rejected\] \(stale"
+    ):
+        git_push_branches([head for _, head in RESTACK_LINKS], True)
+
+    assert git(origin(path), "rev-parse", "kz/b002") == other
+
+
+def test_fetch_only_the_chain(stack_repo):
+    path = stack_repo(3, origin=True)
+    add_remote_activity(origin(path), unrelated_branches=2)
+    old = git(path, "rev-parse", "origin/main")
+    new = git(origin(path), "rev-parse", "main")
+
+    assert git_fetch_branches(["main", "kz/b001", "kz/missing"]) == {
+        "main": f"fetched {old[:9]}..{new[:9]}",
+        "kz/b001": "up to date",
+        "kz/missing": "not on origin",
+    }
+
+    assert git(path, "rev-parse", "origin/main") == new
+    assert ref_snapshot().get("origin/main") == new
+    assert git(path, "for-each-ref", "refs/remotes/origin/other") == ""
+    assert git_fetch_branches(["main"]) == {"main": "up to date"}
+
+
+def test_ahead_behind_matches_rev_list(stack_repo):
+    # main <- kz/b001 <- kz/b003 <- kz/b005 and main <- kz/b002 <- kz/b004, with merges
+    path = stack_repo(5, branching=2)
+    git_merge_branch_into("main", "kz/b001")
+    git_merge_branch_into("kz/b001", "kz/b003")
+    git_merge_branch_into("kz/b002", "kz/b004")
+    orphan = git(path, "commit-tree", "main^{tree}", "-m", "Unrelated history")
+    tips = [git(path, "rev-parse", ref) for ref in ["main", "main~", "HEAD"]]
+    tips += [git(path, "rev-parse", f"kz/b00{i}") for i in range(1, 6)] + [orphan]
+    pairs = [(left, right) for left in tips for right in tips]
+
+    counts = git_ahead_behind(pairs)
+
+    for (left, right), count in zip(pairs, counts):
+        ahead, behind = git(
+            path, "rev-list", "--left-right", "--count", f"{left}...{right}"
+        ).split()
+        assert count == (int(ahead), int(behind))
+    assert git_ahead_behind([]) == []
@@ -0,0 +1,35 @@
+from src.utils.git_refs import RefSnapshot
+
+MAIN = "1" * 40
+ORIGIN_MAIN = "2" * 40
+FEATURE = "3" * 40
+TAG_OBJECT = "4" * 40
+TAGGED = "5" * 40
+
+SNAPSHOT = RefSnapshot(
+    f"{MAIN}  refs/heads/main\n"
+    f"{FEATURE}  refs/heads/kz/feature\n"
+    f"{ORIGIN_MAIN}  refs/remotes/origin/main\n"
+    f"{TAG_OBJECT} {TAGGED} refs/tags/v1\n"
+)
+
+
+def test_short_names():
+    assert SNAPSHOT.get("main") == MAIN
+    assert SNAPSHOT.get("kz/feature") == FEATURE
+    assert SNAPSHOT.get("origin/main") == ORIGIN_MAIN
+
+
+def test_full_names():
+    assert SNAPSHOT.get("refs/heads/main") == MAIN
+    assert SNAPSHOT.get("refs/remotes/origin/main") == ORIGIN_MAIN
+
+
+def test_annotated_tag_resolves_to_its_commit():
+    assert SNAPSHOT.get("v1") == TAGGED
+
+
+def test_missing():
+    assert SNAPSHOT.get("kz/missing") is None
+    assert SNAPSHOT.get("origin/kz/feature") is None
+    assert SNAPSHOT.get("refs/heads/origin/main") is None
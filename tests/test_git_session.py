@@ -0,0 +1,55 @@
+import subprocess
+
+from src.utils.git import git_merge_branch_into
+from src.utils.git_session import GitSession
+
+
+def test_lookups(stack_repo):
+    path = stack_repo(2)
+    session = GitSession(str(path))
+    tip = subprocess.run(
+        ["git", "-C", str(path), "rev-parse", "kz/b002"],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.strip()
+
+    assert session.resolve("kz/b002") == tip
+    assert session.resolve("kz/missing") is None
+    assert session.commit_title(tip) == "Update kz/b002"
+    parents, timestamp, _ = session.read_commit(tip)
+    assert len(parents) == 1 and timestamp > 0
+    session.close()
+
+
+def test_is_ancestor_matches_git(stack_repo):
+    # main <- kz/b001 <- kz/b003 and main <- kz/b002 <- kz/b004, with merges
+    path = stack_repo(4, branching=2)
+    git_merge_branch_into("main", "kz/b001")
+    git_merge_branch_into("kz/b002", "kz/b004")
+    commits = subprocess.run(
+        ["git", "-C", str(path), "rev-list", "--all"],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.split()
+    session = GitSession(str(path))
+
+    for ancestor in commits:
+        for descendant in commits:
+            expected = subprocess.run(
+                ["git", "-C", str(path), "merge-base", "--is-ancestor"]
+                + [ancestor, descendant]
+            ).returncode
+            assert session.is_ancestor(ancestor, descendant) == (expected == 0)
+    session.close()
+
+
+def test_is_ancestor_walk_is_bounded(stack_repo):
+    path = stack_repo(5, all_links_stale=False)
+    session = GitSession(str(path))
+    root = session.resolve("main~")
+
+    assert session.is_ancestor(root, session.resolve("kz/b005"))
+    assert not session.is_ancestor(root, session.resolve("kz/b005"), max_commits=2)
+    session.close()
@@ -0,0 +1,51 @@
+import pytest
+
+from src.models.types import PullRequestBlueprint
+from src.utils.other import pr_blueprint_levels
+
+
+def blueprints(*links: tuple[str, str]) -> list[PullRequestBlueprint]:
+    return [PullRequestBlueprint(head=h, base=b, title=h) for h, b in links]
+
+
+def heads(levels: list[list[PullRequestBlueprint]]) -> list[list[str]]:
+    return [[pr_blueprint.head for pr_blueprint in level] for level in levels]
+
+
+def test_tree_levels():
+    levels = pr_blueprint_levels(
+        blueprints(
+            ("kz/c001", "kz/b001"),  # listed before its base
+            ("kz/a001", "main"),
+            ("kz/b001", "kz/a001"),
+            ("kz/b002", "kz/a001"),
+            ("kz/x001", "main"),
+        )
+    )
+    assert heads(levels) == [
+        ["kz/a001", "kz/x001"],
+        ["kz/b001", "kz/b002"],
+        ["kz/c001"],
+    ]
+
+
+def test_bases_outside_the_spec_are_level_zero():
+    levels = pr_blueprint_levels(
+        blueprints(("kz/b001", "kz/existing"), ("kz/c001", "kz/b001"))
+    )
+    assert heads(levels) == [["kz/b001"], ["kz/c001"]]
+
+
+def test_no_blueprints():
+    assert pr_blueprint_levels([]) == []
+
+
+def test_cycle():
+    with pytest.raises(Exception, match="Cycle of PR bases"):
+        pr_blueprint_levels(
+            blueprints(
+                ("kz/a001", "main"),
+                ("kz/b001", "kz/c001"),
+                ("kz/c001", "kz/b001"),
+            )
+        )
@@ -0,0 +1,88 @@
+from pathlib import Path
+
+import pytest
+
+from src.utils.read_files import load_stack_spec
+
+
+def write_spec(tmp_path: Path, text: str) -> Path:
+    file = tmp_path / "stack.yaml"
+    file.write_text(text)
+    return file
+
+
+def test_stacks_and_forks(tmp_path):
+    file = write_spec(
+        tmp_path,
+        """
+stacks:
+  - branches:
+      - kz/feature
+      - kz/feature-api:
+          - [kz/api-docs]
+          - [kz/api-v2, kz/api-v2-tests]
+      - kz/feature-ui
+  - base: kz/api-v2
+    branches: [kz/api-v3]
+""",
+    )
+    assert load_stack_spec(file) == {
+        "kz/feature": "main",
+        "kz/feature-api": "kz/feature",
+        "kz/api-docs": "kz/feature-api",
+        "kz/api-v2": "kz/feature-api",
+        "kz/api-v2-tests": "kz/api-v2",
+        "kz/feature-ui": "kz/feature-api",
+        "kz/api-v3": "kz/api-v2",
+    }
+
+
+def test_errors_are_reported_together(tmp_path):
+    file = write_spec(
+        tmp_path,
+        """
+stacks:
+  - base: other/base
+    branches: [kz/a001, no-prefix]
+  - branches: []
+  - branches: [kz/b001, "in valid", kz/b002]
+  - unknown: key
+""",
+    )
+    with pytest.raises(Exception) as error:
+        load_stack_spec(file)
+    assert str(error.value).splitlines() == [
+        f"Invalid stack spec {file}:",
+        "stacks[0].base: other/base doesn't start with kz/",
+        "stacks[0].branches[1]: no-prefix doesn't start with kz/",
+        "stacks[1].branches: expected a non-empty list of branches",
+        "stacks[2].branches[1]: 'in valid' is not a valid branch name",
+        "stacks[3]: expected a mapping of `base` and `branches`",
+    ]
+
+
+def test_duplicate_branches(tmp_path):
+    file = write_spec(
+        tmp_path,
+        """
+stacks:
+  - branches:
+      - kz/a001:
+          - [kz/a002]
+      - kz/a002
+  - branches: [main]
+""",
+    )
+    with pytest.raises(Exception) as error:
+        load_stack_spec(file)
+    assert str(error.value).splitlines()[1:] == [
+        "stacks[0].branches[1]: kz/a002 is already in the spec",
+        "stacks[1].branches[0]: main doesn't start with kz/",
+        "stacks[1].branches[0]: main is already in the spec",
+    ]
+
+
+def test_not_a_spec(tmp_path):
+    file = write_spec(tmp_path, "- kz/a001\n")
+    with pytest.raises(Exception, match="expected a `stacks` list"):
+        load_stack_spec(file)
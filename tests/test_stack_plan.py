@@ -0,0 +1,35 @@
+from src.models.types import MergeStep
+from src.utils import stack_plan
+from src.utils.git import git_merge_branch_into
+from src.utils.stack_plan import execute_merge_plan, plan_merge_base_into_head
+
+LINKS = [("main", "kz/b001"), ("kz/b001", "kz/b002"), ("kz/b002", "kz/b003")]
+
+
+def test_plan_starts_at_the_first_stale_link(stack_repo, monkeypatch):
+    stack_repo(3, all_links_stale=False)  # only main has a new commit
+    git_merge_branch_into("main", "kz/b001")  # so kz/b001 has one too
+    checked = []
+    branch_merged = stack_plan._git_branch_merged
+
+    def record(base, head):
+        checked.append((base, head))
+        return branch_merged(base, head)
+
+    monkeypatch.setattr(stack_plan, "_git_branch_merged", record)
+
+    assert plan_merge_base_into_head(LINKS) == [
+        MergeStep(base="kz/b001", head="kz/b002"),
+        MergeStep(base="kz/b002", head="kz/b003"),
+    ]
+    assert checked == LINKS[:2]  # the links above the first stale one are stale too
+
+
+def test_executed_plan_brings_the_stack_up_to_date(stack_repo):
+    stack_repo(3)
+    plan = plan_merge_base_into_head(LINKS)
+    assert plan == [MergeStep(base=base, head=head) for base, head in LINKS]
+
+    execute_merge_plan(plan)
+
+    assert plan_merge_base_into_head(LINKS) == []
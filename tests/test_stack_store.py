@@ -0,0 +1,56 @@
+from src.utils.stack_store import StackStore
+
+
+def pr(number: int, base: str, updated_at: str, state: str = "open") -> dict:
+    return {
+        "number": number,
+        "state": state,
+        "head": {"label": f"owner:kz/a{number:03d}"},
+        "base": {"label": f"owner:{base}"},
+        "updated_at": f"2024-01-01T00:{updated_at}:00Z",
+    }
+
+
+def bases(store: StackStore) -> dict[int, str]:
+    return {pr["number"]: pr["base"]["label"] for pr in store.load()}
+
+
+def test_incremental_apply(tmp_path):
+    store = StackStore(tmp_path / "stacks.sqlite3", "owner/repo")
+    other_repo = StackStore(tmp_path / "stacks.sqlite3", "owner/other")
+    store.apply(
+        [pr(1, "main", "01"), pr(2, "kz/a001", "02"), pr(3, "kz/a002", "03")],
+        full=True,
+    )
+    other_repo.apply([pr(1, "main", "09")], full=True)
+    assert store.high_water_mark() == "2024-01-01T00:03:00Z"
+    assert store.refresh_since() == "2023-12-31T23:58:00Z"  # with the overlap
+
+    store.apply(
+        [
+            pr(4, "kz/a002", "04"),  # opened
+            pr(2, "main", "05"),  # retargeted
+            pr(3, "kz/a002", "06", state="closed"),
+        ]
+    )
+    assert bases(store) == {1: "owner:main", 2: "owner:main", 4: "owner:kz/a002"}
+    assert store.high_water_mark() == "2024-01-01T00:06:00Z"
+
+    # PRs re-read within the overlap don't move the high-water mark back
+    store.apply([pr(1, "main", "01")])
+    store.apply([])
+    assert store.high_water_mark() == "2024-01-01T00:06:00Z"
+    assert bases(other_repo) == {1: "owner:main"}
+
+
+def test_full_sync_replaces_everything(tmp_path):
+    store = StackStore(tmp_path / "stacks.sqlite3", "owner/repo")
+    store.apply([pr(1, "main", "01"), pr(2, "kz/a001", "02")], full=True)
+
+    store.apply([pr(2, "main", "01")], full=True)
+    assert bases(store) == {2: "owner:main"}
+    assert store.high_water_mark() == "2024-01-01T00:01:00Z"
+
+    store.apply([], full=True)  # no open PR left
+    assert store.load() == []
+    assert store.high_water_mark() > "2024-01-01T00:01:00Z"  # the time of the sync
@@ -0,0 +1,75 @@
+import os
+import subprocess
+from pathlib import Path
+
+from src.utils import git
+from src.utils.git import dirhash_repo
+from src.utils.worktree_hash import DIRTY_STATUS_ARGS, dirty_paths
+
+
+def run_git(path: Path, *args: str) -> str:
+    return subprocess.run(
+        ["git", "-C", str(path), *args], check=True, capture_output=True, text=True
+    ).stdout
+
+
+def write(path: Path, content: str = "x\n") -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+
+
+def test_dirty_paths(stack_repo):
+    path = stack_repo(1)
+    write(path / "gone.txt")
+    run_git(path, "add", "gone.txt")
+    run_git(path, "commit", "-qm", "Add gone.txt")
+
+    write(path / "main.txt", "modified\n")
+    (path / "gone.txt").unlink()
+    write(path / "dir/name with spaces.txt")  # untracked
+    write(path / ".venv/lib.py")  # untracked, in an ignored directory
+    write(path / "staged.txt")
+    run_git(path, "add", "staged.txt")  # only staged: covered by the index tree
+    write(path / "both.txt")
+    run_git(path, "add", "both.txt")
+    write(path / "both.txt", "changed after staging\n")
+
+    paths = dirty_paths(run_git(path, *DIRTY_STATUS_ARGS))
+
+    assert sorted(paths) == [
+        "both.txt",
+        "dir/name with spaces.txt",
+        "gone.txt",
+        "main.txt",
+    ]
+
+
+def test_conflicted_paths(stack_repo):
+    path = stack_repo(1)
+    write(path / "kz/b001.txt", "conflict\n")
+    run_git(path, "add", "kz")
+    run_git(path, "commit", "-qm", "Conflicting kz/b001.txt")
+    merge = subprocess.run(["git", "-C", str(path), "merge", "-q", "kz/b001"])
+    assert merge.returncode == 1
+
+    assert dirty_paths(run_git(path, *DIRTY_STATUS_ARGS)) == ["kz/b001.txt"]
+
+
+def test_dirhash_repo(stack_repo):
+    path = stack_repo(1)
+    clean = dirhash_repo()
+    write(path / "new.txt", "1\n")
+    dirty = dirhash_repo()
+    assert dirty != clean
+    write(path / "new.txt", "2\n")
+    assert dirhash_repo() != dirty
+    write(path / "new.txt", "1\n")
+    assert dirhash_repo() == dirty
+
+    os.utime(path / "new.txt", (1_000_000_000, 1_000_000_000))  # not racy any more
+    dirhash_repo()
+    assert dirhash_repo() == dirty
+    assert git._file_hash_cache is not None and git._file_hash_cache.hits == 1
+
+    (path / "new.txt").unlink()
+    assert dirhash_repo() == clean
@@ -0,0 +1,70 @@
+import subprocess
+
+from src.utils.git import invalidate_ref_snapshot, ref_snapshot
+from src.utils.worktree_pool import independent_groups, merge_chains, run_on_chains
+
+
+def test_chains_sharing_a_head_are_grouped():
+    a = [("main", "kz/a001"), ("kz/a001", "kz/a002")]
+    fork = [("main", "kz/a001"), ("kz/a001", "kz/f001")]
+    other = [("main", "kz/b001")]
+    assert independent_groups([a, other, fork]) == [[other], [a, fork]]
+
+
+def test_chain_joining_two_groups():
+    a = [("main", "kz/a001")]
+    b = [("main", "kz/b001")]
+    both = [("main", "kz/a001"), ("kz/a001", "kz/b001")]  # heads of both
+    assert independent_groups([a, b, both]) == [[b, a, both]]
+
+
+def test_shared_base_only():
+    a = [("kz/base", "kz/a001")]
+    b = [("kz/base", "kz/b001")]
+    assert independent_groups([a, b]) == [[a], [b]]
+
+
+def test_merge_skips_chains_with_a_checked_out_branch(stack_repo):
+    # main <- kz/b001 <- kz/b003 and main <- kz/b002
+    path = stack_repo(3, branching=2)
+    subprocess.run(["git", "-C", str(path), "checkout", "-q", "kz/b002"], check=True)
+    before = ref_snapshot().refs.copy()
+
+    results = run_on_chains(
+        merge_chains,
+        [[("main", "kz/b001"), ("kz/b001", "kz/b003")], [("main", "kz/b002")]],
+        skip_checked_out=True,
+    )
+
+    assert results == {
+        "main <- kz/b003": "2 merges",
+        "main <- kz/b002": f"SKIPPED: branch kz/b002 is checked out at {path}",
+    }
+    invalidate_ref_snapshot()
+    after = ref_snapshot().refs
+    assert {ref for ref in after if after[ref] != before[ref]} == {
+        "refs/heads/kz/b001",
+        "refs/heads/kz/b003",
+    }
+
+
+def test_merge_conflict_in_a_worker_is_reported(stack_repo):
+    path = stack_repo(1)
+    # main (checked out) adds the file of kz/b001 with another content
+    (path / "kz").mkdir()
+    (path / "kz/b001.txt").write_text("conflict\n")
+    subprocess.run(["git", "-C", str(path), "add", "kz"], check=True)
+    subprocess.run(["git", "-C", str(path), "commit", "-qm", "conflict"], check=True)
+    invalidate_ref_snapshot()
+    before = ref_snapshot().get("kz/b001")
+
+    results = run_on_chains(
+        merge_chains, [[("main", "kz/b001")]], skip_checked_out=True
+    )
+
+    assert results == {
+        "main <- kz/b001": "FAILED: ValueError: Merging main into kz/b001 conflicts "
+        "in ['kz/b001.txt']"
+    }
+    invalidate_ref_snapshot()
+    assert ref_snapshot().get("kz/b001") == before